@@ -6,15 +6,47 @@ A modern web interface for offline translation using Hugging Face models.
 """
 
 import os
-from flask import Flask, request, jsonify, render_template
-from translator import Translator
-from config import MODEL_PATH
+import json
+import itertools
+import time
+from flask import Flask, Response, g, request, jsonify, render_template, stream_with_context, url_for
+import metrics
+from capture import WorkloadRecorder, request_shape
+import download_model as model_downloader
+from download_jobs import DownloadJobManager
+from translator import ModelNotReady, Translator
+from config import Config, MODEL_PATH
+from generation import resolve_profile
 from werkzeug.exceptions import BadRequest
 
 app = Flask(__name__)
 
+def create_translator():
+    """Create the translator and start warming up the configured routes"""
+    new_translator = Translator(MODEL_PATH)
+    new_translator.start_warmup(Config.WARMUP_ROUTES)
+    return new_translator
+
 # Initialize translator
-translator = Translator(MODEL_PATH)
+translator = create_translator()
+
+def run_download(source, target, progress):
+    """Download a model into MODEL_PATH (runs on a download job thread)"""
+    model_downloader.download_language_model(source, target, progress=progress, models_dir=MODEL_PATH)
+
+def register_download(job):
+    """Make a downloaded model available without touching the other resident models"""
+    translator.refresh_route(job.route)
+
+# Optional recording of the request shapes for load replay
+workload_recorder = WorkloadRecorder(Config.CAPTURE_PATH) if Config.CAPTURE_PATH else None
+
+# Model downloads run as background jobs
+download_jobs = DownloadJobManager(
+    run_download,
+    max_concurrent=Config.MAX_CONCURRENT_DOWNLOADS,
+    on_complete=register_download
+)
 
 # Configuration
 app.config["DEBUG"] = False  # Disabled for cleaner output
@@ -26,6 +58,31 @@ def handle_bad_request(e):
     """Handle invalid JSON requests"""
     return jsonify({"error": "Invalid JSON in request body"}), 400
 
+@app.before_request
+def start_timer():
+    """Remember when the request started (runs before the JSON validation)"""
+    g.request_started = time.perf_counter()
+    g.request_arrived = time.time()
+
+@app.after_request
+def record_request(response):
+    """Count the request by endpoint and status, record its duration and, in capture mode, its shape"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        seconds = time.perf_counter() - started
+        metrics.REQUESTS_TOTAL.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        metrics.REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+        
+        if workload_recorder is not None and request.method == 'POST':
+            shape = request_shape(endpoint, request.get_json(silent=True))
+            if shape is not None:
+                try:
+                    workload_recorder.record(shape, g.request_arrived, response.status_code, seconds)
+                except OSError as e:
+                    print(f"Workload capture failed: {str(e)}")
+    return response
+
 @app.before_request
 def validate_json():
     """Validate JSON for POST requests"""
@@ -36,6 +93,24 @@ def validate_json():
         except Exception:
             return jsonify({"error": "Invalid JSON in request body"}), 400
 
+def conditional_json(payload):
+    """Build a JSON response with an ETag, answering 304 if the client copy is current"""
+    response = jsonify(payload)
+    response.headers["Cache-Control"] = "no-cache"
+    response.add_etag()
+    return response.make_conditional(request)
+
+def model_not_ready(error):
+    """Answer 503 with Retry-After for a route whose model is still loading"""
+    response = jsonify({
+        "error": str(error),
+        "route": error.route,
+        "retry_after": error.retry_after
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
 @app.route('/', methods=["GET"])
 def home():
     """Redirect to chat interface"""
@@ -45,7 +120,7 @@ def home():
 @app.route('/api', methods=["GET"])
 def health_check():
     """Confirms service is running"""
-    return jsonify({
+    return conditional_json({
         "status": "healthy",
         "message": "Machine translation service is up and running.",
         "loaded_models": translator.get_loaded_models(),
@@ -57,6 +132,20 @@ def health():
     """Health check endpoint"""
     return jsonify({"status": "healthy"})
 
+@app.route('/metrics', methods=["GET"])
+def get_metrics():
+    """Expose request, model and per-stage generation metrics for Prometheus"""
+    metrics.update_model_gauges(translator.get_memory_stats())
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/ready', methods=["GET"])
+def ready():
+    """Readiness check: succeeds once the startup warmup has finished"""
+    warmup = translator.get_warmup_status()
+    if translator.is_ready():
+        return jsonify({"status": "ready", "warmup": warmup})
+    return jsonify({"status": "not_ready", "warmup": warmup}), 503
+
 @app.route('/lang_routes', methods=["GET"])
 def get_lang_routes():
     """Get available target languages for a specific source language"""
@@ -65,10 +154,9 @@ def get_lang_routes():
         if not lang:
             return jsonify({"error": "Missing 'lang' parameter"}), 400
         
-        all_langs = translator.get_supported_langs()
-        lang_routes = [route for route in all_langs if route[0] == lang]
+        lang_routes = translator.get_lang_routes(lang)
         
-        return jsonify({
+        return conditional_json({
             "source_language": lang,
             "available_targets": lang_routes,
             "count": len(lang_routes)
@@ -89,10 +177,12 @@ def get_supported_languages():
                 grouped_langs[source] = []
             grouped_langs[source].append(target)
         
-        return jsonify({
+        return conditional_json({
             "supported_pairs": langs,
             "grouped_by_source": grouped_langs,
-            "total_pairs": len(langs)
+            "total_pairs": len(langs),
+            # Pairs without a model of their own and the models they chain
+            "pivot_pairs": translator.get_pivot_pairs()
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -120,15 +210,20 @@ def translate_text():
         if not text.strip():
             return jsonify({"error": "Text cannot be empty"}), 400
         
+        # Optional generation profile ('fast' or 'quality')
+        try:
+            profile = resolve_profile(request.json.get('profile'), Config.GENERATION_PROFILE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         # Check if language pair is supported
-        supported_langs = translator.get_supported_langs()
-        if [source, target] not in supported_langs:
+        if not translator.is_supported(source, target):
             return jsonify({
                 "error": f"Language pair '{source}-{target}' not supported",
-                "supported_pairs": supported_langs
+                "supported_pairs": translator.get_supported_langs()
             }), 400
         # Perform translation
-        translation = translator.translate(source, target, text)
+        translation = translator.translate(source, target, text, profile)
         
         # Check if translation failed (translation is always a string)
         if isinstance(translation, str) and (translation.startswith("Model directory not found") or translation.startswith("Error")):
@@ -139,9 +234,63 @@ def translate_text():
             "target_language": target,
             "original_text": text,
             "translated_text": translation,
+            "profile": profile,
             "success": True
         })
         
+    except ModelNotReady as e:
+        return model_not_ready(e)
+    except Exception as e:
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+@app.route('/translate/stream', methods=["POST"])
+def translate_stream():
+    """Translate text and stream each segment as a server-sent event"""
+    try:
+        # Validate JSON payload
+        if not request.json:
+            return jsonify({"error": "Request must be JSON"}), 400
+        
+        # Extract required fields
+        source = request.json.get('source')
+        target = request.json.get('target')
+        text = request.json.get('text')
+        
+        # Validate required fields
+        if not all([source, target, text]):
+            return jsonify({
+                "error": "Missing required fields. Need: source, target, text"
+            }), 400
+        
+        # Validate text is not empty
+        if not text.strip():
+            return jsonify({"error": "Text cannot be empty"}), 400
+        
+        # Check if language pair is supported
+        if not translator.is_supported(source, target):
+            return jsonify({
+                "error": f"Language pair '{source}-{target}' not supported",
+                "supported_pairs": translator.get_supported_langs()
+            }), 400
+        
+        # The first event is taken here so a model that is still loading
+        # is answered with a 503 instead of an empty stream
+        stream = translator.translate_stream(source, target, text)
+        first = next(stream)
+        
+        def events():
+            # The server closes this generator when the client disconnects,
+            # which stops translate_stream before the next segment
+            for event in itertools.chain([first], stream):
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        
+        return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
+        
+    except ModelNotReady as e:
+        return model_not_ready(e)
     except Exception as e:
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
@@ -176,16 +325,21 @@ def translate_batch():
         if len(valid_texts) != len(texts):
             return jsonify({"error": "All texts must be non-empty strings"}), 400
         
+        # Optional generation profile ('fast' or 'quality')
+        try:
+            profile = resolve_profile(request.json.get('profile'), Config.GENERATION_PROFILE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         # Check if language pair is supported
-        supported_langs = translator.get_supported_langs()
-        if [source, target] not in supported_langs:
+        if not translator.is_supported(source, target):
             return jsonify({
                 "error": f"Language pair '{source}-{target}' not supported",
-                "supported_pairs": supported_langs
+                "supported_pairs": translator.get_supported_langs()
             }), 400
         
         # Perform batch translation
-        translations = translator.translate_batch(source, target, texts)
+        translations = translator.translate_batch(source, target, texts, profile)
         
         # Create response with paired texts and translations
         results = []
@@ -200,9 +354,68 @@ def translate_batch():
             "target_language": target,
             "results": results,
             "count": len(results),
+            "profile": profile,
+            "success": True
+        })
+        
+    except ModelNotReady as e:
+        return model_not_ready(e)
+    except Exception as e:
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+@app.route('/translate/multi', methods=["POST"])
+def translate_multi():
+    """Translate one text or a list of texts into several target languages"""
+    try:
+        # Validate JSON payload
+        if not request.json:
+            return jsonify({"error": "Request must be JSON"}), 400
+        
+        # Extract required fields: 'text' (one string) or 'texts' (a list)
+        source = request.json.get('source')
+        targets = request.json.get('targets')
+        single = 'text' in request.json
+        texts = [request.json.get('text')] if single else request.json.get('texts')
+        
+        if not source or not targets or texts is None:
+            return jsonify({
+                "error": "Missing required fields. Need: source, targets, text or texts"
+            }), 400
+        
+        if not isinstance(targets, list) or not all(isinstance(target, str) and target for target in targets):
+            return jsonify({"error": "Field 'targets' must be a list of language codes"}), 400
+        targets = list(dict.fromkeys(targets))
+        if len(targets) > Config.MULTI_MAX_TARGETS:
+            return jsonify({"error": f"At most {Config.MULTI_MAX_TARGETS} targets per request"}), 400
+        
+        if not isinstance(texts, list) or not texts:
+            return jsonify({"error": "Field 'texts' must be a non-empty list"}), 400
+        if not all(isinstance(text, str) and text.strip() for text in texts):
+            return jsonify({"error": "All texts must be non-empty strings"}), 400
+        
+        # Every pair must be supported before any work starts
+        unsupported = [target for target in targets if not translator.is_supported(source, target)]
+        if unsupported:
+            return jsonify({
+                "error": f"Language pairs not supported: {', '.join(f'{source}-{target}' for target in unsupported)}",
+                "supported_pairs": translator.get_supported_langs()
+            }), 400
+        
+        translations = translator.translate_multi(source, targets, texts)
+        
+        return jsonify({
+            "source_language": source,
+            "target_languages": targets,
+            "translations": {
+                target: results[0] if single else results
+                for target, results in translations.items()
+            },
+            "count": len(texts),
             "success": True
         })
         
+    except ModelNotReady as e:
+        return model_not_ready(e)
     except Exception as e:
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
@@ -210,17 +423,21 @@ def translate_batch():
 def get_models_info():
     """Get information about loaded models"""
     try:
-        return jsonify({
+        return conditional_json({
             "loaded_models": translator.get_loaded_models(),
             "supported_languages": translator.get_supported_langs(),
-            "models_directory": translator.models_dir
+            "models_directory": translator.models_dir,
+            "model_states": translator.get_load_states(),
+            "cache": translator.get_cache_stats(),
+            "memory": translator.get_memory_stats(),
+            "inference": translator.get_inference_stats()
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/download_model', methods=["POST"])
 def download_model():
-    """Download a new translation model"""
+    """Start downloading a new translation model in the background"""
     try:
         # Validate JSON payload
         if not request.json:
@@ -242,49 +459,21 @@ def download_model():
                 "error": "Source and target languages must be different"
             }), 400
         
-        # Import download_model function
-        import subprocess
-        import sys
+        # A download already queued or running for this pair is reused
+        job, created = download_jobs.submit(source, target)
+        status_url = url_for('download_status', job_id=job.id)
         
-        # Run download_model.py as subprocess
-        try:
-            result = subprocess.run([
-                sys.executable, 'download_model.py', 
-                '--source', source, 
-                '--target', target
-            ], capture_output=True, text=True, timeout=300)  # 5 minute timeout
-            
-            if result.returncode == 0:
-                # Reload translator to include new model
-                global translator
-                translator = Translator(MODEL_PATH)
-                
-                return jsonify({
-                    "success": True,
-                    "message": f"Model {source}-{target} downloaded successfully",
-                    "source_language": source,
-                    "target_language": target,
-                    "output": result.stdout
-                })
-            else:
-                return jsonify({
-                    "success": False,
-                    "message": f"Failed to download model: {result.stderr}",
-                    "error": result.stderr
-                }), 500
-                
-        except subprocess.TimeoutExpired:
-            return jsonify({
-                "success": False,
-                "message": "Download timeout - model download taking too long",
-                "error": "Timeout after 5 minutes"
-            }), 500
-        except Exception as e:
-            return jsonify({
-                "success": False,
-                "message": f"Error executing download: {str(e)}",
-                "error": str(e)
-            }), 500
+        response = jsonify({
+            "success": True,
+            "message": f"Download of model {source}-{target} " + ("started" if created else "already in progress"),
+            "job_id": job.id,
+            "created": created,
+            "status_url": status_url,
+            "job": job.to_dict()
+        })
+        response.status_code = 202
+        response.headers["Location"] = status_url
+        return response
             
     except Exception as e:
         return jsonify({
@@ -293,10 +482,22 @@ def download_model():
             "error": str(e)
         }), 500
 
+@app.route('/download_model/<job_id>', methods=["GET"])
+def download_status(job_id):
+    """Get the progress of a model download job"""
+    job = download_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Download job {job_id} not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/download_model', methods=["GET"])
+def list_downloads():
+    """List recent model download jobs"""
+    return jsonify({"jobs": download_jobs.list()})
+
 @app.route('/delete_model', methods=["POST"])
 def delete_model():
     """Delete a translation model"""
-    global translator
     try:
         # Validate JSON payload
         if not request.json:
@@ -321,16 +522,13 @@ def delete_model():
                 "error": f"Model {source}-{target} not found"
             }), 404
         
-        # Remove model from memory if loaded
-        model_key = f"{source}-{target}"
-        if model_key in translator.models:
-            del translator.models[model_key]
-          # Delete model directory
+        # Delete model directory
         import shutil
         shutil.rmtree(model_path)
         
-        # Reload translator to update available models
-        translator = Translator(MODEL_PATH)
+        # Forget the route (resident copy and cached translations) while the
+        # other loaded models stay in memory
+        translator.refresh_route(f"{source}-{target}")
         
         return jsonify({
             "success": True,
@@ -371,6 +569,7 @@ if __name__ == "__main__":
     print(f"Idiomas soportados: {translator.get_supported_langs()}")
     print("Interfaz de chat: http://localhost:5000")
     print("API REST: http://localhost:5000/api")
+    print("Servidor de desarrollo; en producción: gunicorn -c gunicorn.conf.py app:app")
     print("Presiona Ctrl+C para detener")
     print("=" * 50)
     
@@ -0,0 +1,385 @@
+"""
+Asynchronous (ASGI) server.
+
+Serves the routes of app.py from an asyncio event loop. Each request runs the
+Flask handler on a thread of a bounded executor, so waiting requests hold no
+thread. Translation requests first take a place in a bounded queue for their
+language route. When a route's queue is full, or its estimated wait is above
+ASGI_MAX_WAIT_SECONDS, the request fails fast with 429 and Retry-After
+instead of making every queued request slower.
+
+Run it with an ASGI server:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+or with `python asgi_app.py`, which uses uvicorn if it is installed.
+"""
+
+import asyncio
+import io
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import app as service
+import metrics
+from app import app as flask_app
+from config import Config
+
+# Endpoints whose requests wait in their route's queue
+QUEUED_ENDPOINTS = ("/translate", "/translate/batch", "/translate/stream", "/translate/multi")
+
+
+def route_key(path: str, payload, is_supported: Optional[Callable[[str, str], bool]] = None) -> Optional[str]:
+    """
+    Get the queue a translation request waits in.
+
+    Only supported (or pivotable) pairs get a queue, so bogus language codes
+    create no queue and no metric series.
+
+    Args:
+        path (str): Request path
+        payload: Parsed JSON body
+        is_supported (Callable): Called as is_supported(source, target)
+            (None to queue every pair)
+
+    Returns:
+        'source-target' ('source-multi' for /translate/multi), or None if
+        the request is not queued (the handler answers it with a 400)
+    """
+    if path not in QUEUED_ENDPOINTS or not isinstance(payload, dict):
+        return None
+    source = payload.get("source")
+    if path == "/translate/multi":
+        target = "multi"
+        targets = payload.get("targets")
+        if not isinstance(targets, list) or not targets:
+            return None
+    else:
+        target = payload.get("target")
+        targets = [target]
+    if not isinstance(source, str) or not all(isinstance(item, str) for item in targets):
+        return None
+    if is_supported is not None and not all(is_supported(source, item) for item in targets):
+        return None
+    return f"{source}-{target}"
+
+
+def supported_by_translator(source: str, target: str) -> bool:
+    """Check a pair against the translator of app.py"""
+    return service.translator.is_supported(source, target)
+
+
+class RouteQueues():
+    def __init__(self, concurrency: int = 2, max_depth: int = 16, max_wait: float = 30, smoothing: float = 0.2):
+        """
+        Initialize the per-route admission control. Only used from the event loop.
+
+        Args:
+            concurrency (int): Requests of a route handled at the same time
+            max_depth (int): Requests of a route queued or running at most
+            max_wait (float): Refuse requests whose estimated wait is longer (seconds, 0 = no limit)
+            smoothing (float): Weight of the latest duration in the moving average
+        """
+        self.concurrency = max(1, concurrency)
+        self.max_depth = max(1, max_depth)
+        self.max_wait = max_wait
+        self.smoothing = smoothing
+        self._depths: Dict[str, int] = {}
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        # Moving average of a successful request's duration per route
+        self._averages: Dict[str, float] = {}
+
+    def estimated_wait(self, route: str, depth: Optional[int] = None) -> float:
+        """Estimate how long a new request of a route waits before it runs"""
+        depth = self._depths.get(route, 0) if depth is None else depth
+        ahead = depth - self.concurrency + 1
+        if ahead <= 0:
+            return 0.0
+        return math.ceil(ahead / self.concurrency) * self._averages.get(route, 0.0)
+
+    def reserve(self, route: str) -> Tuple[bool, float]:
+        """
+        Take a place in a route's queue.
+
+        Returns:
+            (admitted, estimated wait in seconds)
+        """
+        depth = self._depths.get(route, 0)
+        wait = self.estimated_wait(route, depth)
+        if depth >= self.max_depth or (self.max_wait > 0 and wait > self.max_wait):
+            return False, wait
+        self._depths[route] = depth + 1
+        if route not in self._slots:
+            self._slots[route] = asyncio.Semaphore(self.concurrency)
+        return True, wait
+
+    def slot(self, route: str) -> asyncio.Semaphore:
+        """Semaphore a reserved request holds while it runs"""
+        return self._slots[route]
+
+    def release(self, route: str, seconds: Optional[float] = None):
+        """
+        Give back a reserved place.
+
+        Args:
+            seconds (float): Duration of a successful request, used for the
+                estimated waits (None for failed requests)
+        """
+        if seconds is not None:
+            average = self._averages.get(route)
+            self._averages[route] = seconds if average is None else (
+                self.smoothing * seconds + (1 - self.smoothing) * average
+            )
+        depth = self._depths.get(route, 1) - 1
+        if depth > 0:
+            self._depths[route] = depth
+        else:
+            # Idle routes keep only their average
+            self._depths.pop(route, None)
+            self._slots.pop(route, None)
+
+    def depth(self, route: str) -> int:
+        return self._depths.get(route, 0)
+
+    def stats(self) -> Dict:
+        """Get the queued or running requests and average duration of each route"""
+        return {
+            "concurrency": self.concurrency,
+            "max_depth": self.max_depth,
+            "max_wait_seconds": self.max_wait,
+            "routes": {
+                route: {"depth": self._depths.get(route, 0), "average_seconds": self._averages.get(route)}
+                for route in sorted(set(self._depths) | set(self._averages))
+            },
+        }
+
+
+def _wsgi_environ(scope: Dict, body: bytes) -> Dict:
+    """Build the WSGI environ of an ASGI HTTP request"""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # The body has been read in full, also when it came chunked
+    environ["CONTENT_LENGTH"] = str(len(body))
+    return environ
+
+
+class AsyncServer():
+    def __init__(self, wsgi_app, threads: int = 8, queues: Optional[RouteQueues] = None,
+                 is_supported: Optional[Callable[[str, str], bool]] = None):
+        """
+        Initialize the server.
+
+        Args:
+            wsgi_app: Flask app whose handlers serve the requests
+            threads (int): Handlers running at the same time, all routes included
+            queues (RouteQueues): Per-route admission control
+            is_supported (Callable): Called as is_supported(source, target);
+                requests for other pairs skip the queues (None to queue every pair)
+        """
+        self.wsgi_app = wsgi_app
+        self.queues = queues or RouteQueues()
+        self.is_supported = is_supported
+        self.executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="asgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        route = None
+        if scope["method"] == "POST" and scope["path"] in QUEUED_ENDPOINTS:
+            try:
+                route = route_key(scope["path"], json.loads(body), self.is_supported)
+            except ValueError:
+                route = None
+        if route is None:
+            await self._call_wsgi(scope, body, send)
+            return
+
+        admitted, wait = self.queues.reserve(route)
+        if not admitted:
+            await self._reject(scope, route, wait, send)
+            return
+        metrics.ROUTE_QUEUE_DEPTH.set(self.queues.depth(route), route=route)
+        seconds = None
+        try:
+            async with self.queues.slot(route):
+                started = time.perf_counter()
+                status = await self._call_wsgi(scope, body, send)
+                if status == 200:
+                    seconds = time.perf_counter() - started
+        finally:
+            self.queues.release(route, seconds)
+            metrics.ROUTE_QUEUE_DEPTH.set(self.queues.depth(route), route=route)
+
+    async def _reject(self, scope, route: str, wait: float, send):
+        """Answer 429 with the estimated wait as Retry-After"""
+        retry_after = max(1, math.ceil(wait))
+        payload = json.dumps({
+            "error": f"Too many requests for {route}, retry in {retry_after} seconds",
+            "route": route,
+            "retry_after": retry_after
+        }).encode("utf-8")
+        metrics.REJECTED_REQUESTS_TOTAL.inc(route=route)
+        metrics.REQUESTS_TOTAL.inc(endpoint=scope["path"], method=scope["method"], status=429)
+        await send({"type": "http.response.start", "status": 429, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode("latin-1")),
+            (b"retry-after", str(retry_after).encode("latin-1")),
+        ]})
+        await send({"type": "http.response.body", "body": payload})
+
+    async def _call_wsgi(self, scope, body: bytes, send) -> int:
+        """
+        Run the Flask app on the executor and relay its response.
+
+        The whole call, including iterating a streamed response, runs on
+        one executor thread so Flask's request context stays on that thread.
+
+        Returns:
+            HTTP status of the response
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        environ = _wsgi_environ(scope, body)
+
+        def put(item):
+            loop.call_soon_threadsafe(chunks.put_nowait, item)
+
+        def run():
+            response: List = []
+
+            def start_response(status, headers, exc_info=None):
+                response[:] = [status, headers]
+
+            try:
+                result = self.wsgi_app(environ, start_response)
+                try:
+                    started = False
+                    for chunk in result:
+                        if not started:
+                            put(("start", response))
+                            started = True
+                        if chunk:
+                            put(("body", chunk))
+                        if stop.is_set():
+                            # The client went away: the app stops streaming
+                            break
+                    if not started:
+                        put(("start", response))
+                finally:
+                    if hasattr(result, "close"):
+                        result.close()
+            except Exception as e:
+                put(("error", e))
+            put(("done", None))
+
+        task = loop.run_in_executor(self.executor, run)
+        status = 500
+        started = False
+        try:
+            while True:
+                kind, value = await chunks.get()
+                if kind == "done":
+                    break
+                if kind == "error" and not started:
+                    print(f"Unhandled error in {scope['path']}: {str(value)}")
+                    await send({"type": "http.response.start", "status": 500,
+                                "headers": [(b"content-type", b"application/json")]})
+                    started = True
+                    await send({"type": "http.response.body", "body": b'{"error": "Internal server error"}'})
+                elif kind == "start":
+                    status_line, headers = value
+                    status = int(status_line.split(" ", 1)[0])
+                    await send({"type": "http.response.start", "status": status, "headers": [
+                        (name.lower().encode("latin-1"), header.encode("latin-1")) for name, header in headers
+                    ]})
+                    started = True
+                elif kind == "body":
+                    await send({"type": "http.response.body", "body": value, "more_body": True})
+            if started:
+                await send({"type": "http.response.body", "body": b""})
+        except BaseException:
+            # Disconnected or cancelled: the app stops after its current chunk
+            stop.set()
+            raise
+        finally:
+            await task
+        return status
+
+
+def create_server(wsgi_app) -> AsyncServer:
+    """Create the ASGI server of a Flask app with the configured limits"""
+    return AsyncServer(
+        wsgi_app,
+        threads=Config.ASGI_THREADS,
+        queues=RouteQueues(
+            concurrency=Config.ASGI_ROUTE_CONCURRENCY,
+            max_depth=Config.ASGI_QUEUE_DEPTH,
+            max_wait=Config.ASGI_MAX_WAIT_SECONDS
+        ),
+        is_supported=supported_by_translator
+    )
+
+
+app = create_server(flask_app)
+
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        print("uvicorn is not installed: pip install uvicorn, or run asgi_app:app with another ASGI server")
+        sys.exit(1)
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "5000")))
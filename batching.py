@@ -0,0 +1,178 @@
+"""
+Micro-batching scheduler for single-text translation requests.
+
+Requests for the same key (usually a language route) that arrive within a
+short window are grouped and executed together, so concurrent chat traffic
+turns into a few padded ``generate`` calls instead of one call per message.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+
+class _RouteQueue():
+    """Pending requests for a single key plus the worker that drains them"""
+
+    def __init__(self):
+        self.items: Deque[Tuple[float, str, Future]] = deque()
+        self.condition = threading.Condition()
+        self.worker: Optional[threading.Thread] = None
+
+
+class MicroBatcher():
+    def __init__(self, run_batch: Callable[[Hashable, List[str]], List[str]],
+                 max_batch_size: int = 16, max_wait_ms: float = 5,
+                 observe_wait: Optional[Callable[[Hashable, float], None]] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            run_batch (Callable): Function called as run_batch(key, texts) that
+                returns one result per text, in order
+            max_batch_size (int): Maximum number of texts grouped in one call
+            max_wait_ms (float): Maximum time the oldest request waits for
+                more requests to join its batch
+            observe_wait (Callable): Optional function called as
+                observe_wait(key, seconds) with the time each request waited
+                before its batch started
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.observe_wait = observe_wait
+        self._queues: Dict[Hashable, _RouteQueue] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, key: Hashable, text: str) -> Future:
+        """
+        Queue a text for translation.
+
+        Args:
+            key (Hashable): Batching key, requests only share a batch with
+                requests that have the same key
+            text (str): Text to translate
+
+        Returns:
+            Future resolved with the result for this text
+        """
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+
+        future: Future = Future()
+        queue = self._get_queue(key)
+        with queue.condition:
+            queue.items.append((time.monotonic(), text, future))
+            queue.condition.notify()
+        return future
+
+    def translate(self, key: Hashable, text: str, timeout: Optional[float] = None) -> str:
+        """Queue a text and block until its result is available"""
+        return self.submit(key, text).result(timeout)
+
+    def pending(self) -> Dict[Hashable, int]:
+        """Get the number of queued requests per key"""
+        with self._lock:
+            queues = list(self._queues.items())
+        return {key: len(queue.items) for key, queue in queues}
+
+    def close(self):
+        """Stop all workers once their queues are drained"""
+        self._closed = True
+        with self._lock:
+            queues = list(self._queues.values())
+        for queue in queues:
+            with queue.condition:
+                queue.condition.notify_all()
+
+    def _get_queue(self, key: Hashable) -> _RouteQueue:
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = _RouteQueue()
+                queue.worker = threading.Thread(
+                    target=self._worker, args=(key, queue),
+                    name=f"micro-batcher-{key}", daemon=True
+                )
+                self._queues[key] = queue
+                queue.worker.start()
+            return queue
+
+    def _next_batch(self, queue: _RouteQueue) -> List[Tuple[float, str, Future]]:
+        """Wait for requests and collect up to max_batch_size of them"""
+        with queue.condition:
+            while not queue.items:
+                if self._closed:
+                    return []
+                queue.condition.wait()
+
+            # Hold the batch open until it is full or the oldest request
+            # has waited max_wait
+            deadline = queue.items[0][0] + self.max_wait
+            while len(queue.items) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                queue.condition.wait(remaining)
+
+            size = min(len(queue.items), self.max_batch_size)
+            return [queue.items.popleft() for _ in range(size)]
+
+    def _worker(self, key: Hashable, queue: _RouteQueue):
+        while True:
+            batch = self._next_batch(queue)
+            if not batch:
+                return
+
+            futures = [future for _, _, future in batch]
+            texts = [text for _, text, _ in batch]
+            if self.observe_wait is not None:
+                started = time.monotonic()
+                for queued, _, _ in batch:
+                    self.observe_wait(key, started - queued)
+            try:
+                results = self.run_batch(key, texts)
+                if len(results) != len(texts):
+                    raise RuntimeError(
+                        f"Batch returned {len(results)} results for {len(texts)} texts"
+                    )
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+
+def plan_length_buckets(lengths: List[int], token_budget: int) -> List[List[int]]:
+    """
+    Group items into sub-batches of similar length.
+
+    Items are sorted by length and packed so that the padded size of each
+    sub-batch (rows x longest row) stays within the token budget. An item
+    longer than the budget gets a sub-batch of its own.
+
+    Args:
+        lengths (List[int]): Token length of each item
+        token_budget (int): Maximum padded tokens per sub-batch
+
+    Returns:
+        List of sub-batches, each a list of indices into lengths
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+
+    buckets: List[List[int]] = []
+    current: List[int] = []
+    for index in order:
+        # Sorted ascending, so the new item sets the padded width
+        if current and (len(current) + 1) * lengths[index] > token_budget:
+            buckets.append(current)
+            current = []
+        current.append(index)
+    if current:
+        buckets.append(current)
+    return buckets
@@ -0,0 +1 @@
+# Benchmark scripts (run as python -m benchmarks.<name>)
@@ -0,0 +1,97 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+
+import json
+import os
+import platform
+import resource
+import statistics
+import time
+from typing import Dict, List
+
+# Sentences of typical chat lengths used as benchmark input
+SAMPLE_SENTENCES = [
+    "Hello!",
+    "Where is the train station?",
+    "I would like to book a table for two people tonight.",
+    "The meeting has been moved to Thursday afternoon because the manager is travelling.",
+    "Please remember to save your work before closing the application, otherwise changes will be lost.",
+    "Our new product combines a lightweight design with a long-lasting battery, making it ideal for people who work on the move.",
+    "Thank you very much.",
+    "Could you send me the report by the end of the week so that I can review it before the presentation?",
+]
+
+
+def rss_bytes() -> int:
+    """Get the current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak RSS is the best approximation available elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def memory_breakdown() -> Dict[str, int]:
+    """
+    Get the resident memory of this process split into private and shared
+    pages (Linux only, empty elsewhere).
+
+    Pss charges each shared page to the processes mapping it in equal parts,
+    so summing it over several workers gives their real combined footprint.
+    """
+    fields = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared", "Shared_Dirty": "shared",
+              "Private_Clean": "private", "Private_Dirty": "private"}
+    breakdown = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    key = f"{fields[name]}_bytes"
+                    breakdown[key] = breakdown.get(key, 0) + int(value.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        return {}
+    return breakdown
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Get a percentile (fraction between 0 and 1) using linear interpolation"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Summarize latencies in seconds"""
+    return {
+        "count": len(latencies),
+        "mean": statistics.mean(latencies) if latencies else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies) if latencies else 0.0,
+    }
+
+
+def timed(function, *args, **kwargs):
+    """Call a function and return (result, elapsed seconds)"""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def write_results(results: Dict, output: str = None):
+    """Print results as JSON and optionally write them to a file"""
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
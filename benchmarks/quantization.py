@@ -0,0 +1,104 @@
+"""
+Compare fp32 and dynamically quantized int8 inference for one route.
+
+Reports load time, RSS growth, model footprint, single-sentence and batch
+latency, and how often the int8 output agrees with the fp32 output.
+
+Usage:
+    python -m benchmarks.quantization --source en --target es [--runs 5] [--output results.json]
+"""
+
+import argparse
+import difflib
+import os
+import sys
+
+import torch
+from transformers.models.marian import MarianMTModel, MarianTokenizer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import SAMPLE_SENTENCES, rss_bytes, summarize, timed, write_results
+from config import MODEL_PATH
+from quantization import QUANTIZED_FILENAME, load_quantized_model
+from residency import model_footprint
+
+parser = argparse.ArgumentParser(description='Benchmark fp32 vs int8 inference')
+parser.add_argument('--source', type=str, required=True, help='source language code (e.g., en)')
+parser.add_argument('--target', type=str, required=True, help='target language code (e.g., es)')
+parser.add_argument('--models-dir', type=str, default=MODEL_PATH, help='models directory')
+parser.add_argument('--runs', type=int, default=5, help='repetitions of each measurement')
+parser.add_argument('--output', type=str, default=None, help='write JSON results to this file')
+
+
+def translate(model, tokenizer, texts):
+    with torch.inference_mode():
+        batch = tokenizer(texts, return_tensors="pt", padding=True, truncation=True)
+        generated = model.generate(**batch)
+    return tokenizer.batch_decode(generated, skip_special_tokens=True)
+
+
+def measure(load, tokenizer, runs):
+    """Load a model variant and measure it"""
+    rss_before = rss_bytes()
+    model, load_seconds = timed(load)
+    result = {
+        "load_seconds": load_seconds,
+        "rss_delta_bytes": rss_bytes() - rss_before,
+        "footprint_bytes": model_footprint(model),
+    }
+
+    # Warm up once so first-call overhead is not measured
+    translate(model, tokenizer, SAMPLE_SENTENCES[:1])
+
+    single, batch = [], []
+    outputs = []
+    for _ in range(runs):
+        outputs = []
+        for sentence in SAMPLE_SENTENCES:
+            translated, seconds = timed(translate, model, tokenizer, [sentence])
+            single.append(seconds)
+            outputs.extend(translated)
+        _, seconds = timed(translate, model, tokenizer, SAMPLE_SENTENCES)
+        batch.append(seconds)
+
+    result["single_latency"] = summarize(single)
+    result["batch_latency"] = summarize(batch)
+    result["batch_sentences_per_second"] = len(SAMPLE_SENTENCES) / result["batch_latency"]["mean"]
+    return result, outputs
+
+
+def main():
+    args = parser.parse_args()
+    path = os.path.join(args.models_dir, f"opus-mt-{args.source}-{args.target}")
+    tokenizer = MarianTokenizer.from_pretrained(path)
+
+    # Time quantization itself once, later loads use the cached int8 weights
+    cache_path = os.path.join(path, QUANTIZED_FILENAME)
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    _, quantize_seconds = timed(load_quantized_model, path)
+
+    fp32, fp32_outputs = measure(lambda: MarianMTModel.from_pretrained(path).eval(), tokenizer, args.runs)
+    int8, int8_outputs = measure(lambda: load_quantized_model(path), tokenizer, args.runs)
+    int8["quantize_seconds"] = quantize_seconds
+
+    matches = sum(a == b for a, b in zip(fp32_outputs, int8_outputs))
+    similarity = [difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(fp32_outputs, int8_outputs)]
+
+    write_results({
+        "route": f"{args.source}-{args.target}",
+        "torch_threads": torch.get_num_threads(),
+        "fp32": fp32,
+        "int8": int8,
+        "speedup_batch": fp32["batch_latency"]["mean"] / int8["batch_latency"]["mean"],
+        "footprint_ratio": int8["footprint_bytes"] / max(1, fp32["footprint_bytes"]),
+        "agreement": {
+            "exact_match": matches / max(1, len(fp32_outputs)),
+            "mean_similarity": sum(similarity) / max(1, len(similarity)),
+        },
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
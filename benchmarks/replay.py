@@ -0,0 +1,215 @@
+"""
+Replay a captured workload against a running server.
+
+Reads a capture file written with CAPTURE_PATH, rebuilds requests of the
+same shape (route, text lengths, batch size, profile) with generated text,
+and sends them to /translate and /translate/batch at their recorded arrival
+times. Reports latency percentiles, throughput and error rates overall and
+per endpoint. Results of several runs, e.g. one per server configuration,
+can then be compared with --compare.
+
+Usage:
+    python -m benchmarks.replay capture.jsonl --url http://localhost:5000 [--concurrency 16] [--speed 2] [--label int8] [--output int8.json]
+    python -m benchmarks.replay --compare fp32.json int8.json [--output comparison.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import summarize, write_results
+from capture import read_capture
+
+WORDS = (
+    "the meeting report train station table people weather market bread team week "
+    "project summary product battery design work application changes presentation "
+    "review afternoon tonight please remember could would like send before after"
+).split()
+
+parser = argparse.ArgumentParser(description='Replay a captured workload against a server')
+parser.add_argument('capture', nargs='?', help='capture file (JSON lines written with CAPTURE_PATH)')
+parser.add_argument('--url', type=str, default='http://localhost:5000', help='server base URL')
+parser.add_argument('--concurrency', type=int, default=8, help='requests in flight at most')
+parser.add_argument('--speed', type=float, default=1.0,
+                    help='time scaling of the recorded arrivals (2 = twice as fast, 0 = no pauses)')
+parser.add_argument('--limit', type=int, default=0, help='replay only the first N requests (0 = all)')
+parser.add_argument('--route', type=str, default=None, help='send every request to this route instead (e.g. xx-yy)')
+parser.add_argument('--timeout', type=float, default=60, help='seconds before a request counts as failed')
+parser.add_argument('--label', type=str, default=None, help='name of the server configuration under test')
+parser.add_argument('--compare', nargs='+', metavar='RESULTS', help='compare result files of earlier runs')
+parser.add_argument('--output', type=str, default=None, help='write JSON results to this file')
+
+
+def make_text(length: int, rng: random.Random) -> str:
+    """Build a text of exactly the given number of characters"""
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:max(1, length)].strip() or "a"
+
+
+def build_request(record: Dict, route: str, rng: random.Random) -> Dict:
+    """Rebuild the JSON body of a captured request"""
+    source, _, target = (route or record["route"]).partition("-")
+    texts = [make_text(length, rng) for length in record["lengths"]] or ["a"]
+    body = {"source": source, "target": target}
+    if record["endpoint"] == "/translate/batch":
+        body["texts"] = texts
+    else:
+        body["text"] = texts[0]
+    if record.get("profile"):
+        body["profile"] = record["profile"]
+    return body
+
+
+def send(url: str, body: Dict, timeout: float) -> str:
+    """POST a request and return its outcome ('200', '503', 'timeout', ...)"""
+    request = urllib.request.Request(
+        url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return str(response.status)
+    except urllib.error.HTTPError as e:
+        return str(e.code)
+    except (TimeoutError, OSError) as e:
+        reason = getattr(e, "reason", e)
+        return "timeout" if isinstance(reason, TimeoutError) or "timed out" in str(reason) else "connection_error"
+
+
+def replay(records: List[Dict], base_url: str, concurrency: int, speed: float,
+           timeout: float, route: str = None) -> List[Dict]:
+    """
+    Send the captured requests at their (scaled) arrival times.
+
+    Returns:
+        One result per request with its endpoint, batch size, outcome,
+        latency and lag (how late it was sent, e.g. because every
+        connection was busy)
+    """
+    rng = random.Random(0)
+    bodies = [build_request(record, route, rng) for record in records]
+    first = records[0]["arrived"] if records else 0
+    results: List[Dict] = [None] * len(records)
+    started = time.perf_counter()
+
+    def run(index: int, due: float):
+        record = records[index]
+        sent = time.perf_counter()
+        outcome = send(base_url.rstrip("/") + record["endpoint"], bodies[index], timeout)
+        results[index] = {
+            "endpoint": record["endpoint"],
+            "batch_size": len(bodies[index].get("texts", [None])),
+            "outcome": outcome,
+            "seconds": time.perf_counter() - sent,
+            "lag": max(0.0, sent - due),
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="replay") as executor:
+        for index, record in enumerate(records):
+            offset = (record["arrived"] - first) / speed if speed > 0 else 0.0
+            due = started + offset
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(run, index, due)
+    return results
+
+
+def report(results: List[Dict], wall_seconds: float) -> Dict:
+    """Summarize the results of a group of requests"""
+    outcomes: Dict[str, int] = {}
+    for result in results:
+        outcomes[result["outcome"]] = outcomes.get(result["outcome"], 0) + 1
+    ok = [result for result in results if result["outcome"].startswith("2")]
+    return {
+        "requests": len(results),
+        "outcomes": outcomes,
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "latency": summarize([result["seconds"] for result in ok]),
+        "lag": summarize([result["lag"] for result in results]),
+        "requests_per_second": len(ok) / wall_seconds if wall_seconds else 0.0,
+        "texts_per_second": sum(result["batch_size"] for result in ok) / wall_seconds if wall_seconds else 0.0,
+    }
+
+
+def compare(paths: List[str]) -> Dict:
+    """Compare the overall results of several runs against the first one"""
+    runs = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            runs.append(json.load(f))
+
+    baseline = runs[0]["overall"]
+    configs = []
+    for run in runs:
+        overall = run["overall"]
+        entry = {
+            "label": run.get("label"),
+            "requests": overall["requests"],
+            "error_rate": overall["error_rate"],
+            "p50": overall["latency"]["p50"],
+            "p95": overall["latency"]["p95"],
+            "p99": overall["latency"]["p99"],
+            "requests_per_second": overall["requests_per_second"],
+        }
+        # Ratios against the baseline: below 1 is faster for latencies,
+        # above 1 is more for throughput
+        for key in ("p50", "p95", "p99", "requests_per_second"):
+            reference = baseline["latency"][key] if key.startswith("p") else baseline[key]
+            entry[f"{key}_vs_baseline"] = entry[key] / reference if reference else None
+        configs.append(entry)
+    return {"baseline": runs[0].get("label"), "configs": configs}
+
+
+def main():
+    args = parser.parse_args()
+    if args.compare:
+        write_results(compare(args.compare), args.output)
+        return
+    if not args.capture:
+        parser.error("a capture file or --compare is required")
+
+    records = read_capture(args.capture)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        parser.error(f"no replayable requests in {args.capture}")
+
+    started = time.perf_counter()
+    results = replay(records, args.url, args.concurrency, args.speed, args.timeout, args.route)
+    wall_seconds = time.perf_counter() - started
+
+    endpoints = sorted({result["endpoint"] for result in results})
+    write_results({
+        "label": args.label,
+        "url": args.url,
+        "capture": os.path.abspath(args.capture),
+        "settings": {"concurrency": args.concurrency, "speed": args.speed, "route": args.route},
+        "captured_span_seconds": records[-1]["arrived"] - records[0]["arrived"],
+        "wall_seconds": wall_seconds,
+        "overall": report(results, wall_seconds),
+        "endpoints": {
+            endpoint: report([result for result in results if result["endpoint"] == endpoint], wall_seconds)
+            for endpoint in endpoints
+        },
+        # Latencies the server measured when the workload was captured
+        "captured_latency": summarize([record["seconds"] for record in records if "seconds" in record]),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
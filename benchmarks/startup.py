@@ -0,0 +1,142 @@
+"""
+Compare cold start with pickled (pytorch_model.bin) and memory-mapped
+(model.safetensors) weights.
+
+Every measurement runs in fresh processes. For each format it reports the
+time to import and load the model, and the private and shared memory of
+several workers holding the model at the same time: with safetensors the
+weights are file-backed pages that all workers share.
+
+The OS page cache makes every load after the first one warm. Pass
+--drop-caches (root only) to drop it before each run.
+
+Usage:
+    python -m benchmarks.startup --source en --target es [--runs 3] [--workers 4] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import summarize, write_results
+from config import MODEL_PATH
+
+FORMATS = ("bin", "safetensors")
+
+parser = argparse.ArgumentParser(description='Benchmark model startup with pickled vs safetensors weights')
+parser.add_argument('--source', type=str, help='source language code (e.g., en)')
+parser.add_argument('--target', type=str, help='target language code (e.g., es)')
+parser.add_argument('--models-dir', type=str, default=MODEL_PATH, help='models directory')
+parser.add_argument('--runs', type=int, default=3, help='cold starts measured per format')
+parser.add_argument('--workers', type=int, default=4, help='processes holding the model at the same time')
+parser.add_argument('--drop-caches', action='store_true', help='drop the OS page cache before each run (root only)')
+parser.add_argument('--output', type=str, default=None, help='write JSON results to this file')
+parser.add_argument('--worker', type=str, choices=FORMATS, help=argparse.SUPPRESS)
+parser.add_argument('--path', type=str, help=argparse.SUPPRESS)
+
+
+def worker(weights_format, path):
+    """Load the model, report timings and memory, then hold it until stdin closes"""
+    start = time.perf_counter()
+    from transformers.models.marian import MarianMTModel
+    from benchmarks.common import memory_breakdown
+    imported = time.perf_counter()
+    MarianMTModel.from_pretrained(path, use_safetensors=weights_format == "safetensors")
+    loaded = time.perf_counter()
+
+    print(json.dumps({
+        "import_seconds": imported - start,
+        "load_seconds": loaded - imported,
+        **memory_breakdown(),
+    }), flush=True)
+    sys.stdin.read()
+
+
+def drop_caches():
+    subprocess.run(["sync"], check=False)
+    with open("/proc/sys/vm/drop_caches", "w") as f:
+        f.write("3\n")
+
+
+def spawn(weights_format, path, count):
+    """Start workers and collect their reports while all of them hold the model"""
+    command = [sys.executable, "-m", "benchmarks.startup", "--worker", weights_format, "--path", path]
+    root = os.path.join(os.path.dirname(__file__), '..')
+    processes = [
+        subprocess.Popen(command, cwd=root, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL, text=True)
+        for _ in range(count)
+    ]
+    try:
+        return [json.loads(process.stdout.readline()) for process in processes]
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+
+
+def measure(weights_format, path, runs, workers, drop):
+    loads = []
+    for _ in range(runs):
+        if drop:
+            drop_caches()
+        loads.extend(report["load_seconds"] for report in spawn(weights_format, path, 1))
+
+    reports = spawn(weights_format, path, workers)
+    return {
+        "load_latency": summarize(loads),
+        "workers": workers,
+        "worker_private_bytes": [report.get("private_bytes", 0) for report in reports],
+        "worker_shared_bytes": [report.get("shared_bytes", 0) for report in reports],
+        # Combined footprint of all workers, shared pages counted once
+        "total_pss_bytes": sum(report.get("pss_bytes", 0) for report in reports),
+    }
+
+
+def main():
+    args = parser.parse_args()
+    if args.worker:
+        worker(args.worker, args.path)
+        return
+    if not args.source or not args.target:
+        parser.error("--source and --target are required")
+
+    path = os.path.abspath(os.path.join(args.models_dir, f"opus-mt-{args.source}-{args.target}"))
+    from weights import PICKLE_FILENAME, SAFETENSORS_FILENAME, convert_to_safetensors
+    if not os.path.exists(os.path.join(path, PICKLE_FILENAME)):
+        parser.error(f"{path} has no {PICKLE_FILENAME} to compare against")
+    converted = os.path.exists(os.path.join(path, SAFETENSORS_FILENAME))
+    conversion_seconds = None
+    if not converted:
+        start = time.perf_counter()
+        convert_to_safetensors(path)
+        conversion_seconds = time.perf_counter() - start
+
+    try:
+        results = {fmt: measure(fmt, path, args.runs, args.workers, args.drop_caches) for fmt in FORMATS}
+    finally:
+        if not converted:
+            # Leave the model directory as it was found
+            os.remove(os.path.join(path, SAFETENSORS_FILENAME))
+
+    write_results({
+        "route": f"{args.source}-{args.target}",
+        "page_cache_dropped": args.drop_caches,
+        # Only legacy (non-zip) pickles are read into private memory; zip
+        # archives are memory-mapped by torch.load as well
+        "bin_is_zip": zipfile.is_zipfile(os.path.join(path, PICKLE_FILENAME)),
+        "conversion_seconds": conversion_seconds,
+        **results,
+        "speedup_load": results["bin"]["load_latency"]["mean"] / max(1e-9, results["safetensors"]["load_latency"]["mean"]),
+        "pss_ratio": results["safetensors"]["total_pss_bytes"] / max(1, results["bin"]["total_pss_bytes"]),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Offline inference benchmark suite.
+
+Measures model load, Translator.translate, Translator.translate_batch and the
+/translate and /translate/batch endpoints across input lengths and batch
+sizes. Without --source/--target it builds the tiny random model of
+benchmarks.tiny_model in a temporary directory, so it runs without network
+access (e.g. in CI); the numbers are then only comparable between runs of
+the same tiny model and machine.
+
+The translation cache and the micro-batcher are disabled so every call
+reaches the model and sequential calls do not wait for a batch to fill.
+
+Usage:
+    python -m benchmarks.suite [--source en --target es] [--batch-sizes 1,8,32] [--runs 5] [--output results.json]
+"""
+
+import argparse
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import torch
+import transformers
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import summarize, timed, write_results
+from config import Config, MODEL_PATH
+
+# Input lengths in words
+LENGTHS = {"short": 5, "medium": 20, "long": 60}
+
+WORDS = (
+    "the meeting report train station table people weather market bread team week "
+    "project summary product battery design work application changes presentation "
+    "review afternoon tonight please remember could would like send before after"
+).split()
+
+parser = argparse.ArgumentParser(description='Benchmark translation latency and throughput')
+parser.add_argument('--source', type=str, help='source language code of a downloaded model (default: tiny model)')
+parser.add_argument('--target', type=str, help='target language code of a downloaded model')
+parser.add_argument('--models-dir', type=str, default=MODEL_PATH, help='models directory of --source/--target')
+parser.add_argument('--batch-sizes', type=str, default='1,8,32', help='comma separated batch sizes')
+parser.add_argument('--lengths', type=str, default=','.join(LENGTHS), help=f'comma separated input lengths ({", ".join(LENGTHS)})')
+parser.add_argument('--profile', type=str, default=None, help='generation profile (server default if not given)')
+parser.add_argument('--runs', type=int, default=5, help='repetitions of each measurement')
+parser.add_argument('--output', type=str, default=None, help='write JSON results to this file')
+
+
+def make_texts(count, words, rng):
+    """Build distinct sentences of a given number of words"""
+    return [" ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "." for _ in range(count)]
+
+
+def count_tokens(translator, route, texts):
+    """Count the source tokens of texts with a route's tokenizer"""
+    _, tokenizer = translator.models[route]
+    return sum(len(ids) for ids in tokenizer(texts, truncation=True)["input_ids"])
+
+
+def bench_load(models_dir, route, runs):
+    """Time loading a route into a fresh Translator"""
+    from translator import Translator
+    latencies = []
+    for _ in range(runs):
+        translator = Translator(models_dir)
+        (success_code, message), seconds = timed(translator.load_model, route)
+        if not success_code:
+            raise RuntimeError(message)
+        latencies.append(seconds)
+    return summarize(latencies)
+
+
+def bench_translate(translator, source, target, lengths, profile, runs, rng):
+    """Latency of single-text translations per input length"""
+    results = {}
+    for name in lengths:
+        texts = make_texts(runs, LENGTHS[name], rng)
+        latencies = [timed(translator.translate, source, target, text, profile)[1] for text in texts]
+        results[name] = {
+            "words": LENGTHS[name],
+            "source_tokens_mean": count_tokens(translator, f"{source}-{target}", texts) / len(texts),
+            "latency": summarize(latencies),
+        }
+    return results
+
+
+def bench_batch(translator, source, target, lengths, batch_sizes, profile, runs, rng):
+    """Latency and throughput of batch translations per input length and batch size"""
+    results = []
+    for name in lengths:
+        for size in batch_sizes:
+            latencies, texts_done, tokens_done = [], 0, 0
+            for _ in range(runs):
+                texts = make_texts(size, LENGTHS[name], rng)
+                _, seconds = timed(translator.translate_batch, source, target, texts, profile)
+                latencies.append(seconds)
+                texts_done += len(texts)
+                tokens_done += count_tokens(translator, f"{source}-{target}", texts)
+            elapsed = sum(latencies)
+            results.append({
+                "length": name,
+                "batch_size": size,
+                "latency": summarize(latencies),
+                "texts_per_second": texts_done / elapsed,
+                "source_tokens_per_second": tokens_done / elapsed,
+            })
+    return results
+
+
+def bench_endpoints(translator, source, target, lengths, batch_sizes, profile, runs, rng):
+    """Latency of the Flask endpoints (request parsing and JSON included)"""
+    import app as app_module
+    app_module.translator = translator
+    client = app_module.app.test_client()
+
+    def post(path, payload):
+        response = client.post(path, json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} answered {response.status_code}: {response.get_data(as_text=True)}")
+
+    results = {"/translate": {}, "/translate/batch": []}
+    for name in lengths:
+        latencies = []
+        for text in make_texts(runs, LENGTHS[name], rng):
+            payload = {"source": source, "target": target, "text": text, "profile": profile}
+            latencies.append(timed(post, "/translate", payload)[1])
+        results["/translate"][name] = summarize(latencies)
+
+        for size in batch_sizes:
+            latencies = []
+            for _ in range(runs):
+                payload = {"source": source, "target": target, "texts": make_texts(size, LENGTHS[name], rng), "profile": profile}
+                latencies.append(timed(post, "/translate/batch", payload)[1])
+            results["/translate/batch"].append({
+                "length": name,
+                "batch_size": size,
+                "latency": summarize(latencies),
+                "texts_per_second": size * runs / sum(latencies),
+            })
+    return results
+
+
+def main():
+    args = parser.parse_args()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',') if size.strip()]
+    lengths = [name.strip() for name in args.lengths.split(',') if name.strip()]
+    unknown = [name for name in lengths if name not in LENGTHS]
+    if unknown:
+        parser.error(f"unknown lengths: {', '.join(unknown)}")
+    if bool(args.source) != bool(args.target):
+        parser.error("--source and --target go together")
+
+    # Every call reaches the model, without waiting for a micro-batch
+    Config.CACHE_ENABLED = False
+    Config.TRANSLATION_STORE_ENABLED = False
+    Config.MICRO_BATCH_ENABLED = False
+
+    temp_dir = None
+    if args.source:
+        source, target, models_dir = args.source, args.target, args.models_dir
+    else:
+        from benchmarks.tiny_model import build_tiny_model
+        temp_dir = tempfile.TemporaryDirectory()
+        source, target, models_dir = "xx", "yy", temp_dir.name
+        build_tiny_model(models_dir, source, target)
+    route = f"{source}-{target}"
+
+    try:
+        from translator import Translator
+        load = bench_load(models_dir, route, args.runs)
+
+        translator = Translator(models_dir)
+        translator.warmup([route])
+        model, _ = translator.models[route]
+        rng = random.Random(0)
+
+        started = time.perf_counter()
+        results = {
+            "environment": {
+                "python": platform.python_version(),
+                "torch": torch.__version__,
+                "transformers": transformers.__version__,
+                "torch_threads": torch.get_num_threads(),
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+            },
+            "model": {
+                "route": route,
+                "tiny": temp_dir is not None,
+                "parameters": sum(p.numel() for p in model.parameters()) if hasattr(model, "parameters") else None,
+                "engine": translator.get_engine(route),
+                "precision": translator.get_precision(route),
+            },
+            "settings": {
+                "profile": args.profile or Config.GENERATION_PROFILE,
+                "runs": args.runs,
+                "batch_sizes": batch_sizes,
+                "lengths": {name: LENGTHS[name] for name in lengths},
+            },
+            "load": load,
+            "translate": bench_translate(translator, source, target, lengths, args.profile, args.runs, rng),
+            "translate_batch": bench_batch(translator, source, target, lengths, batch_sizes, args.profile, args.runs, rng),
+            "endpoints": bench_endpoints(translator, source, target, lengths, batch_sizes, args.profile, args.runs, rng),
+        }
+        results["total_seconds"] = time.perf_counter() - started
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Build a small, randomly initialized Marian model for offline benchmarks.
+
+The model directory has the same layout as a downloaded opus-mt model
+(data/opus-mt-xx-yy with pytorch_model.bin, source.spm, target.spm,
+vocab.json, ...), so the Translator loads it like any other route. The
+SentencePiece tokenizer is trained on a built-in corpus and the weights are
+random: translations are gibberish and always run to max_length tokens, so
+measured costs are an upper bound for the configured size.
+
+Usage:
+    python -m benchmarks.tiny_model [--models-dir data] [--source xx] [--target yy] [--d-model 64]
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+
+import sentencepiece as spm
+import torch
+from transformers import GenerationConfig
+from transformers.models.marian import MarianConfig, MarianMTModel
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import SAMPLE_SENTENCES
+from config import MODEL_PATH
+from translator import WARMUP_TEXTS
+from weights import PICKLE_FILENAME, SAFETENSORS_FILENAME
+
+# Marian reserves these ids: eos, unknown and pad (which is also the
+# decoder start token)
+SPECIAL_TOKENS = {"</s>": 0, "<unk>": 1, "<pad>": 2}
+
+CORPUS = SAMPLE_SENTENCES + WARMUP_TEXTS + [
+    "The quick brown fox jumps over the lazy dog.",
+    "Numbers like 42, 2025 and 3.14 appear in reports, invoices and tables.",
+    "Questions, answers; quotes \"like this\" and (parentheses) are common too!",
+]
+
+parser = argparse.ArgumentParser(description='Build a tiny random Marian model for benchmarks')
+parser.add_argument('--models-dir', type=str, default=MODEL_PATH, help='models directory')
+parser.add_argument('--source', type=str, default='xx', help='source language code of the route')
+parser.add_argument('--target', type=str, default='yy', help='target language code of the route')
+parser.add_argument('--d-model', type=int, default=64, help='hidden size')
+parser.add_argument('--layers', type=int, default=2, help='encoder and decoder layers')
+parser.add_argument('--max-length', type=int, default=64, help='generation length limit')
+parser.add_argument('--num-beams', type=int, default=4, help='beam size of the generation config')
+parser.add_argument('--weights', type=str, choices=('bin', 'safetensors'), default='bin',
+                    help='weights file format (downloaded opus-mt models ship pytorch_model.bin)')
+
+
+def _train_tokenizer(vocab_size: int) -> bytes:
+    """Train a SentencePiece model on the built-in corpus"""
+    model = io.BytesIO()
+    spm.SentencePieceTrainer.train(
+        sentence_iterator=iter(CORPUS * 20), model_writer=model,
+        vocab_size=vocab_size, hard_vocab_limit=False, character_coverage=1.0,
+        model_type="unigram", minloglevel=2
+    )
+    return model.getvalue()
+
+
+def build_tiny_model(models_dir: str, source: str = "xx", target: str = "yy", d_model: int = 64,
+                     layers: int = 2, max_length: int = 64, num_beams: int = 4,
+                     vocab_size: int = 256, weights: str = "bin", seed: int = 0) -> str:
+    """
+    Write a random Marian model and its tokenizer files.
+
+    Args:
+        models_dir (str): Models directory, the model goes to opus-mt-{source}-{target}
+        source (str): Source language code of the route
+        target (str): Target language code of the route
+        d_model (int): Hidden size (attention heads are d_model / 16)
+        layers (int): Encoder and decoder layers
+        max_length (int): Generation length limit (including the start token)
+        num_beams (int): Beam size of the generation config
+        vocab_size (int): SentencePiece vocabulary size (a soft limit)
+        weights (str): 'bin' (pytorch_model.bin, like a download) or 'safetensors'
+        seed (int): Seed for the random weights
+
+    Returns:
+        Path of the model directory
+    """
+    path = os.path.join(models_dir, f"opus-mt-{source}-{target}")
+    os.makedirs(path, exist_ok=True)
+
+    # Source and target share one SentencePiece model and vocabulary
+    sentencepiece_model = _train_tokenizer(vocab_size)
+    for filename in ("source.spm", "target.spm"):
+        with open(os.path.join(path, filename), "wb") as f:
+            f.write(sentencepiece_model)
+    processor = spm.SentencePieceProcessor(model_proto=sentencepiece_model)
+    vocab = dict(SPECIAL_TOKENS)
+    for piece in (processor.id_to_piece(i) for i in range(processor.get_piece_size())):
+        vocab.setdefault(piece, len(vocab))
+    with open(os.path.join(path, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(vocab, f, ensure_ascii=False)
+    with open(os.path.join(path, "tokenizer_config.json"), "w", encoding="utf-8") as f:
+        json.dump({"source_lang": source, "target_lang": target}, f)
+
+    pad, eos = SPECIAL_TOKENS["<pad>"], SPECIAL_TOKENS["</s>"]
+    config = MarianConfig(
+        vocab_size=len(vocab), d_model=d_model, encoder_layers=layers, decoder_layers=layers,
+        encoder_attention_heads=max(1, d_model // 16), decoder_attention_heads=max(1, d_model // 16),
+        encoder_ffn_dim=d_model * 4, decoder_ffn_dim=d_model * 4, max_position_embeddings=512,
+        pad_token_id=pad, eos_token_id=eos, decoder_start_token_id=pad, forced_eos_token_id=eos
+    )
+    torch.manual_seed(seed)
+    model = MarianMTModel(config)
+    model.generation_config = GenerationConfig(
+        num_beams=num_beams, max_length=max_length, pad_token_id=pad, eos_token_id=eos,
+        decoder_start_token_id=pad, forced_eos_token_id=eos, bad_words_ids=[[pad]]
+    )
+    model.save_pretrained(path)
+    if weights == "bin":
+        # save_pretrained always writes safetensors
+        torch.save(model.state_dict(), os.path.join(path, PICKLE_FILENAME))
+        os.remove(os.path.join(path, SAFETENSORS_FILENAME))
+    return path
+
+
+def main():
+    args = parser.parse_args()
+    path = build_tiny_model(args.models_dir, args.source, args.target, d_model=args.d_model,
+                            layers=args.layers, max_length=args.max_length, num_beams=args.num_beams,
+                            weights=args.weights)
+    print(f"Tiny model written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+In-memory translation cache.
+
+Translations are kept in an LRU map keyed by route, normalized source text
+and generation settings. The cache is bounded both by number of entries and
+by an estimate of the memory used by the stored strings.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+CacheKey = Tuple[str, str, Hashable]
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache lookups (trim and collapse whitespace)"""
+    return " ".join(text.split())
+
+
+class TranslationCache():
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of cached translations
+            max_bytes (int): Maximum estimated size of the cached strings
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self._entries: "OrderedDict[CacheKey, Tuple[str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(route: str, text: str, settings: Hashable = None) -> CacheKey:
+        """Build the cache key for a text"""
+        return (route, normalize_text(text), settings)
+
+    def get(self, route: str, text: str, settings: Hashable = None) -> Optional[str]:
+        """
+        Look up a cached translation.
+
+        Returns:
+            The cached translation, or None on a miss
+        """
+        return self.get_many(route, [text], settings)[0]
+
+    def get_many(self, route: str, texts: List[str], settings: Hashable = None) -> List[Optional[str]]:
+        """
+        Look up several texts for the same route at once.
+
+        Returns:
+            List with the cached translation or None for each text
+        """
+        keys = [self.make_key(route, text, settings) for text in texts]
+        results: List[Optional[str]] = []
+        with self._lock:
+            stats = self._route_stats(route)
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    stats["misses"] += 1
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    stats["hits"] += 1
+                    results.append(entry[0])
+        return results
+
+    def put(self, route: str, text: str, translation: str, settings: Hashable = None):
+        """Store a translation, evicting least recently used entries if needed"""
+        key = self.make_key(route, text, settings)
+        size = sys.getsizeof(key[1]) + sys.getsizeof(translation)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (translation, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._route_stats(evicted_key[0])["evictions"] += 1
+
+    def put_many(self, route: str, texts: List[str], translations: List[str], settings: Hashable = None):
+        """Store several translations for the same route"""
+        for text, translation in zip(texts, translations):
+            self.put(route, text, translation, settings)
+
+    def invalidate_route(self, route: str) -> int:
+        """
+        Remove every cached translation for a route.
+
+        Returns:
+            Number of removed entries
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == route]
+            for key in keys:
+                self._bytes -= self._entries.pop(key)[1]
+        return len(keys)
+
+    def clear(self):
+        """Remove all cached translations (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Get cache size and per-route hit/miss/eviction counters"""
+        with self._lock:
+            routes = {route: dict(counters) for route, counters in self._stats.items()}
+            return {
+                "enabled": True,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "routes": routes
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _route_stats(self, route: str) -> Dict[str, int]:
+        stats = self._stats.get(route)
+        if stats is None:
+            stats = {"hits": 0, "misses": 0, "evictions": 0}
+            self._stats[route] = stats
+        return stats
@@ -0,0 +1,97 @@
+"""
+Workload capture.
+
+Records the shape of translation requests (endpoint, route, text lengths,
+batch size, profile, arrival time, status and duration) to a JSON lines
+file, without any text content, so production traffic can be replayed
+against other server configurations with benchmarks.replay.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+# Endpoints benchmarks.replay can drive
+CAPTURED_ENDPOINTS = ("/translate", "/translate/batch")
+
+
+def request_shape(endpoint: str, payload: Dict) -> Optional[Dict]:
+    """
+    Describe a translation request without its content.
+
+    Args:
+        endpoint (str): URL rule of the request, e.g. '/translate'
+        payload (Dict): Parsed JSON body
+
+    Returns:
+        Dictionary with the route, text lengths (characters), batch size and
+        profile, or None if the request is not captured
+    """
+    if endpoint not in CAPTURED_ENDPOINTS or not isinstance(payload, dict):
+        return None
+    texts = payload.get("texts") if endpoint == "/translate/batch" else [payload.get("text")]
+    if not isinstance(texts, list):
+        texts = []
+    lengths: List[int] = [len(text) if isinstance(text, str) else 0 for text in texts]
+    return {
+        "endpoint": endpoint,
+        "route": f"{payload.get('source')}-{payload.get('target')}",
+        "lengths": lengths,
+        "batch_size": len(lengths),
+        "profile": payload.get("profile"),
+    }
+
+
+class WorkloadRecorder():
+    def __init__(self, path: str):
+        """
+        Initialize the recorder.
+
+        Args:
+            path (str): JSON lines file, appended to. Each record is written
+                with a single append, so several worker processes can share it
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._lock = threading.Lock()
+
+    def record(self, shape: Dict, arrived: float, status: int, seconds: float):
+        """
+        Append one request.
+
+        Args:
+            shape (Dict): Request shape as returned by request_shape
+            arrived (float): Arrival time (seconds since the epoch)
+            status (int): HTTP status of the response
+            seconds (float): Time to produce the response
+        """
+        record = dict(shape, arrived=round(arrived, 6), status=status, seconds=round(seconds, 6))
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._fd is not None:
+                os.write(self._fd, line)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def read_capture(path: str) -> List[Dict]:
+    """Read captured requests sorted by arrival time, skipping malformed lines"""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get("endpoint") in CAPTURED_ENDPOINTS and "arrived" in record:
+                records.append(record)
+    records.sort(key=lambda record: record["arrived"])
+    return records
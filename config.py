@@ -1,6 +1,48 @@
+import os
+
+
+def _env_bool(name, default):
+    """Read a boolean flag from the environment"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _env_int(name, default):
+    """Read an integer setting from the environment"""
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _env_list(name, default=()):
+    """Read a comma separated list from the environment"""
+    value = os.environ.get(name)
+    if value is None:
+        return list(default)
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _env_mapping(name, default=None):
+    """Read a comma separated list of key:value pairs from the environment"""
+    mapping = dict(default or {})
+    for item in _env_list(name):
+        key, _, value = item.partition(':')
+        if key.strip() and value.strip():
+            mapping[key.strip()] = value.strip()
+    return mapping
+
+
 # Configuration for model downloading
 HUGGINGFACE_S3_BASE_URL = "https://s3.amazonaws.com/models.huggingface.co/bert/Helsinki-NLP"
 FILENAMES = ["config.json", "pytorch_model.bin", "source.spm", "target.spm", "tokenizer_config.json", "vocab.json"]
+# Written into a model directory after every file of a download is in place
+DOWNLOAD_COMPLETE_FILENAME = ".download-complete"
 MODEL_PATH = "data"
 
 
@@ -14,6 +56,117 @@ class Config:
     MAX_TEXT_LENGTH = 5000
     MAX_BATCH_SIZE = 100
     
+    # Pairs without a model are translated through a chain of models that
+    # pivots through intermediate languages (at most PIVOT_MAX_HOPS models)
+    PIVOT_ENABLED = _env_bool('PIVOT_ENABLED', True)
+    PIVOT_MAX_HOPS = _env_int('PIVOT_MAX_HOPS', 2)
+    
+    # Micro-batching of concurrent single-text requests (per route)
+    MICRO_BATCH_ENABLED = _env_bool('MICRO_BATCH_ENABLED', True)
+    MICRO_BATCH_MAX_SIZE = _env_int('MICRO_BATCH_MAX_SIZE', 16)
+    MICRO_BATCH_MAX_WAIT_MS = _env_int('MICRO_BATCH_MAX_WAIT_MS', 5)
+    
+    # /translate/multi: targets per request, and generate calls running at the
+    # same time (one model per thread), shared by all requests
+    MULTI_MAX_TARGETS = _env_int('MULTI_MAX_TARGETS', 20)
+    MULTI_TARGET_WORKERS = _env_int('MULTI_TARGET_WORKERS', 4)
+    
+    # Generation profile of requests that do not name one: 'fast' (greedy,
+    # output length bounded by the source length) or 'quality' (the model's
+    # beam search); see generation.py
+    GENERATION_PROFILE = os.environ.get('GENERATION_PROFILE', 'quality')
+    
+    # Padded source tokens allowed in one generate call of a batch
+    BATCH_TOKEN_BUDGET = _env_int('BATCH_TOKEN_BUDGET', 8192)
+    
+    # Texts longer than this are split into sentences before translation
+    SEGMENT_MAX_CHARS = _env_int('SEGMENT_MAX_CHARS', 400)
+    
+    # Segments translated per generate call after the first streamed one
+    STREAM_CHUNK_SEGMENTS = _env_int('STREAM_CHUNK_SEGMENTS', 4)
+    
+    # In-memory translation cache (LRU, bounded by entries and size)
+    CACHE_ENABLED = _env_bool('CACHE_ENABLED', True)
+    CACHE_SIZE = _env_int('CACHE_SIZE', 1000)
+    CACHE_MAX_MB = _env_int('CACHE_MAX_MB', 64)
+    
+    # Persistent translation memory (SQLite file inside the models directory)
+    TRANSLATION_STORE_ENABLED = _env_bool('TRANSLATION_STORE_ENABLED', False)
+    TRANSLATION_STORE_FILENAME = 'translation_memory.sqlite3'
+    TRANSLATION_STORE_PATH = os.environ.get('TRANSLATION_STORE_PATH', '')
+    TRANSLATION_STORE_MAX_MB = _env_int('TRANSLATION_STORE_MAX_MB', 512)
+    
+    # Model residency (0 disables a limit); pinned routes are never evicted
+    MODEL_MEMORY_BUDGET_MB = _env_int('MODEL_MEMORY_BUDGET_MB', 0)
+    MAX_RESIDENT_MODELS = _env_int('MAX_RESIDENT_MODELS', 0)
+    PINNED_ROUTES = _env_list('PINNED_ROUTES')
+    
+    # Background model loading: loader threads, and seconds a request waits for
+    # a loading model before getting a 503 with Retry-After (0 = never wait)
+    MODEL_LOAD_WORKERS = _env_int('MODEL_LOAD_WORKERS', 1)
+    MODEL_LOAD_WAIT_SECONDS = _env_int('MODEL_LOAD_WAIT_SECONDS', 10)
+    
+    # Routes loaded and warmed up at startup; /ready fails until they are done
+    WARMUP_ROUTES = _env_list('WARMUP_ROUTES')
+    
+    # Workload capture: shape of /translate and /translate/batch requests
+    # (route, text lengths, batch size, arrival time, no content) appended to
+    # this JSON lines file for benchmarks.replay (empty = off)
+    CAPTURE_PATH = os.environ.get('CAPTURE_PATH', '')
+    
+    # Inference worker pool (0 = off, generate runs on the calling thread):
+    # workers, each pinned to its own slice of cores with this many torch
+    # threads (0 = available cores divided among the workers)
+    INFERENCE_WORKERS = _env_int('INFERENCE_WORKERS', 0)
+    INFERENCE_THREADS_PER_WORKER = _env_int('INFERENCE_THREADS_PER_WORKER', 0)
+    INFERENCE_INTEROP_THREADS = _env_int('INFERENCE_INTEROP_THREADS', 1)
+    INFERENCE_PIN_CPUS = _env_bool('INFERENCE_PIN_CPUS', True)
+    
+    # Inference processes (0 = off, models load in the server process): each
+    # route's model is loaded by one process, with this many torch threads
+    # (0 = available cores divided among the processes) and a shared-memory
+    # buffer for the token ids
+    INFERENCE_PROCESSES = _env_int('INFERENCE_PROCESSES', 0)
+    INFERENCE_PROCESS_THREADS = _env_int('INFERENCE_PROCESS_THREADS', 0)
+    INFERENCE_PROCESS_BUFFER_MB = _env_int('INFERENCE_PROCESS_BUFFER_MB', 8)
+    
+    # ASGI server (asgi_app.py): handler threads, requests of a route handled
+    # at the same time, and requests of a route queued or running at most
+    # before answering 429, also answered once the estimated wait is longer
+    # than ASGI_MAX_WAIT_SECONDS (0 = no limit)
+    ASGI_THREADS = _env_int('ASGI_THREADS', 8)
+    ASGI_ROUTE_CONCURRENCY = _env_int('ASGI_ROUTE_CONCURRENCY', 2)
+    ASGI_QUEUE_DEPTH = _env_int('ASGI_QUEUE_DEPTH', 16)
+    ASGI_MAX_WAIT_SECONDS = _env_int('ASGI_MAX_WAIT_SECONDS', 30)
+    
+    # Production server (gunicorn.conf.py): worker processes forked after the
+    # warmup routes are loaded, request threads per worker, and torch threads
+    # per worker (0 = available cores divided among the workers)
+    WEB_WORKERS = _env_int('WEB_WORKERS', 2)
+    WEB_THREADS = _env_int('WEB_THREADS', 4)
+    WEB_TIMEOUT = _env_int('WEB_TIMEOUT', 120)
+    TORCH_THREADS_PER_WORKER = _env_int('TORCH_THREADS_PER_WORKER', 0)
+    
+    # Metrics of the gunicorn workers: directory where each worker writes a
+    # snapshot of its values every METRICS_FLUSH_SECONDS, merged by /metrics
+    # (empty = a new temporary directory per server start)
+    METRICS_DIR = os.environ.get('METRICS_DIR', '')
+    METRICS_FLUSH_SECONDS = _env_int('METRICS_FLUSH_SECONDS', 5)
+    
+    # Inference precision: 'fp32' or 'int8' (dynamic quantization for CPU),
+    # with per-route overrides such as ROUTE_PRECISION=en-es:int8,es-en:fp32
+    MODEL_PRECISION = os.environ.get('MODEL_PRECISION', 'fp32')
+    ROUTE_PRECISION = _env_mapping('ROUTE_PRECISION')
+    
+    # Inference engine: 'torch' (transformers) or 'onnx' (ONNX Runtime, exported
+    # once next to the model), with per-route overrides like ROUTE_ENGINES=en-es:onnx
+    MODEL_ENGINE = os.environ.get('MODEL_ENGINE', 'torch')
+    ROUTE_ENGINES = _env_mapping('ROUTE_ENGINES')
+    
+    # Convert pytorch_model.bin to memory-mapped model.safetensors: 'off',
+    # 'download' (right after a download) or 'lazy' (on first load)
+    SAFETENSORS_CONVERSION = os.environ.get('SAFETENSORS_CONVERSION', 'off')
+    
     # Supported models configuration
     SUPPORTED_MODELS = {
         'en-es': {
@@ -61,3 +214,12 @@ class Config:
     # Download configuration
     HUGGINGFACE_S3_BASE_URL = HUGGINGFACE_S3_BASE_URL
     FILENAMES = FILENAMES
+    DOWNLOAD_COMPLETE_FILENAME = DOWNLOAD_COMPLETE_FILENAME
+    
+    # Model downloads running at the same time (background jobs)
+    MAX_CONCURRENT_DOWNLOADS = _env_int('MAX_CONCURRENT_DOWNLOADS', 2)
+
+    # Files of one model fetched in parallel, and retries (resumed with HTTP
+    # Range requests) after a dropped connection
+    DOWNLOAD_WORKERS = _env_int('DOWNLOAD_WORKERS', 4)
+    DOWNLOAD_RETRIES = _env_int('DOWNLOAD_RETRIES', 3)
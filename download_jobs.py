@@ -0,0 +1,155 @@
+"""
+Background model downloads.
+
+Downloads run as jobs on a bounded thread pool instead of blocking a request
+thread. Each job records the bytes downloaded per file so clients can poll
+its progress, and a request for a pair that is already queued or
+downloading returns the existing job instead of starting a second one.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Jobs in these states block a new download of the same pair
+ACTIVE_STATES = ("queued", "running")
+
+
+class DownloadJob():
+    def __init__(self, source: str, target: str):
+        """
+        Initialize a queued download job.
+
+        Args:
+            source (str): Source language code
+            target (str): Target language code
+        """
+        self.id = uuid.uuid4().hex
+        self.source = source
+        self.target = target
+        self.state = "queued"
+        self.error: Optional[str] = None
+        self.files: Dict[str, Dict[str, int]] = {}
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        return f"{self.source}-{self.target}"
+
+    def update(self, filename: str, bytes_done: int, total: int):
+        """Record the progress of one file"""
+        with self._lock:
+            self.files[filename] = {"bytes_done": bytes_done, "total": total}
+
+    def to_dict(self) -> Dict:
+        """Get the job status as a JSON-serializable dictionary"""
+        with self._lock:
+            files = {name: dict(progress) for name, progress in self.files.items()}
+        return {
+            "job_id": self.id,
+            "source": self.source,
+            "target": self.target,
+            "state": self.state,
+            "error": self.error,
+            "files": files,
+            "bytes_done": sum(progress["bytes_done"] for progress in files.values()),
+            "bytes_total": sum(progress["total"] for progress in files.values()),
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished
+        }
+
+
+class DownloadJobManager():
+    def __init__(self, download: Callable, max_concurrent: int = 2,
+                 on_complete: Optional[Callable] = None, history: int = 100):
+        """
+        Initialize the job manager.
+
+        Args:
+            download (Callable): Called as download(source, target, progress)
+                where progress(filename, bytes_done, total); raises on failure
+            max_concurrent (int): Downloads running at the same time
+            on_complete (Callable): Called with the job after a successful download
+            history (int): Finished jobs kept for status queries
+        """
+        self.download = download
+        self.on_complete = on_complete
+        self.history = max(1, int(history))
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(max_concurrent)),
+            thread_name_prefix="model-download"
+        )
+        self._jobs: "OrderedDict[str, DownloadJob]" = OrderedDict()
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, source: str, target: str) -> Tuple[DownloadJob, bool]:
+        """
+        Queue a download, or return the active job for the same pair.
+
+        Args:
+            source (str): Source language code
+            target (str): Target language code
+
+        Returns:
+            Tuple of (job, created) where created is False for a duplicate request
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.source == source and job.target == target and job.state in ACTIVE_STATES:
+                    return job, False
+
+            job = DownloadJob(source, target)
+            self._jobs[job.id] = job
+            self._prune()
+            self._futures[job.id] = self._executor.submit(self._run, job)
+            return job, True
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        """Get a job by ID, or None if it is unknown or was pruned"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict]:
+        """Get the status of every known job, oldest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict() for job in jobs]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[DownloadJob]:
+        """Block until a job has finished (or the timeout expires)"""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout)
+        return self.get(job_id)
+
+    def _run(self, job: DownloadJob):
+        job.state = "running"
+        job.started = time.time()
+        try:
+            self.download(job.source, job.target, job.update)
+            if self.on_complete is not None:
+                self.on_complete(job)
+            job.state = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.state = "failed"
+            print(f"Download of {job.route} failed: {str(e)}")
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._futures.pop(job.id, None)
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.state not in ACTIVE_STATES]
+        for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
@@ -1,55 +1,301 @@
 import os
-import argparse 
+import sys
+import json
+import shutil
+import hashlib
+import time
+import argparse
+import threading
+import contextlib
+import http.client
 import urllib.error
-from urllib.request import urlretrieve
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
 from config import *
 
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where downloads are only de-duplicated per process
+    fcntl = None
+
 parser = argparse.ArgumentParser(description='Download Hugging Face translation models')
 parser.add_argument('--source', type=str, required=True, help='source language code (e.g., en)')
 parser.add_argument('--target', type=str, required=True, help='target language code (e.g., es)')
 
-def download_language_model(source, target):
-    """Download a translation model from Hugging Face S3"""
+# Bytes read from the network between progress reports
+CHUNK_SIZE = 1024 * 1024
+
+# Optional file next to the model files listing their sizes and checksums:
+# {"files": {"pytorch_model.bin": {"size": 312087009, "sha256": "..."}}}
+# A verified copy is written into the model directory
+MANIFEST_FILENAME = "manifest.json"
+
+
+class DownloadError(Exception):
+    """Raised when a model file cannot be downloaded or fails verification"""
+
+
+@contextlib.contextmanager
+def staging_lock(models_dir, model):
+    """
+    Hold an exclusive lock on a model's staging directory, shared by every
+    process (gunicorn workers, the command line tool) using the same models
+    directory. The lock file sits next to the staging directory, which is
+    renamed into place or removed while the lock is held.
+
+    Raises:
+        DownloadError: If another process is already downloading the model
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(models_dir, f".{model}.lock"), 'a') as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            raise DownloadError(f"Model {model} is already being downloaded by another process")
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _total_size(response, offset):
+    """Full size of the remote file from Content-Range or Content-Length (0 if unknown)"""
+    content_range = response.headers.get('Content-Range')
+    if content_range and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        return int(total) if total.isdigit() else 0
+    length = int(response.headers.get('Content-Length') or 0)
+    return offset + length if length else 0
+
+
+def fetch_manifest(model_url):
+    """
+    Fetch the manifest published next to a model's files.
+
+    Args:
+        model_url (str): Base URL of the model files
+
+    Returns:
+        Dictionary of filename -> {size, sha256}, empty if there is no manifest
+    """
+    try:
+        with urlopen(f"{model_url}/{MANIFEST_FILENAME}") as response:
+            return json.loads(response.read().decode('utf-8')).get('files', {})
+    except urllib.error.HTTPError as e:
+        if e.code == 404:
+            return {}
+        raise
+    except urllib.error.URLError as e:
+        # file:// base URLs report a missing manifest this way
+        if isinstance(e.reason, FileNotFoundError):
+            return {}
+        raise
+
+
+def download_file(url, part_path, progress=None, expected=None, retries=None, cancel=None):
+    """
+    Download a file to part_path, resuming whatever a previous attempt left there.
+
+    Interrupted transfers are resumed with an HTTP Range request, falling back
+    to a full download if the server ignores the range.
+
+    Args:
+        url (str): File URL
+        part_path (str): Temporary destination path
+        progress (callable): Called as progress(bytes_done, total) after every
+            chunk; total is 0 when the server does not report the size
+        expected (dict): Manifest entry with the expected 'size' and 'sha256'
+        retries (int): Extra attempts after a dropped connection
+        cancel (threading.Event): Stops the download when set
+
+    Returns:
+        Dictionary with the verified 'size' and 'sha256' of the file
+
+    Raises:
+        DownloadError: If the file cannot be downloaded or fails verification
+    """
+    expected = expected or {}
+    retries = Config.DOWNLOAD_RETRIES if retries is None else retries
+    total = 0
+
+    for attempt in range(retries + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        try:
+            with urlopen(Request(url, headers=headers)) as response:
+                if offset and getattr(response, 'status', None) != 206:
+                    # Range not supported: start over
+                    offset = 0
+                total = _total_size(response, offset)
+                with open(part_path, 'ab' if offset else 'wb') as output:
+                    done = offset
+                    if progress:
+                        progress(done, total)
+                    while True:
+                        if cancel is not None and cancel.is_set():
+                            raise DownloadError(f"Download of {os.path.basename(url)} cancelled")
+                        chunk = response.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        output.write(chunk)
+                        done += len(chunk)
+                        if progress:
+                            progress(done, total)
+            if total and os.path.getsize(part_path) < total:
+                raise http.client.IncompleteRead(b'', total - os.path.getsize(part_path))
+            break
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                # The previous attempt already has the whole file
+                total = offset
+                break
+            raise DownloadError(f"Error downloading {os.path.basename(url)}: {e}")
+        except (urllib.error.URLError, http.client.HTTPException, ConnectionError, TimeoutError) as e:
+            if attempt == retries:
+                raise DownloadError(f"Error downloading {os.path.basename(url)}: {e}")
+            print(f"Retrying {os.path.basename(url)} from byte {os.path.getsize(part_path) if os.path.exists(part_path) else 0}: {e}")
+
+    size = os.path.getsize(part_path)
+    sha256 = _sha256(part_path)
+    mismatch = None
+    if expected.get('size') is not None and size != expected['size']:
+        mismatch = f"size {size} != {expected['size']}"
+    elif total and size != total:
+        mismatch = f"size {size} != {total}"
+    elif expected.get('sha256') and sha256 != expected['sha256'].lower():
+        mismatch = "sha256 mismatch"
+    if mismatch:
+        # A corrupt partial file must not be resumed
+        os.remove(part_path)
+        raise DownloadError(f"Verification failed for {os.path.basename(url)}: {mismatch}")
+    return {'size': size, 'sha256': sha256}
+
+
+def download_language_model(source, target, progress=None, models_dir=MODEL_PATH):
+    """
+    Download a translation model from Hugging Face S3.
+
+    The files are fetched in parallel into a hidden staging directory and
+    moved into data/opus-mt-{source}-{target} only once all of them are
+    verified, so an existing model is never left half replaced. Partial
+    files are kept after a failure and resumed by the next attempt.
+
+    Args:
+        source (str): Source language code
+        target (str): Target language code
+        progress (callable): Called as progress(filename, bytes_done, total)
+            while each file downloads
+        models_dir (str): Directory where the opus-mt models are stored
+
+    Raises:
+        DownloadError: If a file could not be downloaded or verified, or
+            another process is already downloading the same model
+    """
     model = f"opus-mt-{source}-{target}"
-    model_dir = os.path.join(MODEL_PATH, model)
-    
+    os.makedirs(models_dir, exist_ok=True)
+    with staging_lock(models_dir, model):
+        _download_staged(source, target, model, progress, models_dir)
+
+
+def _download_staged(source, target, model, progress, models_dir):
+    """Download into the staging directory and move the model into place (holding its lock)"""
+    model_url = f"{HUGGINGFACE_S3_BASE_URL}/{model}"
+    model_dir = os.path.join(models_dir, model)
+    staging_dir = os.path.join(models_dir, f".{model}.partial")
+
     print(f">>> Downloading data for {source} to {target} model...")
-    
-    # Create model directory if it doesn't exist
-    os.makedirs(model_dir, exist_ok=True)
-    
-    success = True
-    for filename in FILENAMES:
-        try:            # Construct the URL properly
-            file_url = f"{HUGGINGFACE_S3_BASE_URL}/{model}/{filename}"
-            local_path = os.path.join(model_dir, filename)
-            
-            print(f"Downloading {filename}...")
-            print(f"URL: {file_url}")
-            
-            urlretrieve(file_url, local_path)
-            print(f"[OK] {filename} downloaded successfully")
-            
-        except urllib.error.HTTPError as e:
-            print(f"[ERROR] Error downloading {filename}: {e}")
-            print("Error retrieving model from url. Please confirm model exists.")
-            success = False
-            break
+    os.makedirs(staging_dir, exist_ok=True)
+
+    try:
+        manifest = fetch_manifest(model_url)
+    except Exception as e:
+        raise DownloadError(f"Error downloading {MANIFEST_FILENAME}: {e}")
+
+    # The first failure cancels the other downloads
+    cancel = threading.Event()
+
+    def fetch(filename):
+        file_url = f"{model_url}/{filename}"
+        print(f"Downloading {filename}...")
+        print(f"URL: {file_url}")
+        file_progress = None
+        if progress:
+            file_progress = lambda done, total: progress(filename, done, total)
+        try:
+            result = download_file(file_url, os.path.join(staging_dir, f"{filename}.part"),
+                                   file_progress, manifest.get(filename), cancel=cancel)
+        except Exception:
+            cancel.set()
+            raise
+        print(f"[OK] {filename} downloaded successfully")
+        return result
+
+    workers = max(1, min(Config.DOWNLOAD_WORKERS, len(FILENAMES)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="file-download") as pool:
+        futures = {filename: pool.submit(fetch, filename) for filename in FILENAMES}
+
+    verified = {}
+    errors = []
+    for filename, future in futures.items():
+        try:
+            verified[filename] = future.result()
         except Exception as e:
-            print(f"[ERROR] Unexpected error downloading {filename}: {e}")
-            success = False
-            break
-    
-    if success:
-        print(f"[SUCCESS] Model {model} download complete!")
+            errors.append(e)
+    if errors:
+        # Report the root cause rather than a cancellation it triggered
+        error = next((e for e in errors if 'cancelled' not in str(e)), errors[0])
+        print(f"[ERROR] {error}")
+        if any(os.path.getsize(os.path.join(staging_dir, name)) for name in os.listdir(staging_dir)):
+            print(f"Partial files kept in {staging_dir} to resume the next attempt")
+        else:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        raise DownloadError(str(error))
+
+    for filename in FILENAMES:
+        os.replace(os.path.join(staging_dir, f"{filename}.part"), os.path.join(staging_dir, filename))
+    with open(os.path.join(staging_dir, MANIFEST_FILENAME), 'w') as f:
+        json.dump({'files': verified}, f, indent=2)
+
+    # Imported here so the command line tool does not load torch to start
+    from weights import SAFETENSORS_FILENAME, ensure_safetensors
+    if Config.SAFETENSORS_CONVERSION == 'download':
+        ensure_safetensors(staging_dir)
+    converted = os.path.exists(os.path.join(staging_dir, SAFETENSORS_FILENAME))
+
+    if not os.path.exists(model_dir):
+        # A new model appears in one atomic rename
+        os.rename(staging_dir, model_dir)
     else:
-        # Clean up incomplete download
-        if os.path.exists(model_dir):
-            import shutil
-            shutil.rmtree(model_dir)
-            print(f"Cleaned up incomplete download directory: {model_dir}")
+        # Replace an existing model file by file, each rename being atomic
+        for filename in FILENAMES + [MANIFEST_FILENAME] + ([SAFETENSORS_FILENAME] if converted else []):
+            os.replace(os.path.join(staging_dir, filename), os.path.join(model_dir, filename))
+        stale = os.path.join(model_dir, SAFETENSORS_FILENAME)
+        if not converted and os.path.exists(stale):
+            # from_pretrained prefers safetensors, which would still hold the old weights
+            os.remove(stale)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    # Written last: server workers reload the model only once this changes,
+    # never while the files above are still being replaced
+    with open(os.path.join(model_dir, DOWNLOAD_COMPLETE_FILENAME), 'w') as f:
+        f.write(f"{time.time()}\n")
+
+    print(f"[SUCCESS] Model {model} download complete!")
 
 if __name__ == "__main__":
     args = parser.parse_args()
-    download_language_model(args.source, args.target)
+    try:
+        download_language_model(args.source, args.target)
+    except DownloadError:
+        sys.exit(1)
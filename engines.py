@@ -0,0 +1,425 @@
+"""
+Inference engines for Marian models.
+
+An engine is anything with the MarianMTModel.generate interface: it takes
+padded input_ids and attention_mask tensors and returns generated token ids.
+The 'torch' engine is the transformers model itself. The 'onnx' engine runs
+an exported encoder and a single-step decoder with ONNX Runtime and keeps
+the decoder keys and values in a cache between steps, with a greedy or beam
+search loop.
+
+The ONNX export is a one-time step: the graphs are written to an onnx/
+folder next to the model files and re-exported only when the weights change.
+"""
+
+import inspect
+import os
+from typing import List, Optional
+
+import numpy as np
+import torch
+from transformers import GenerationConfig
+from transformers.models.marian import MarianMTModel
+
+from residency import weights_mtime
+
+try:
+    import onnxruntime
+except ImportError:  # pragma: no cover - optional dependency
+    onnxruntime = None
+
+ENGINES = ("torch", "onnx")
+ONNX_DIRNAME = "onnx"
+ENCODER_FILENAME = "encoder.onnx"
+DECODER_FILENAME = "decoder_step.onnx"
+
+
+def _split_heads(states: torch.Tensor, attention) -> torch.Tensor:
+    """[batch, length, dim] -> [batch, heads, length, head_dim]"""
+    batch, length, _ = states.shape
+    return states.view(batch, length, attention.num_heads, attention.head_dim).transpose(1, 2)
+
+
+def _attend(attention, hidden: torch.Tensor, keys: torch.Tensor, values: torch.Tensor,
+            bias: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """Scaled dot-product attention of hidden over precomputed keys and values"""
+    batch, length, dim = hidden.shape
+    query = _split_heads(attention.q_proj(hidden), attention)
+    scores = torch.matmul(query, keys.transpose(2, 3)) * attention.scaling
+    if bias is not None:
+        scores = scores + bias
+    output = torch.matmul(torch.softmax(scores, dim=-1), values)
+    return attention.out_proj(output.transpose(1, 2).reshape(batch, length, dim))
+
+
+def _mask_bias(attention_mask: torch.Tensor) -> torch.Tensor:
+    """[batch, source] mask of 1/0 -> additive [batch, 1, 1, source] bias"""
+    mask = attention_mask[:, None, None, :].to(torch.float32)
+    return (1.0 - mask) * torch.finfo(torch.float32).min
+
+
+class _EncoderGraph(torch.nn.Module):
+    """Encoder plus the cross-attention keys and values of every decoder layer"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.model.encoder
+        self.decoder_layers = model.model.decoder.layers
+
+    def forward(self, input_ids, attention_mask):
+        encoder = self.encoder
+        length = input_ids.shape[1]
+        hidden = encoder.embed_tokens(input_ids) * encoder.embed_scale + encoder.embed_positions.weight[:length]
+        bias = _mask_bias(attention_mask)
+
+        for layer in encoder.layers:
+            attention = layer.self_attn
+            keys = _split_heads(attention.k_proj(hidden), attention)
+            values = _split_heads(attention.v_proj(hidden), attention)
+            hidden = layer.self_attn_layer_norm(hidden + _attend(attention, hidden, keys, values, bias))
+            feed_forward = layer.fc2(layer.activation_fn(layer.fc1(hidden)))
+            hidden = layer.final_layer_norm(hidden + feed_forward)
+
+        cross_keys, cross_values = [], []
+        for layer in self.decoder_layers:
+            attention = layer.encoder_attn
+            cross_keys.append(_split_heads(attention.k_proj(hidden), attention))
+            cross_values.append(_split_heads(attention.v_proj(hidden), attention))
+        return torch.stack(cross_keys), torch.stack(cross_values)
+
+
+class _DecoderStepGraph(torch.nn.Module):
+    """One decoder step that appends to and returns the self-attention cache"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.decoder = model.model.decoder
+        self.lm_head = model.lm_head
+        self.register_buffer("final_logits_bias", model.final_logits_bias.clone())
+
+    def forward(self, input_ids, encoder_attention_mask, past_keys, past_values, cross_keys, cross_values):
+        decoder = self.decoder
+        position = past_keys.shape[3]
+        embeddings = decoder.embed_tokens(input_ids) * decoder.embed_scale
+        hidden = embeddings + decoder.embed_positions.weight[position:position + 1]
+        bias = _mask_bias(encoder_attention_mask)
+
+        present_keys, present_values = [], []
+        for index, layer in enumerate(decoder.layers):
+            attention = layer.self_attn
+            keys = torch.cat([past_keys[index], _split_heads(attention.k_proj(hidden), attention)], dim=2)
+            values = torch.cat([past_values[index], _split_heads(attention.v_proj(hidden), attention)], dim=2)
+            present_keys.append(keys)
+            present_values.append(values)
+            hidden = layer.self_attn_layer_norm(hidden + _attend(attention, hidden, keys, values))
+
+            cross = _attend(layer.encoder_attn, hidden, cross_keys[index], cross_values[index], bias)
+            hidden = layer.encoder_attn_layer_norm(hidden + cross)
+
+            feed_forward = layer.fc2(layer.activation_fn(layer.fc1(hidden)))
+            hidden = layer.final_layer_norm(hidden + feed_forward)
+
+        logits = self.lm_head(hidden)[:, 0] + self.final_logits_bias
+        return logits, torch.stack(present_keys), torch.stack(present_values)
+
+
+def export_onnx(path: str, model=None) -> str:
+    """
+    Export a Marian model to an ONNX encoder and decoder step.
+
+    Args:
+        path (str): Model directory (data/opus-mt-{source}-{target})
+        model: Already loaded MarianMTModel, loaded from path if omitted
+
+    Returns:
+        Directory holding the exported graphs
+    """
+    if model is None:
+        model = MarianMTModel.from_pretrained(path)
+    model.eval()
+
+    config = model.config
+    heads = config.decoder_attention_heads
+    head_dim = config.d_model // heads
+    layers = config.decoder_layers
+
+    output_dir = os.path.join(path, ONNX_DIRNAME)
+    os.makedirs(output_dir, exist_ok=True)
+
+    input_ids = torch.ones((2, 5), dtype=torch.long)
+    attention_mask = torch.ones((2, 5), dtype=torch.long)
+    past = torch.zeros((layers, 2, heads, 3, head_dim))
+    cross = torch.zeros((layers, 2, heads, 5, head_dim))
+    step_ids = torch.ones((2, 1), dtype=torch.long)
+
+    # The wrappers share the model's modules and the exporter restores their
+    # training flag afterwards, so they must be in eval mode too.
+    # Graphs are written to temporary names and renamed into place, so a
+    # crashed export never leaves a half-written model behind
+    exports = [
+        (_EncoderGraph(model).eval(), (input_ids, attention_mask), ENCODER_FILENAME,
+         ["input_ids", "attention_mask"], ["cross_keys", "cross_values"],
+         {"input_ids": {0: "batch", 1: "source"}, "attention_mask": {0: "batch", 1: "source"},
+          "cross_keys": {1: "batch", 3: "source"}, "cross_values": {1: "batch", 3: "source"}}),
+        (_DecoderStepGraph(model).eval(), (step_ids, attention_mask, past, past, cross, cross), DECODER_FILENAME,
+         ["input_ids", "encoder_attention_mask", "past_keys", "past_values", "cross_keys", "cross_values"],
+         ["logits", "present_keys", "present_values"],
+         {"input_ids": {0: "batch"}, "encoder_attention_mask": {0: "batch", 1: "source"},
+          "past_keys": {1: "batch", 3: "past"}, "past_values": {1: "batch", 3: "past"},
+          "cross_keys": {1: "batch", 3: "source"}, "cross_values": {1: "batch", 3: "source"},
+          "logits": {0: "batch"}, "present_keys": {1: "batch", 3: "present"},
+          "present_values": {1: "batch", 3: "present"}}),
+    ]
+    # Recent torch exports with dynamo by default; older releases only have
+    # the TorchScript exporter and no dynamo keyword
+    options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        for graph, args, filename, input_names, output_names, dynamic_axes in exports:
+            target = os.path.join(output_dir, filename)
+            temp_path = f"{target}.tmp"
+            torch.onnx.export(
+                graph, args, temp_path,
+                input_names=input_names,
+                output_names=output_names,
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                **options
+            )
+            os.replace(temp_path, target)
+
+    model.generation_config.save_pretrained(output_dir)
+    return output_dir
+
+
+def onnx_export_is_current(path: str) -> bool:
+    """Check whether an ONNX export exists and is newer than the model weights"""
+    output_dir = os.path.join(path, ONNX_DIRNAME)
+    mtimes = []
+    for filename in (ENCODER_FILENAME, DECODER_FILENAME):
+        target = os.path.join(output_dir, filename)
+        if not os.path.exists(target):
+            return False
+        mtimes.append(os.path.getmtime(target))
+    return min(mtimes) >= weights_mtime(path)
+
+
+class OnnxMarianEngine():
+    def __init__(self, path: str):
+        """
+        Open the ONNX graphs exported for a model.
+
+        Args:
+            path (str): Model directory containing an onnx/ export
+        """
+        if onnxruntime is None:
+            raise RuntimeError("onnxruntime is not installed, install it to use the onnx engine")
+
+        self.path = path
+        output_dir = os.path.join(path, ONNX_DIRNAME)
+        options = onnxruntime.SessionOptions()
+        providers = ["CPUExecutionProvider"]
+        self.encoder = onnxruntime.InferenceSession(
+            os.path.join(output_dir, ENCODER_FILENAME), options, providers=providers)
+        self.decoder = onnxruntime.InferenceSession(
+            os.path.join(output_dir, DECODER_FILENAME), options, providers=providers)
+        self.generation_config = GenerationConfig.from_pretrained(output_dir)
+
+        past = self.decoder.get_inputs()[2].shape
+        self._layers, self._heads, self._head_dim = past[0], past[2], past[4]
+
+    def footprint(self) -> int:
+        """Size of the exported graphs, used by the residency budget"""
+        output_dir = os.path.join(self.path, ONNX_DIRNAME)
+        return sum(
+            os.path.getsize(os.path.join(output_dir, filename))
+            for filename in os.listdir(output_dir)
+            if filename.endswith((".onnx", ".onnx.data"))
+        )
+
+    def generate(self, input_ids=None, attention_mask=None, num_beams: Optional[int] = None,
+                 max_new_tokens: Optional[int] = None, **kwargs) -> torch.Tensor:
+        """
+        Generate translations with the same inputs and output as MarianMTModel.generate.
+
+        Args:
+            input_ids: [batch, source] token ids
+            attention_mask: [batch, source] mask, 1 for real tokens
+            num_beams (int): Beam size, defaults to the model's generation config
+            max_new_tokens (int): Token limit, defaults to the model's max_length
+
+        Returns:
+            [batch, length] tensor of generated ids, starting with the decoder start token
+        """
+        config = self.generation_config
+        input_ids = np.asarray(input_ids, dtype=np.int64)
+        if attention_mask is None:
+            attention_mask = np.ones_like(input_ids)
+        attention_mask = np.asarray(attention_mask, dtype=np.int64)
+
+        num_beams = num_beams or config.num_beams or 1
+        if max_new_tokens is None:
+            # Like transformers: max_length counts the decoder start token,
+            # and 20 new tokens are generated when neither is configured
+            if config.max_new_tokens is not None:
+                max_new_tokens = config.max_new_tokens
+            elif config.max_length is not None:
+                max_new_tokens = config.max_length - 1
+            else:
+                max_new_tokens = 20
+
+        cross_keys, cross_values = self.encoder.run(
+            None, {"input_ids": input_ids, "attention_mask": attention_mask})
+
+        if num_beams > 1:
+            sequences = self._beam_search(attention_mask, cross_keys, cross_values, num_beams, max_new_tokens)
+        else:
+            sequences = self._greedy(attention_mask, cross_keys, cross_values, max_new_tokens)
+        return torch.from_numpy(sequences)
+
+    def _empty_cache(self, batch: int) -> np.ndarray:
+        return np.zeros((self._layers, batch, self._heads, 0, self._head_dim), dtype=np.float32)
+
+    def _step(self, tokens: np.ndarray, attention_mask, past_keys, past_values, cross_keys, cross_values):
+        """Run one decoder step for the last token of each sequence"""
+        logits, past_keys, past_values = self.decoder.run(None, {
+            "input_ids": tokens[:, -1:],
+            "encoder_attention_mask": attention_mask,
+            "past_keys": past_keys,
+            "past_values": past_values,
+            "cross_keys": cross_keys,
+            "cross_values": cross_values
+        })
+        return logits, past_keys, past_values
+
+    def _adjust_logits(self, logits: np.ndarray, length: int, max_length: int) -> np.ndarray:
+        """Apply the bad words and forced end of sequence of the generation config"""
+        config = self.generation_config
+        for words in config.bad_words_ids or []:
+            if len(words) == 1:
+                logits[:, words[0]] = -np.inf
+        if config.forced_eos_token_id is not None and length == max_length - 1:
+            forced = np.full_like(logits, -np.inf)
+            forced[:, config.forced_eos_token_id] = 0
+            logits = forced
+        return logits
+
+    def _greedy(self, attention_mask, cross_keys, cross_values, max_new_tokens: int) -> np.ndarray:
+        config = self.generation_config
+        batch = attention_mask.shape[0]
+        max_length = max_new_tokens + 1
+        tokens = np.full((batch, 1), config.decoder_start_token_id, dtype=np.int64)
+        finished = np.zeros(batch, dtype=bool)
+        past_keys = past_values = self._empty_cache(batch)
+
+        while tokens.shape[1] < max_length:
+            logits, past_keys, past_values = self._step(
+                tokens, attention_mask, past_keys, past_values, cross_keys, cross_values)
+            logits = self._adjust_logits(logits, tokens.shape[1], max_length)
+            next_tokens = logits.argmax(axis=-1)
+            next_tokens[finished] = config.pad_token_id
+            tokens = np.concatenate([tokens, next_tokens[:, None]], axis=1)
+            finished |= next_tokens == config.eos_token_id
+            if finished.all():
+                break
+        return tokens
+
+    def _beam_search(self, attention_mask, cross_keys, cross_values, num_beams: int,
+                     max_new_tokens: int) -> np.ndarray:
+        config = self.generation_config
+        batch = attention_mask.shape[0]
+        max_length = max_new_tokens + 1
+        length_penalty = config.length_penalty if config.length_penalty is not None else 1.0
+        eos = config.eos_token_id
+
+        # Every beam gets its own copy of the encoder outputs
+        attention_mask = np.repeat(attention_mask, num_beams, axis=0)
+        cross_keys = np.repeat(cross_keys, num_beams, axis=1)
+        cross_values = np.repeat(cross_values, num_beams, axis=1)
+
+        tokens = np.full((batch * num_beams, 1), config.decoder_start_token_id, dtype=np.int64)
+        scores = np.zeros((batch, num_beams), dtype=np.float32)
+        scores[:, 1:] = -1e9  # only the first beam is live at the start
+        past_keys = past_values = self._empty_cache(batch * num_beams)
+        hypotheses: List[List] = [[] for _ in range(batch)]
+        done = np.zeros(batch, dtype=bool)
+
+        while tokens.shape[1] < max_length and not done.all():
+            logits, past_keys, past_values = self._step(
+                tokens, attention_mask, past_keys, past_values, cross_keys, cross_values)
+            logits = self._adjust_logits(logits, tokens.shape[1], max_length)
+            log_probs = logits - logits.max(axis=-1, keepdims=True)
+            log_probs = log_probs - np.log(np.exp(log_probs).sum(axis=-1, keepdims=True))
+
+            vocab = log_probs.shape[-1]
+            candidates = (scores.reshape(-1, 1) + log_probs).reshape(batch, num_beams * vocab)
+            top = np.argsort(-candidates, axis=1)[:, :2 * num_beams]
+
+            next_rows, next_tokens, next_scores = [], [], []
+            for b in range(batch):
+                chosen = []
+                for flat in top[b]:
+                    beam, token = divmod(int(flat), vocab)
+                    row = b * num_beams + beam
+                    score = float(candidates[b, flat])
+                    if done[b]:
+                        chosen.append((row, config.pad_token_id, 0.0))
+                    elif token == eos:
+                        sequence = np.append(tokens[row], token)
+                        hypotheses[b].append((score / (sequence.shape[0] - 1) ** length_penalty, sequence))
+                        hypotheses[b].sort(key=lambda h: -h[0])
+                        del hypotheses[b][num_beams:]
+                    else:
+                        chosen.append((row, token, score))
+                    if len(chosen) == num_beams:
+                        break
+
+                if not done[b] and len(hypotheses[b]) == num_beams:
+                    best_running = max(score for _, _, score in chosen)
+                    worst_finished = hypotheses[b][-1][0]
+                    if config.early_stopping is True or \
+                            best_running / tokens.shape[1] ** length_penalty <= worst_finished:
+                        done[b] = True
+
+                for row, token, score in chosen:
+                    next_rows.append(row)
+                    next_tokens.append(token)
+                    next_scores.append(score)
+
+            rows = np.array(next_rows)
+            tokens = np.concatenate([tokens[rows], np.array(next_tokens)[:, None]], axis=1)
+            scores = np.array(next_scores, dtype=np.float32).reshape(batch, num_beams)
+            past_keys = past_keys[:, rows]
+            past_values = past_values[:, rows]
+
+        # Unfinished batches fall back to their running beams
+        for b in range(batch):
+            if not hypotheses[b]:
+                for beam in range(num_beams):
+                    row = b * num_beams + beam
+                    hypotheses[b].append((scores[b, beam] / tokens.shape[1] ** length_penalty, tokens[row]))
+                hypotheses[b].sort(key=lambda h: -h[0])
+
+        best = [hypotheses[b][0][1] for b in range(batch)]
+        width = max(sequence.shape[0] for sequence in best)
+        output = np.full((batch, width), config.pad_token_id, dtype=np.int64)
+        for b, sequence in enumerate(best):
+            output[b, :sequence.shape[0]] = sequence
+        return output
+
+
+def load_onnx_engine(path: str) -> OnnxMarianEngine:
+    """
+    Open the ONNX engine for a model, exporting it first if needed.
+
+    Args:
+        path (str): Model directory (data/opus-mt-{source}-{target})
+
+    Returns:
+        OnnxMarianEngine for the model
+    """
+    if onnxruntime is None:
+        raise RuntimeError("onnxruntime is not installed, install it to use the onnx engine")
+    if not onnx_export_is_current(path):
+        print(f"Exporting {path} to ONNX...")
+        export_onnx(path)
+    return OnnxMarianEngine(path)
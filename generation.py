@@ -0,0 +1,68 @@
+"""
+Named generation profiles.
+
+A profile trades translation quality for latency: 'fast' decodes greedily
+and stops at a token limit relative to the source length, 'quality' keeps
+the beam search settings of each model's own generation config. Requests
+pick a profile by name, and the name is part of the translation cache key.
+"""
+
+import math
+from typing import Dict, Optional
+
+# Settings of each profile: num_beams is passed to generate (None keeps the
+# model's value), and max_new_tokens is length_ratio times the longest source
+# in the batch plus length_margin (no limit beyond the model's own if unset)
+PROFILES: Dict[str, Dict] = {
+    "fast": {"num_beams": 1, "length_ratio": 1.5, "length_margin": 10},
+    "quality": {"num_beams": None, "length_ratio": None, "length_margin": 0},
+}
+
+
+def resolve_profile(name: Optional[str], default: str) -> str:
+    """
+    Get the profile to use for a request.
+
+    Args:
+        name (str): Requested profile, or None for the server default
+        default (str): Server default profile
+
+    Returns:
+        The profile name, falling back to 'quality' for an unknown default
+
+    Raises:
+        ValueError: If an unknown profile was requested
+    """
+    if name is None:
+        return default if default in PROFILES else "quality"
+    if not isinstance(name, str) or name not in PROFILES:
+        raise ValueError(f"Unknown profile '{name}'. Available: {', '.join(PROFILES)}")
+    return name
+
+
+def generate_kwargs(profile: str, source_length: int, max_length: Optional[int] = None) -> Dict[str, int]:
+    """
+    Get the generate() arguments of a profile for a batch.
+
+    Args:
+        profile (str): Profile name
+        source_length (int): Token length of the longest source in the batch
+        max_length (int): The model's own length limit, which counts the
+            decoder start token and is never exceeded
+
+    Returns:
+        Keyword arguments for model.generate
+    """
+    settings = PROFILES[profile]
+    kwargs = {}
+    if settings["num_beams"] is not None:
+        kwargs["num_beams"] = settings["num_beams"]
+    if settings["length_ratio"] is not None:
+        limit = math.ceil(source_length * settings["length_ratio"]) + settings["length_margin"]
+        if max_length:
+            limit = min(limit, max_length - 1)
+        # max_length=None keeps transformers from warning on every call that
+        # both limits are set
+        kwargs["max_new_tokens"] = max(1, limit)
+        kwargs["max_length"] = None
+    return kwargs
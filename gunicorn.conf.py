@@ -0,0 +1,52 @@
+# Production server configuration
+#
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# The master loads and warms up WARMUP_ROUTES before forking the workers, so
+# the model weights are shared between them. Send SIGHUP to the master for a
+# graceful reload: the models are re-read from disk and new workers replace
+# the old ones once these have finished their requests.
+
+import os
+
+import prefork
+from config import Config
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = "gthread"
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = 30
+preload_app = True
+accesslog = "-"
+
+# Runs before the app is imported by the master
+prefork.prepare_master()
+
+
+def when_ready(server):
+    import app
+    prefork.preload(app.translator)
+
+
+def pre_fork(server, worker):
+    prefork.assign_slot(worker, server.WORKERS.values(), server.cfg.workers)
+
+
+def post_fork(server, worker):
+    import app
+    prefork.init_worker(app.translator, server.cfg.workers, worker.cpu_slot)
+
+
+def worker_exit(server, worker):
+    prefork.exit_worker()
+
+
+def on_reload(server):
+    import app
+    prefork.reload_master(app.translator, Config.WARMUP_ROUTES)
+
+
+def on_exit(server):
+    prefork.shutdown_master()
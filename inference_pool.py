@@ -0,0 +1,162 @@
+"""
+Core-aware inference worker pool.
+
+Generate calls from request threads, the micro-batcher and the multi-target
+fan-out are queued to a fixed number of worker threads, and whichever worker
+is free takes the next call. Each worker is pinned to its own slice of
+cores, and its OpenMP team (created by the worker thread on its first
+parallel op) inherits that affinity, so concurrent requests run side by
+side instead of all fighting over every core.
+
+torch's intra-op thread count is process-wide, so it is set once to the
+slice size: with W workers of T threads at most W * T cores are busy.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+import torch
+
+import metrics
+
+
+def process_cpus() -> List[int]:
+    """Get the cores this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_core_slices(cpus: List[int], workers: int, threads: int = 0) -> List[List[int]]:
+    """
+    Split cores into one contiguous slice per worker.
+
+    Args:
+        cpus (List[int]): Available core ids
+        workers (int): Number of workers
+        threads (int): Cores per worker (0 = the cores divided among the workers)
+
+    Returns:
+        Core ids of each worker. With more workers than cores, workers
+        share cores round-robin
+    """
+    workers = max(1, workers)
+    size = threads if threads > 0 else max(1, len(cpus) // workers)
+    slices = []
+    for index in range(workers):
+        start = index * size
+        if start + size <= len(cpus):
+            slices.append(cpus[start:start + size])
+        else:
+            slices.append([cpus[(start + offset) % len(cpus)] for offset in range(min(size, len(cpus)))])
+    return slices
+
+
+class InferencePool():
+    def __init__(self, workers: int, threads_per_worker: int = 0, interop_threads: int = 1,
+                 pin: bool = True, cpus: Optional[List[int]] = None):
+        """
+        Start the worker threads.
+
+        Args:
+            workers (int): Number of worker threads, each runs one generate call at a time
+            threads_per_worker (int): torch intra-op threads and cores of each
+                worker (0 = the available cores divided among the workers)
+            interop_threads (int): torch inter-op threads (only settable
+                before the first inter-op work of the process)
+            pin (bool): Pin each worker to its slice of cores (Linux only)
+            cpus (List[int]): Cores to use (default: this process's affinity)
+        """
+        self.slices = plan_core_slices(cpus or process_cpus(), workers, threads_per_worker)
+        self.threads = len(self.slices[0])
+        self.pin = pin and hasattr(os, "sched_setaffinity")
+        self._queue: "queue.Queue" = queue.Queue()
+        self._busy = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        torch.set_num_threads(self.threads)
+        if interop_threads > 0:
+            try:
+                torch.set_num_interop_threads(interop_threads)
+            except RuntimeError:
+                # Already set, or inter-op work has started in this process
+                pass
+
+        self._workers = [
+            threading.Thread(target=self._worker, args=(cores,), name=f"inference-{index}", daemon=True)
+            for index, cores in enumerate(self.slices)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, function: Callable, *args, route: str = "", **kwargs) -> Future:
+        """
+        Queue a call for the next free worker.
+
+        Args:
+            function (Callable): Called with the remaining arguments
+            route (str): Language route the call is for, the label of its
+                wait in translator_inference_wait_seconds
+
+        Returns:
+            Future resolved with the call's result
+        """
+        if self._closed:
+            raise RuntimeError("InferencePool is closed")
+        future: Future = Future()
+        self._queue.put((time.monotonic(), route, future, function, args, kwargs))
+        return future
+
+    def run(self, function: Callable, *args, route: str = "", **kwargs):
+        """Run a call on a worker and wait for its result"""
+        return self.submit(function, *args, route=route, **kwargs).result()
+
+    def stats(self) -> Dict:
+        """Get the worker layout and current load"""
+        with self._lock:
+            busy = self._busy
+        return {
+            "workers": len(self.slices),
+            "threads_per_worker": self.threads,
+            "pinned": self.pin,
+            "cores": self.slices,
+            "busy": busy,
+            "queued": self._queue.qsize(),
+        }
+
+    def close(self):
+        """Stop the workers once the queued calls are done"""
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put(None)
+
+    def _worker(self, cores: List[int]):
+        if self.pin:
+            try:
+                # Pins the calling thread; its OpenMP threads inherit the mask
+                os.sched_setaffinity(0, cores)
+            except OSError as e:
+                print(f"Could not pin inference worker to cores {cores}: {str(e)}")
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            queued, route, future, function, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            metrics.INFERENCE_WAIT_SECONDS.observe(time.monotonic() - queued, route=route)
+            with self._lock:
+                self._busy += 1
+            try:
+                future.set_result(function(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._busy -= 1
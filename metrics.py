@@ -0,0 +1,341 @@
+"""
+Prometheus metrics.
+
+Counters, gauges and histograms are kept in process memory and rendered in
+the Prometheus text exposition format by the /metrics endpoint. Recording a
+value is a dict lookup and a few additions under a lock, cheap enough to
+leave on in production.
+
+Under gunicorn every worker process keeps its own values and writes a
+snapshot of them to a shared directory every few seconds. The worker that
+answers a scrape merges all snapshots: counters and histograms are summed
+over every process (including workers that have exited, so totals never go
+back), and gauges are reported per live process with a pid label.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LOAD_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    """Escape a label value for the text format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class _Metric():
+    kind = ""
+    # Values that belong to one process and are not summed over processes
+    per_process = False
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Initialize a metric.
+
+        Args:
+            name (str): Metric name, e.g. 'translator_generate_seconds'
+            documentation (str): Help text
+            labelnames (Sequence[str]): Names of the labels every value has
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        """Drop the values of every label combination"""
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self) -> List:
+        """Get a JSON-serializable copy of the values of every label combination"""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, merged: Dict[Tuple, object], key: Tuple, value):
+        """Add the value of another process to merged values"""
+        merged[key] = merged.get(key, 0) + value
+
+    def render(self, values: Optional[Dict[Tuple, object]] = None) -> List[str]:
+        """
+        Get the text format lines of this metric.
+
+        Args:
+            values (Dict): Values merged from every process (default: this
+                process's own values)
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        if values is not None:
+            labelnames = self.labelnames + (("pid",) if self.per_process else ())
+            lines.extend(self._render_values(sorted(values.items()), labelnames))
+            return lines
+        with self._lock:
+            lines.extend(self._render_values(sorted(self._values.items()), self.labelnames))
+        return lines
+
+    def _render_values(self, values, labelnames: Tuple[str, ...]) -> List[str]:
+        return [f"{self.name}{_format_labels(labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        """Increase the counter of a label combination"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        """Get the current value of a label combination"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    per_process = True
+
+    def set(self, value: float, **labels):
+        """Set the gauge of a label combination"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels) -> float:
+        """Get the current value of a label combination"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Initialize a histogram.
+
+        Args:
+            buckets (Sequence[float]): Sorted upper bounds of the buckets
+                (the +Inf bucket is implicit)
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        """Record one observation for a label combination"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def get(self, **labels) -> Tuple[int, float]:
+        """Get the (count, sum) of a label combination"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return (state[2], state[1]) if state is not None else (0, 0.0)
+
+    def snapshot(self) -> List:
+        with self._lock:
+            return [[list(key), [list(counts), total, count]] for key, (counts, total, count) in self._values.items()]
+
+    def merge(self, merged: Dict[Tuple, object], key: Tuple, value):
+        counts, total, count = value
+        state = merged.get(key)
+        if state is None:
+            merged[key] = [list(counts), total, count]
+            return
+        state[0] = [a + b for a, b in zip(state[0], counts)]
+        state[1] += total
+        state[2] += count
+
+    def _render_values(self, values, labelnames: Tuple[str, ...]) -> List[str]:
+        lines = []
+        names = labelnames + ("le",)
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry():
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # Directory of the process snapshots, None when only this process is reported
+        self.directory: Optional[str] = None
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric to the exposition and return it"""
+        self._metrics.append(metric)
+        return metric
+
+    def enable_multiprocess(self, directory: str):
+        """
+        Report the metrics of every process sharing a directory (called by
+        the gunicorn master before it forks the workers). Snapshots left by
+        an earlier run are removed.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for filename in os.listdir(directory):
+            if filename.endswith(".json"):
+                os.remove(os.path.join(directory, filename))
+        self.directory = directory
+
+    def reset(self):
+        """Drop every value, e.g. the ones a forked worker inherited from the master"""
+        for metric in self._metrics:
+            metric.clear()
+
+    def write_snapshot(self):
+        """Write this process's values to the shared directory"""
+        if self.directory is None:
+            return
+        snapshot = {metric.name: metric.snapshot() for metric in self._metrics}
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+
+    def start_flusher(self, interval: float) -> threading.Thread:
+        """Write a snapshot every interval seconds, so scrapes answered by other processes see recent values"""
+        def flush():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_snapshot()
+                except OSError as e:
+                    print(f"Could not write the metrics snapshot: {str(e)}")
+
+        thread = threading.Thread(target=flush, name="metrics-flush", daemon=True)
+        thread.start()
+        return thread
+
+    def _merge_snapshots(self) -> Dict[str, Dict[Tuple, object]]:
+        """Merge the snapshots of every process, this one's being written first"""
+        self.write_snapshot()
+        metrics = {metric.name: metric for metric in self._metrics}
+        merged: Dict[str, Dict[Tuple, object]] = {name: {} for name in metrics}
+        for filename in sorted(os.listdir(self.directory)):
+            pid = filename[:-len(".json")]
+            if not filename.endswith(".json") or not pid.isdigit():
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _process_alive(int(pid))
+            for name, values in snapshot.items():
+                metric = metrics.get(name)
+                if metric is None or (metric.per_process and not alive):
+                    continue
+                for key, value in values:
+                    key = tuple(key) + ((pid,) if metric.per_process else ())
+                    metric.merge(merged[name], key, value)
+        return merged
+
+    def render(self) -> str:
+        """Render every registered metric in the Prometheus text format"""
+        merged = self._merge_snapshots() if self.directory is not None else {}
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(merged.get(metric.name)))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Stages of a generate call, per route
+TOKENIZE_SECONDS = REGISTRY.register(Histogram(
+    "translator_tokenize_seconds", "Time spent tokenizing a batch", ["route"]))
+GENERATE_SECONDS = REGISTRY.register(Histogram(
+    "translator_generate_seconds", "Time spent in model.generate for one padded batch", ["route"]))
+DECODE_SECONDS = REGISTRY.register(Histogram(
+    "translator_decode_seconds", "Time spent detokenizing a batch", ["route"]))
+INPUT_TOKENS = REGISTRY.register(Histogram(
+    "translator_input_tokens", "Source tokens per text", ["route"], TOKEN_BUCKETS))
+OUTPUT_TOKENS = REGISTRY.register(Histogram(
+    "translator_output_tokens", "Generated tokens per text", ["route"], TOKEN_BUCKETS))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "translator_batch_size", "Texts per generate call", ["route"], BATCH_BUCKETS))
+QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "translator_queue_wait_seconds", "Time a request waited in the micro-batcher", ["route"]))
+INFERENCE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "translator_inference_wait_seconds", "Time a generate call waited for a free inference worker", ["route"]))
+
+# Models
+MODEL_LOAD_SECONDS = REGISTRY.register(Histogram(
+    "translator_model_load_seconds", "Time spent loading a model", ["route", "state"], LOAD_BUCKETS))
+RESIDENT_MODEL_BYTES = REGISTRY.register(Gauge(
+    "translator_resident_model_bytes", "Measured memory of each resident model", ["route"]))
+
+# HTTP requests, labelled by URL rule so unknown paths share one series
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by endpoint and status", ["endpoint", "method", "status"]))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time to produce the response", ["endpoint"]))
+
+# ASGI server admission control (asgi_app.py)
+ROUTE_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "translator_route_queue_depth", "Translation requests queued or running per route", ["route"]))
+REJECTED_REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "translator_rejected_requests_total", "Translation requests refused with 429", ["route"]))
+
+
+def update_model_gauges(memory_stats: Dict):
+    """Refresh the resident model gauges from Translator.get_memory_stats()"""
+    RESIDENT_MODEL_BYTES.clear()
+    for route, model in memory_stats.get("models", {}).items():
+        RESIDENT_MODEL_BYTES.set(model["bytes"], route=route)
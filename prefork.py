@@ -0,0 +1,169 @@
+"""
+Pre-fork multi-worker serving.
+
+The gunicorn master imports the app, loads and warms up the configured
+routes, and only then forks the workers, so the model weights are shared
+copy-on-write instead of being loaded once per worker. The hooks in
+gunicorn.conf.py call these functions.
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+
+import torch
+
+import metrics
+from config import Config
+from inference_pool import plan_core_slices, process_cpus
+
+# True in the gunicorn master until it forks the workers
+_master = False
+
+# Metrics directory created by the master, removed when it exits
+_metrics_tempdir: Optional[str] = None
+
+
+def available_cpus() -> int:
+    """Get the number of cores this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def worker_torch_threads(workers: int, cpus: Optional[int] = None) -> int:
+    """
+    Get the torch intra-op thread count for each worker.
+
+    Args:
+        workers (int): Number of worker processes
+        cpus (int): Available cores (detected if not given)
+
+    Returns:
+        TORCH_THREADS_PER_WORKER, or the cores divided among the workers so
+        they do not oversubscribe the machine
+    """
+    if Config.TORCH_THREADS_PER_WORKER > 0:
+        return Config.TORCH_THREADS_PER_WORKER
+    cpus = available_cpus() if cpus is None else cpus
+    return max(1, cpus // max(1, workers))
+
+
+def worker_cpus(slot: int, workers: int, cpus: Optional[List[int]] = None) -> List[int]:
+    """
+    Get the share of the cores of one worker, which its inference pool
+    divides further, so workers do not pin their inference threads to the
+    same cores.
+
+    Args:
+        slot (int): Index of the worker, from 0 to workers - 1
+        workers (int): Number of worker processes
+        cpus (List[int]): Available cores (detected if not given)
+
+    Returns:
+        The worker's core ids, TORCH_THREADS_PER_WORKER of them if configured
+    """
+    slices = plan_core_slices(process_cpus() if cpus is None else cpus, workers, Config.TORCH_THREADS_PER_WORKER)
+    return slices[slot % len(slices)]
+
+
+def assign_slot(worker, live_workers, workers: int):
+    """
+    Give a worker about to be forked the lowest slot not used by a live
+    worker (called in the master by gunicorn's pre_fork hook).
+
+    Args:
+        worker: The gunicorn worker object, which the child inherits
+        live_workers: The gunicorn worker objects still running
+        workers (int): Number of worker processes
+    """
+    used = {getattr(live, "cpu_slot", None) for live in live_workers}
+    free = [slot for slot in range(max(1, workers)) if slot not in used]
+    # During a graceful reload the old workers still hold their slots
+    worker.cpu_slot = free[0] if free else len(used) % max(1, workers)
+
+
+def in_master() -> bool:
+    """Check whether this process is a pre-fork master, which must stay single-threaded"""
+    return _master
+
+
+def prepare_master():
+    """
+    Keep torch single-threaded in the master and let /metrics report every worker.
+
+    The OpenMP thread pool does not survive fork: a worker whose parent has
+    run a multi-threaded op (on any thread) hangs on its own first parallel op.
+    """
+    global _master, _metrics_tempdir
+    _master = True
+    torch.set_num_threads(1)
+    directory = Config.METRICS_DIR
+    if not directory:
+        directory = _metrics_tempdir = tempfile.mkdtemp(prefix="translator-metrics-")
+    metrics.REGISTRY.enable_multiprocess(directory)
+
+
+def shutdown_master():
+    """Remove the metrics directory the master created"""
+    if _metrics_tempdir is not None:
+        shutil.rmtree(_metrics_tempdir, ignore_errors=True)
+
+
+def preload(translator):
+    """
+    Finish loading the warmup routes in the master before the first fork.
+
+    The heap is frozen afterwards so the garbage collector of each worker
+    does not write to (and thereby copy) the objects inherited from the master.
+    """
+    status = translator.wait_for_warmup()
+    print(f"Preloaded routes before forking workers: {status['routes']}")
+    # The warmup's load times are reported once, from the master's snapshot
+    metrics.REGISTRY.write_snapshot()
+    gc.collect()
+    gc.freeze()
+
+
+def init_worker(translator, workers: int, slot: int = 0):
+    """
+    Set up a freshly forked worker.
+
+    Args:
+        translator: The app's Translator
+        workers (int): Number of worker processes
+        slot (int): The worker's slot from assign_slot, which picks its share of the cores
+    """
+    global _master
+    _master = False
+    threads = worker_torch_threads(workers)
+    torch.set_num_threads(threads)
+    cpus = worker_cpus(slot, workers)
+    translator.after_fork(cpus=cpus)
+    if metrics.REGISTRY.directory is not None:
+        # The master's values are already in its own snapshot
+        metrics.REGISTRY.reset()
+        metrics.REGISTRY.start_flusher(max(1, Config.METRICS_FLUSH_SECONDS))
+    print(f"Worker {os.getpid()} ready ({threads} torch threads, cores {cpus})")
+
+
+def exit_worker():
+    """Write a worker's final metrics, which keep counting in the totals after it exits"""
+    metrics.REGISTRY.write_snapshot()
+
+
+def reload_master(translator, routes: List[str]):
+    """
+    Re-read the warmup routes from disk in the master on a graceful reload
+    (SIGHUP), so the new workers get models downloaded or replaced since
+    startup while the old workers finish their requests.
+    """
+    gc.unfreeze()
+    for route in routes:
+        translator.refresh_route(route)
+    translator.warmup(routes)
+    metrics.REGISTRY.write_snapshot()
+    gc.collect()
+    gc.freeze()
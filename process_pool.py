@@ -0,0 +1,340 @@
+"""
+Process-pool inference.
+
+Generate calls run in separate Python processes, so the generate loop of one
+request does not hold the GIL the request threads share. Each route is
+assigned to one process, the only one that loads its model. The server keeps
+the tokenizer and a RemoteModel with the generate interface of MarianMTModel,
+so tokenization, length buckets and decoding are unchanged.
+
+Token ids are exchanged through a shared-memory buffer per process (an
+anonymous file mapped by both sides) and the pipe only carries a small
+header. Payloads larger than the buffer go through the pipe instead.
+
+The processes are started with subprocess rather than multiprocessing, whose
+spawn start method re-imports the server's __main__ module (and so creates
+another Translator) in every child.
+"""
+
+import itertools
+import mmap
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import weakref
+from multiprocessing.connection import Connection
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import torch
+from transformers import GenerationConfig
+
+from inference_pool import plan_core_slices, process_cpus
+from residency import estimate_model_size
+
+# Token ids and attention masks, as torch uses them
+TOKEN_DTYPE = np.int64
+
+
+def _create_buffer(size: int) -> Tuple[int, mmap.mmap]:
+    """Create an anonymous shared-memory file and map it"""
+    if hasattr(os, "memfd_create"):
+        fd = os.memfd_create("translator-ipc")
+    else:
+        with tempfile.TemporaryFile() as handle:
+            fd = os.dup(handle.fileno())
+    os.ftruncate(fd, size)
+    return fd, mmap.mmap(fd, size)
+
+
+def _pack(buffer: mmap.mmap, arrays: Sequence[np.ndarray]) -> Tuple[str, List]:
+    """Write arrays to the buffer and describe them, or send them inline if they do not fit"""
+    arrays = [np.ascontiguousarray(array, dtype=TOKEN_DTYPE) for array in arrays]
+    if sum(array.nbytes for array in arrays) > len(buffer):
+        return ("inline", arrays)
+    offset = 0
+    for array in arrays:
+        np.ndarray(array.shape, dtype=TOKEN_DTYPE, buffer=buffer, offset=offset)[...] = array
+        offset += array.nbytes
+    return ("shm", [array.shape for array in arrays])
+
+
+def _unpack(buffer: mmap.mmap, packed: Tuple[str, List]) -> List[np.ndarray]:
+    """Read the arrays described by _pack (copied, the buffer is reused by the next call)"""
+    kind, items = packed
+    if kind == "inline":
+        return list(items)
+    arrays = []
+    offset = 0
+    for shape in items:
+        array = np.ndarray(shape, dtype=TOKEN_DTYPE, buffer=buffer, offset=offset).copy()
+        offset += array.nbytes
+        arrays.append(array)
+    return arrays
+
+
+class RemoteModel():
+    def __init__(self, pool: "ProcessInferencePool", worker: "_InferenceProcess",
+                 spec: Tuple[str, str, str, str], token: int, generation_config: GenerationConfig):
+        """
+        Stand-in for a model loaded in an inference process.
+
+        Args:
+            pool (ProcessInferencePool): Pool the model belongs to
+            worker (_InferenceProcess): Process holding the model
+            spec (Tuple): (route, path, engine, precision) of the model
+            token (int): Load this proxy was created by, so releasing a stale
+                proxy does not unload a newer copy of the route
+            generation_config (GenerationConfig): The model's generation defaults
+        """
+        self.route, self.path = spec[0], spec[1]
+        self.generation_config = generation_config
+        self._pool = pool
+        self._worker = worker
+        self._spec = spec
+        # The process drops the model once the server no longer references it
+        weakref.finalize(self, pool._release, spec[0], token)
+
+    def footprint(self) -> int:
+        """Size of the weights held by the inference process, used by the residency budget"""
+        return estimate_model_size(self.path)
+
+    def generate(self, input_ids=None, attention_mask=None, **kwargs) -> torch.Tensor:
+        """Generate in the inference process with the same inputs and output as MarianMTModel.generate"""
+        input_ids = np.asarray(input_ids)
+        attention_mask = np.ones_like(input_ids) if attention_mask is None else np.asarray(attention_mask)
+        (generated,) = self._worker.call(("generate", self._spec, kwargs), [input_ids, attention_mask])
+        return torch.from_numpy(generated)
+
+
+class _InferenceProcess():
+    def __init__(self, index: int, cores: List[int], threads: int, buffer_bytes: int):
+        self.index = index
+        self.cores = cores
+        self.threads = threads
+        self.buffer_bytes = buffer_bytes
+        self.restarts = 0
+        # Routes the server dropped, unloaded before the next call
+        self.released: Set[str] = set()
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._conn: Optional[Connection] = None
+        self._buffer: Optional[mmap.mmap] = None
+
+    def _start(self):
+        fd, self._buffer = _create_buffer(self.buffer_bytes)
+        parent_socket, child_socket = socket.socketpair()
+        try:
+            self._process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), str(child_socket.fileno()), str(fd),
+                 str(self.buffer_bytes), str(self.threads), ",".join(str(core) for core in self.cores)],
+                pass_fds=(child_socket.fileno(), fd),
+                cwd=os.path.dirname(os.path.abspath(__file__))
+            )
+        finally:
+            child_socket.close()
+            os.close(fd)
+        self._conn = Connection(parent_socket.detach())
+
+    def _stop(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._process is not None:
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+
+    def _exchange(self, message: Tuple, arrays: Sequence[np.ndarray] = ()):
+        self._conn.send(message + (_pack(self._buffer, arrays),))
+        status, value, packed = self._conn.recv()
+        if status == "error":
+            # Keeps the message, e.g. out-of-memory errors are still recognized
+            raise RuntimeError(value)
+        return value, _unpack(self._buffer, packed)
+
+    def call(self, message: Tuple, arrays: Sequence[np.ndarray] = ()):
+        """
+        Send a request and wait for its reply, starting the process if needed.
+
+        Returns:
+            The reply value for a load, the output arrays for a generate call
+        """
+        with self._lock:
+            # A process that died is restarted once; generate reloads its route
+            for attempt in range(2):
+                if self._process is None or self._process.poll() is not None:
+                    if self._process is not None:
+                        self.restarts += 1
+                        self._stop()
+                    self._start()
+                try:
+                    while self.released:
+                        self._exchange(("unload", self.released.pop()))
+                    value, outputs = self._exchange(message, arrays)
+                    return outputs if message[0] == "generate" else value
+                except (EOFError, OSError) as e:
+                    self._process.kill()
+                    self._process.wait()
+                    if attempt:
+                        raise RuntimeError(f"Inference process {self.index} exited: {str(e) or type(e).__name__}")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.send(None)
+                except OSError:
+                    pass
+            self._stop()
+
+    def pid(self) -> Optional[int]:
+        process = self._process
+        return process.pid if process is not None and process.poll() is None else None
+
+
+class ProcessInferencePool():
+    def __init__(self, processes: int, threads_per_process: int = 0, pin: bool = True,
+                 buffer_bytes: int = 8 * 1024 * 1024, cpus: Optional[List[int]] = None):
+        """
+        Initialize the pool. Processes start on their first call.
+
+        Args:
+            processes (int): Number of inference processes
+            threads_per_process (int): torch threads and cores of each process
+                (0 = the available cores divided among the processes)
+            pin (bool): Pin each process to its slice of cores (Linux only)
+            buffer_bytes (int): Shared-memory buffer of each process; larger
+                payloads are sent through the pipe
+            cpus (List[int]): Cores to use (default: this process's affinity)
+        """
+        slices = plan_core_slices(cpus or process_cpus(), processes, threads_per_process)
+        self.threads = len(slices[0])
+        self.pin = pin and hasattr(os, "sched_setaffinity")
+        self._processes = [
+            _InferenceProcess(index, cores if self.pin else [], self.threads, buffer_bytes)
+            for index, cores in enumerate(slices)
+        ]
+        # route -> (process index, token of the load that created its proxy)
+        self._assigned: Dict[str, Tuple[int, int]] = {}
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+
+    def load(self, route: str, path: str, engine: str = "torch", precision: str = "fp32") -> RemoteModel:
+        """
+        Load (or reload) a route's model in its inference process.
+
+        A route keeps its process for as long as the server references one
+        of its proxies; new routes go to the process with the fewest routes.
+
+        Returns:
+            RemoteModel to keep in place of the model
+        """
+        with self._lock:
+            token = next(self._tokens)
+            if route in self._assigned:
+                index = self._assigned[route][0]
+            else:
+                counts = [0] * len(self._processes)
+                for assigned, _ in self._assigned.values():
+                    counts[assigned] += 1
+                index = counts.index(min(counts))
+            self._assigned[route] = (index, token)
+            worker = self._processes[index]
+            worker.released.discard(route)
+
+        spec = (route, path, engine, precision)
+        try:
+            config = worker.call(("load", spec))
+        except Exception:
+            self._release(route, token)
+            raise
+        return RemoteModel(self, worker, spec, token, GenerationConfig.from_dict(config))
+
+    def _release(self, route: str, token: int):
+        """Free a route's process once its latest proxy is gone (runs from a finalizer, never blocks on a call)"""
+        with self._lock:
+            index, current = self._assigned.get(route, (None, None))
+            if current != token:
+                return
+            del self._assigned[route]
+            self._processes[index].released.add(route)
+
+    def stats(self) -> Dict:
+        """Get the process layout and which process serves each route"""
+        with self._lock:
+            routes = {route: index for route, (index, _) in self._assigned.items()}
+        return {
+            "processes": len(self._processes),
+            "threads_per_process": self.threads,
+            "pinned": self.pin,
+            "pids": [worker.pid() for worker in self._processes],
+            "restarts": sum(worker.restarts for worker in self._processes),
+            "routes": routes,
+        }
+
+    def close(self):
+        """Stop the inference processes"""
+        for worker in self._processes:
+            worker.close()
+
+
+def _serve(conn: Connection, buffer: mmap.mmap):
+    """Answer requests from the server until it closes the connection"""
+    from translator import load_route_model
+
+    models = {}
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        kind, packed = message[0], message[-1]
+        try:
+            arrays = _unpack(buffer, packed)
+            outputs: List[np.ndarray] = []
+            value = None
+            if kind == "unload":
+                models.pop(message[1], None)
+            elif kind == "load":
+                route, path, engine, precision = message[1]
+                models.pop(route, None)
+                models[route] = load_route_model(path, engine, precision)
+                value = models[route].generation_config.to_dict()
+            elif kind == "generate":
+                (route, path, engine, precision), settings = message[1], message[2]
+                if route not in models:
+                    # The process was restarted since the route was loaded
+                    models[route] = load_route_model(path, engine, precision)
+                input_ids, attention_mask = (torch.from_numpy(array) for array in arrays)
+                generated = models[route].generate(input_ids=input_ids, attention_mask=attention_mask, **settings)
+                outputs = [np.asarray(generated)]
+            reply = ("ok", value, _pack(buffer, outputs))
+        except Exception as e:
+            reply = ("error", str(e) or type(e).__name__, ("inline", []))
+        conn.send(reply)
+
+
+def main(argv: List[str]):
+    socket_fd, buffer_fd, buffer_bytes, threads, cores = argv
+    torch.set_num_threads(int(threads))
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, [int(core) for core in cores.split(",")])
+    buffer = mmap.mmap(int(buffer_fd), int(buffer_bytes))
+    _serve(Connection(int(socket_fd)), buffer)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
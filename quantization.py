@@ -0,0 +1,113 @@
+"""
+Dynamic int8 quantization for CPU serving.
+
+The Linear layers of a MarianMTModel are replaced by dynamically quantized
+int8 versions. The quantized weights are cached next to the model files so
+the quantization itself only runs once per model.
+"""
+
+import os
+from typing import Dict
+
+import torch
+from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+from transformers import GenerationConfig
+from transformers.models.marian import MarianConfig, MarianMTModel
+
+from residency import weights_mtime
+
+PRECISIONS = ("fp32", "int8")
+QUANTIZED_FILENAME = "model-int8.pt"
+
+
+def quantize_model(model):
+    """
+    Quantize the Linear layers of a model to int8.
+
+    Args:
+        model: fp32 MarianMTModel
+
+    Returns:
+        Quantized copy of the model in eval mode
+    """
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _export_state(model) -> Dict[str, torch.Tensor]:
+    """
+    Flatten a quantized model into plain tensors.
+
+    Packed int8 weights are stored as their integer values plus scale and
+    zero point, so the cache file only contains ordinary tensors.
+    """
+    tensors = {}
+    quantized = []
+    for name, module in model.named_modules():
+        if isinstance(module, DynamicQuantizedLinear):
+            weight, bias = module._weight_bias()
+            tensors[f"{name}.qweight"] = weight.int_repr()
+            tensors[f"{name}.qscale"] = torch.tensor(weight.q_scale(), dtype=torch.float64)
+            tensors[f"{name}.qzero_point"] = torch.tensor(weight.q_zero_point(), dtype=torch.int64)
+            if bias is not None:
+                tensors[f"{name}.qbias"] = bias
+            quantized.append(f"{name}.")
+
+    for key, value in model.state_dict().items():
+        if isinstance(value, torch.Tensor) and not key.startswith(tuple(quantized)):
+            tensors[key] = value
+    return tensors
+
+
+def _import_state(model, tensors: Dict[str, torch.Tensor]):
+    """Fill a freshly quantized model with tensors from _export_state"""
+    quantized = []
+    for name, module in model.named_modules():
+        if isinstance(module, DynamicQuantizedLinear):
+            weight = torch._make_per_tensor_quantized_tensor(
+                tensors[f"{name}.qweight"],
+                tensors[f"{name}.qscale"].item(),
+                tensors[f"{name}.qzero_point"].item()
+            )
+            module.set_weight_bias(weight, tensors.get(f"{name}.qbias"))
+            quantized.append(f"{name}.")
+
+    # Quantized modules insist on their own state dict keys, so the remaining
+    # weights are copied in place instead of going through load_state_dict
+    with torch.no_grad():
+        for key, value in tensors.items():
+            if key.startswith(tuple(quantized)):
+                continue
+            module_name, _, attribute = key.rpartition(".")
+            getattr(model.get_submodule(module_name), attribute).copy_(value)
+
+
+def load_quantized_model(path: str):
+    """
+    Load the int8 version of a model, quantizing and caching it on first use.
+
+    A cached copy is only used if it is newer than the fp32 weights, so
+    replacing a model through /download_model invalidates it.
+
+    Args:
+        path (str): Model directory (data/opus-mt-{source}-{target})
+
+    Returns:
+        Quantized MarianMTModel in eval mode
+    """
+    cache_path = os.path.join(path, QUANTIZED_FILENAME)
+
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= weights_mtime(path):
+        # Build the quantized structure and fill it with the cached int8
+        # weights, without reading the fp32 weights at all
+        model = quantize_model(MarianMTModel(MarianConfig.from_pretrained(path)))
+        _import_state(model, torch.load(cache_path, weights_only=True))
+        if os.path.exists(os.path.join(path, "generation_config.json")):
+            model.generation_config = GenerationConfig.from_pretrained(path)
+        return model
+
+    model = quantize_model(MarianMTModel.from_pretrained(path))
+    temp_path = f"{cache_path}.tmp"
+    torch.save(_export_state(model), temp_path)
+    os.replace(temp_path, cache_path)
+    return model
@@ -0,0 +1,229 @@
+"""
+Model residency management.
+
+Loaded models are kept in a dict-like container that tracks the memory each
+model uses and evicts the least recently used ones when a RAM budget or a
+maximum number of resident models is exceeded. Pinned routes are never
+evicted.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Weight files whose size is used to estimate a model before loading it
+WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin")
+
+
+def model_footprint(model) -> int:
+    """
+    Measure the memory used by a model's weights and buffers.
+
+    Args:
+        model: A torch module (anything else is reported as 0 bytes)
+
+    Returns:
+        Size in bytes
+    """
+    # Engines that do not expose torch weights report their own size
+    footprint = getattr(type(model), "footprint", None)
+    if callable(footprint):
+        return int(footprint(model))
+
+    try:
+        state = model.state_dict()
+    except Exception:
+        return 0
+
+    # Quantized layers keep their packed weights as tuples in the state dict
+    tensors = []
+    for value in state.values():
+        if isinstance(value, (tuple, list)):
+            tensors.extend(value)
+        else:
+            tensors.append(value)
+
+    total = 0
+    seen = set()
+    for tensor in tensors:
+        try:
+            # Tied weights share storage and are only counted once
+            key = tensor.data_ptr()
+            if key in seen:
+                continue
+            seen.add(key)
+            total += tensor.numel() * tensor.element_size()
+        except Exception:
+            continue
+    return total
+
+
+def weights_mtime(path: str) -> float:
+    """Get the modification time of a model directory's weight files"""
+    mtimes = [
+        os.path.getmtime(os.path.join(path, filename))
+        for filename in WEIGHT_FILES
+        if os.path.exists(os.path.join(path, filename))
+    ]
+    return max(mtimes) if mtimes else 0.0
+
+
+def estimate_model_size(path: str) -> int:
+    """Estimate the in-memory size of a model directory from its weight files"""
+    for filename in WEIGHT_FILES:
+        weights = os.path.join(path, filename)
+        if os.path.exists(weights):
+            return os.path.getsize(weights)
+    return 0
+
+
+class ModelResidency():
+    def __init__(self, max_bytes: int = 0, max_models: int = 0, pinned: Iterable[str] = ()):
+        """
+        Initialize the residency manager.
+
+        Args:
+            max_bytes (int): RAM budget for resident models, 0 for no limit
+            max_models (int): Maximum number of resident models, 0 for no limit
+            pinned (Iterable[str]): Routes that must never be evicted
+        """
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_models = max(0, int(max_models))
+        self.pinned = set(pinned)
+        self.evictions = 0
+        self._models: "OrderedDict[str, Tuple]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        # Estimated sizes of the models being loaded
+        self._reserved: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, route) -> bool:
+        return route in self._models
+
+    def __getitem__(self, route: str) -> Tuple:
+        with self._lock:
+            value = self._models[route]
+            self._models.move_to_end(route)
+            return value
+
+    def __setitem__(self, route: str, value: Tuple):
+        size = model_footprint(value[0])
+        with self._lock:
+            self._models.pop(route, None)
+            self._models[route] = value
+            self._sizes[route] = size
+            self._reserved.pop(route, None)
+            self._evict(keep=route)
+
+    def __delitem__(self, route: str):
+        with self._lock:
+            del self._models[route]
+            self._sizes.pop(route, None)
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._models.keys())
+
+    def get(self, route: str, default=None):
+        with self._lock:
+            if route not in self._models:
+                return default
+            return self[route]
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._sizes.clear()
+
+    def pin(self, route: str):
+        """Protect a route from eviction"""
+        self.pinned.add(route)
+
+    def unpin(self, route: str):
+        """Allow a route to be evicted again"""
+        self.pinned.discard(route)
+
+    def total_bytes(self) -> int:
+        """Get the measured size of all resident models"""
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def make_room(self, incoming_bytes: int = 0) -> List[str]:
+        """
+        Evict models so that one more model of the given size fits.
+
+        Args:
+            incoming_bytes (int): Estimated size of the model about to load
+
+        Returns:
+            Routes that were evicted
+        """
+        with self._lock:
+            return self._evict(extra_models=1, extra_bytes=incoming_bytes)
+
+    def reserve(self, route: str, incoming_bytes: int = 0):
+        """
+        Count a model that is about to load against the budget, without
+        evicting anything yet. Models are only evicted once it has loaded
+        (when it is stored), so a failed load costs no resident model.
+
+        Args:
+            route (str): Route being loaded
+            incoming_bytes (int): Estimated size of its model
+        """
+        with self._lock:
+            self._reserved[route] = incoming_bytes
+
+    def release(self, route: str):
+        """Drop the reservation of a load that failed"""
+        with self._lock:
+            self._reserved.pop(route, None)
+
+    def stats(self) -> Dict:
+        """Get budget, usage and per-model sizes"""
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "max_models": self.max_models,
+                "resident_bytes": sum(self._sizes.values()),
+                "reserved_bytes": sum(self._reserved.values()),
+                "evictions": self.evictions,
+                "pinned": sorted(self.pinned),
+                "models": {
+                    route: {"bytes": self._sizes.get(route, 0), "pinned": route in self.pinned}
+                    for route in self._models
+                }
+            }
+
+    def _over_budget(self, extra_models: int, extra_bytes: int) -> bool:
+        # Loads still in progress keep their room
+        extra_models += len(self._reserved)
+        extra_bytes += sum(self._reserved.values())
+        if self.max_models and len(self._models) + extra_models > self.max_models:
+            return True
+        if self.max_bytes and sum(self._sizes.values()) + extra_bytes > self.max_bytes:
+            return True
+        return False
+
+    def _evict(self, keep: str = None, extra_models: int = 0, extra_bytes: int = 0) -> List[str]:
+        """Evict least recently used, unpinned models until within budget"""
+        evicted = []
+        while self._over_budget(extra_models, extra_bytes):
+            candidates = [r for r in self._models if r != keep and r not in self.pinned]
+            if not candidates:
+                print("Model residency budget exceeded but every resident model is pinned")
+                break
+            route = candidates[0]
+            del self._models[route]
+            self._sizes.pop(route, None)
+            self.evictions += 1
+            evicted.append(route)
+            print(f"Evicted model {route} to stay within the residency budget")
+        return evicted
@@ -0,0 +1,169 @@
+"""
+Index of the language routes available in the models directory.
+
+The directory is scanned once and re-scanned only when its modification
+time changes (a model folder was added, removed or renamed), so request
+handlers can check routes with a set lookup instead of listing the
+directory on every call.
+
+Pairs without a model of their own can be served through a chain of models
+that pivots through intermediate languages (es-en + en-fr for es-fr), so N
+languages paired with English need 2N models for N^2 pairs.
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+MODEL_PREFIX = 'opus-mt-'
+
+
+def parse_model_folder(folder: str) -> Optional[Tuple[str, str]]:
+    """
+    Extract (source, target) from a model folder name.
+
+    Args:
+        folder (str): Folder name in the format opus-mt-{source}-{target}
+
+    Returns:
+        Tuple of language codes, or None if the name does not match
+    """
+    if not folder.startswith(MODEL_PREFIX):
+        return None
+    parts = folder.split('-')
+    if len(parts) < 4:
+        return None
+    return parts[2], parts[3]
+
+
+class RouteRegistry():
+    def __init__(self, models_dir: str):
+        """
+        Initialize the registry for a models directory.
+
+        Args:
+            models_dir (str): Directory where the opus-mt models are stored
+        """
+        self.models_dir = models_dir
+        self._lock = threading.Lock()
+        self._mtime: Optional[int] = None
+        self._pairs: List[Tuple[str, str]] = []
+        self._routes: Set[Tuple[str, str]] = set()
+        self._by_source: Dict[str, List[str]] = {}
+        self._chains: Dict[Tuple[str, str, int], Optional[List[Tuple[str, str]]]] = {}
+
+    def pairs(self) -> List[List[str]]:
+        """Get all available [source, target] pairs"""
+        self._refresh()
+        return [[source, target] for source, target in self._pairs]
+
+    def has(self, source: str, target: str) -> bool:
+        """Check whether a direct model exists for a route"""
+        self._refresh()
+        return (source, target) in self._routes
+
+    def targets_for(self, source: str) -> List[str]:
+        """Get the target languages available for a source language"""
+        self._refresh()
+        return list(self._by_source.get(source, []))
+
+    def chain(self, source: str, target: str, max_hops: int = 2) -> Optional[List[Tuple[str, str]]]:
+        """
+        Find the shortest chain of models that translates source to target.
+
+        Args:
+            source (str): Source language code
+            target (str): Target language code
+            max_hops (int): Maximum number of models in the chain
+
+        Returns:
+            List of (source, target) model routes, a single one for a direct
+            model, or None if the pair cannot be reached
+        """
+        self._refresh()
+        key = (source, target, max_hops)
+        chains = self._chains
+        if key not in chains:
+            chains[key] = self._shortest_chain(source, target, max_hops)
+        chain = chains[key]
+        return list(chain) if chain is not None else None
+
+    def pivot_pairs(self, max_hops: int = 2) -> Dict[Tuple[str, str], List[Tuple[str, str]]]:
+        """
+        Get the pairs that have no model of their own but can be chained.
+
+        Args:
+            max_hops (int): Maximum number of models in a chain
+
+        Returns:
+            Dictionary of (source, target) -> chain of model routes
+        """
+        self._refresh()
+        pivots = {}
+        languages = sorted(set(self._by_source) | {target for _, target in self._pairs})
+        for source in self._by_source:
+            for target in languages:
+                if source == target or (source, target) in self._routes:
+                    continue
+                chain = self.chain(source, target, max_hops)
+                if chain is not None:
+                    pivots[(source, target)] = chain
+        return pivots
+
+    def _shortest_chain(self, source: str, target: str, max_hops: int) -> Optional[List[Tuple[str, str]]]:
+        """Breadth-first search over the available models"""
+        if source == target:
+            return None
+        previous: Dict[str, str] = {source: None}
+        queue = deque([(source, 0)])
+        while queue:
+            language, hops = queue.popleft()
+            if hops >= max_hops:
+                continue
+            for following in self._by_source.get(language, []):
+                if following in previous:
+                    continue
+                previous[following] = language
+                if following == target:
+                    chain = []
+                    while following != source:
+                        chain.append((previous[following], following))
+                        following = previous[following]
+                    return chain[::-1]
+                queue.append((following, hops + 1))
+        return None
+
+    def invalidate(self):
+        """Force a re-scan on the next lookup"""
+        with self._lock:
+            self._mtime = None
+
+    def _refresh(self):
+        """Re-scan the models directory if it changed since the last scan"""
+        try:
+            mtime = os.stat(self.models_dir).st_mtime_ns
+        except OSError:
+            mtime = -1
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            pairs = []
+            if mtime != -1:
+                for folder in sorted(os.listdir(self.models_dir)):
+                    route = parse_model_folder(folder)
+                    if route is not None and os.path.isdir(os.path.join(self.models_dir, folder)):
+                        pairs.append(route)
+
+            by_source: Dict[str, List[str]] = {}
+            for source, target in pairs:
+                by_source.setdefault(source, []).append(target)
+
+            self._pairs = pairs
+            self._routes = set(pairs)
+            self._by_source = by_source
+            self._chains = {}
+            self._mtime = mtime
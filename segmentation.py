@@ -0,0 +1,130 @@
+"""
+Sentence segmentation for long texts.
+
+Marian models only accept about 512 tokens, so long inputs are split into
+sentences (and sentences that are still too long into word chunks) that can
+be translated as one batch. The whitespace between segments is kept so the
+translation can be reassembled with the original line and paragraph breaks.
+"""
+
+import re
+from typing import List, Tuple
+
+# Runs of whitespace and runs of everything else
+_TOKENS = re.compile(r'(\s+)')
+
+# Terminal punctuation, optionally followed by closing quotes or brackets
+_STRONG_END = re.compile(r'[!?…。！？]["\'”’»)\]]*$')
+_PERIOD_END = re.compile(r'\.["\'”’»)\]]*$')
+
+# Words that can start a new sentence after a period
+_SENTENCE_START = re.compile(r'^["\'“‘«(\[¿¡]*[A-ZÀ-Þ0-9]')
+
+
+def _ends_sentence(word: str, next_word: str) -> bool:
+    if _STRONG_END.search(word):
+        return True
+    # A period only ends a sentence before a capitalized word, so that
+    # abbreviations like "e.g. this" stay together
+    return bool(_PERIOD_END.search(word)) and bool(_SENTENCE_START.match(next_word))
+
+
+def _chunk_words(words: List[str], spaces: List[str], max_chars: int) -> List[Tuple[List[str], List[str]]]:
+    """Split a sentence that is longer than max_chars at word boundaries"""
+    chunks = []
+    current_words: List[str] = []
+    current_spaces: List[str] = []
+    length = 0
+    for i, word in enumerate(words):
+        if current_words and length + len(spaces[i - 1]) + len(word) > max_chars:
+            chunks.append((current_words, current_spaces[:-1]))
+            current_words, current_spaces, length = [], [], 0
+        if current_words:
+            length += len(spaces[i - 1])
+        current_words.append(word)
+        current_spaces.append(spaces[i] if i < len(spaces) else '')
+        length += len(word)
+    if current_words:
+        chunks.append((current_words, current_spaces[:-1]))
+    return chunks
+
+
+def split_segments(text: str, max_chars: int = 400) -> Tuple[List[str], List[str]]:
+    """
+    Split text into sentence segments.
+
+    Args:
+        text (str): Text to split
+        max_chars (int): Maximum length of a segment, longer sentences are
+            split between words
+
+    Returns:
+        Tuple (segments, separators) where separators has one more element
+        than segments: the leading whitespace, the whitespace between each
+        pair of segments and the trailing whitespace
+    """
+    # Alternating words and whitespace, starting and ending with a word
+    parts = _TOKENS.split(text)
+    leading = trailing = ''
+    if len(parts) > 1 and parts[0] == '':
+        leading = parts[1]
+        parts = parts[2:]
+    if len(parts) > 1 and parts[-1] == '':
+        trailing = parts[-2]
+        parts = parts[:-2]
+    if not parts or parts == ['']:
+        return [], [text]
+
+    words = parts[0::2]
+    spaces = parts[1::2]
+
+    # Group words into sentences; line breaks always end a sentence
+    sentences: List[Tuple[List[str], List[str]]] = []
+    breaks: List[str] = []
+    start = 0
+    for i, word in enumerate(words):
+        if i == len(words) - 1:
+            sentences.append((words[start:], spaces[start:i]))
+            break
+        space = spaces[i]
+        if '\n' in space or _ends_sentence(word, words[i + 1]):
+            sentences.append((words[start:i + 1], spaces[start:i]))
+            breaks.append(space)
+            start = i + 1
+
+    segments: List[str] = []
+    separators: List[str] = [leading]
+    for index, (sentence_words, sentence_spaces) in enumerate(sentences):
+        sentence = ''.join(w + s for w, s in zip(sentence_words, sentence_spaces + ['']))
+        if len(sentence) <= max_chars:
+            pieces = [(sentence_words, sentence_spaces)]
+        else:
+            pieces = _chunk_words(sentence_words, sentence_spaces, max_chars)
+
+        for piece_index, (piece_words, piece_spaces) in enumerate(pieces):
+            segments.append(''.join(w + s for w, s in zip(piece_words, piece_spaces + [''])))
+            if piece_index < len(pieces) - 1:
+                # Whitespace between two chunks of the same sentence
+                consumed = sum(len(p[0]) for p in pieces[:piece_index + 1])
+                separators.append(sentence_spaces[consumed - 1])
+        separators.append(breaks[index] if index < len(breaks) else trailing)
+
+    return segments, separators
+
+
+def join_segments(segments: List[str], separators: List[str]) -> str:
+    """
+    Reassemble (translated) segments with the original whitespace.
+
+    Args:
+        segments (List[str]): Segments in order
+        separators (List[str]): Separators as returned by split_segments
+
+    Returns:
+        The reassembled text
+    """
+    pieces = [separators[0]]
+    for segment, separator in zip(segments, separators[1:]):
+        pieces.append(segment)
+        pieces.append(separator)
+    return ''.join(pieces)
@@ -14,6 +14,9 @@ class TranslatorChat {
         this.downloadButton = document.getElementById('download-model');
         this.downloadStatus = document.getElementById('download-status');
         
+        // Translations currently being streamed
+        this.activeStreams = new Set();
+        
         this.initializeEventListeners();
         this.loadSupportedLanguages();
     }
@@ -58,9 +61,15 @@ class TranslatorChat {
         this.downloadButton.addEventListener('click', () => {
             this.downloadModel();
         });
+
+        // Cancelar traducciones en curso al salir (el servidor deja de traducir)
+        window.addEventListener('pagehide', () => {
+            this.activeStreams.forEach(controller => controller.abort());
+        });
     }    async loadSupportedLanguages() {
         try {
-            const response = await fetch('/supported_languages');
+            // Revalidate with the server's ETag instead of downloading again
+            const response = await fetch('/supported_languages', { cache: 'no-cache' });
             const data = await response.json();
             
             if (data.supported_pairs) {
@@ -214,8 +223,12 @@ class TranslatorChat {
         // Mostrar estado de carga
         this.setLoading(true);
 
+        const controller = new AbortController();
+        this.activeStreams.add(controller);
+
         try {
-            const response = await fetch('/translate', {
+            // Los segmentos llegan como server-sent events a medida que se traducen
+            const request = () => fetch('/translate/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -224,25 +237,96 @@ class TranslatorChat {
                     source: sourceLang,
                     target: targetLang,
                     text: text
-                })
+                }),
+                signal: controller.signal
             });
 
-            const data = await response.json();
+            // 503: el modelo se está cargando, reintentar cuando indique Retry-After
+            let response = await request();
+            for (let attempt = 0; response.status === 503 && attempt < 10; attempt++) {
+                const seconds = parseInt(response.headers.get('Retry-After'), 10) || 1;
+                await this.wait(seconds * 1000, controller.signal);
+                response = await request();
+            }
 
-            if (data.success) {
-                // Mostrar traducción
-                this.addMessage(data.translated_text, 'bot');
-            } else {
+            if (!response.ok || !response.body) {
+                const data = await response.json();
                 this.showError(data.error || 'Error en la traducción');
+                return;
             }
+
+            const messageDiv = this.addMessage('', 'bot');
+            const content = messageDiv.querySelector('.message-content');
+            let translated = '';
+
+            await this.readEvents(response.body, (type, data) => {
+                if (type === 'start') {
+                    translated = data.separator;
+                } else if (type === 'segment') {
+                    // Mostrar traducción parcial
+                    translated += data.text + data.separator;
+                    content.textContent = translated;
+                    this.scrollToBottom();
+                } else if (type === 'done') {
+                    content.textContent = data.translated_text;
+                } else if (type === 'error') {
+                    messageDiv.remove();
+                    this.showError(data.error || 'Error en la traducción');
+                }
+            });
         } catch (error) {
+            if (error.name === 'AbortError') return;
             console.error('Error:', error);
             this.showError('Error de conexión. Verifica que la API esté funcionando.');
         } finally {
+            this.activeStreams.delete(controller);
             this.setLoading(false);
         }
     }
 
+    wait(ms, signal) {
+        // Espera cancelable con el AbortController de la traducción
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(resolve, ms);
+            signal.addEventListener('abort', () => {
+                clearTimeout(timer);
+                reject(new DOMException('Aborted', 'AbortError'));
+            }, { once: true });
+        });
+    }
+
+    async readEvents(body, onEvent) {
+        // Minimal server-sent events parser over a fetch response body
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let type = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) {
+                        type = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
+                    }
+                });
+                if (data) {
+                    onEvent(type, JSON.parse(data));
+                }
+            }
+        }
+    }
+
     addMessage(content, type) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${type}-message`;
@@ -260,6 +344,7 @@ class TranslatorChat {
 
         this.messagesContainer.appendChild(messageDiv);
         this.scrollToBottom();
+        return messageDiv;
     }
 
     showError(message) {
@@ -342,7 +427,15 @@ class TranslatorChat {
 
             const data = await response.json();
 
-            if (response.ok && data.success) {
+            if (!response.ok || !data.success) {
+                this.showDownloadStatus(data.message || data.error || 'Error al descargar el modelo', 'error');
+                return;
+            }
+
+            // La descarga se ejecuta en segundo plano: consultar su progreso
+            const job = await this.pollDownload(data.status_url);
+
+            if (job.state === 'done') {
                 this.showDownloadStatus('¡Modelo descargado exitosamente!', 'success');
                 // Reload supported languages to include the new model
                 await this.loadSupportedLanguages();
@@ -350,7 +443,7 @@ class TranslatorChat {
                 this.downloadSource.value = '';
                 this.downloadTarget.value = '';
             } else {
-                this.showDownloadStatus(data.message || 'Error al descargar el modelo', 'error');
+                this.showDownloadStatus(job.error || 'Error al descargar el modelo', 'error');
             }
         } catch (error) {
             console.error('Download error:', error);
@@ -364,6 +457,26 @@ class TranslatorChat {
         }
     }
 
+    async pollDownload(statusUrl) {
+        while (true) {
+            const response = await fetch(statusUrl, { cache: 'no-cache' });
+            const job = await response.json();
+            if (!response.ok) {
+                return { state: 'failed', error: job.error };
+            }
+            if (job.state === 'done' || job.state === 'failed') {
+                return job;
+            }
+
+            // Los totales solo se conocen de los archivos ya iniciados
+            if (job.bytes_done > 0) {
+                const megabytes = (job.bytes_done / (1024 * 1024)).toFixed(1);
+                this.showDownloadStatus(`Descargando modelo... ${megabytes} MB`, 'info');
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
     async deleteModel(source, target) {
         // Show confirmation dialog
         const sourceName = this.getLanguageName(source);
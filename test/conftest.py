@@ -76,3 +76,97 @@ def mock_config(temp_model_dir):
             yield temp_model_dir
     except ImportError:
         yield temp_model_dir
+
+
+class FakeTokenizer:
+    """Word-level stand-in for MarianTokenizer used by translator tests"""
+    
+    pad_token_id = 0
+    
+    def __init__(self):
+        self.vocab = {'<pad>': 0}
+        self.words = {0: '<pad>'}
+        self.calls = []
+    
+    def __call__(self, texts, truncation=False, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        self.calls.append(list(texts))
+        input_ids = []
+        for text in texts:
+            ids = []
+            for word in text.split():
+                if word not in self.vocab:
+                    self.vocab[word] = len(self.vocab)
+                    self.words[self.vocab[word]] = word
+                ids.append(self.vocab[word])
+            input_ids.append(ids)
+        return {'input_ids': input_ids}
+    
+    def pad(self, encoded, return_tensors=None):
+        import torch
+        rows = encoded['input_ids']
+        width = max(len(row) for row in rows)
+        input_ids = [row + [self.pad_token_id] * (width - len(row)) for row in rows]
+        mask = [[1] * len(row) + [0] * (width - len(row)) for row in rows]
+        return {'input_ids': torch.tensor(input_ids), 'attention_mask': torch.tensor(mask)}
+    
+    def batch_decode(self, sequences, skip_special_tokens=True):
+        decoded = []
+        for row in sequences.tolist():
+            words = [self.words[i] for i in row if not (skip_special_tokens and i == self.pad_token_id)]
+            decoded.append(' '.join(words).upper())
+        return decoded
+
+
+class FakeModel:
+    """Stand-in for MarianMTModel whose 'translation' echoes the input ids"""
+    
+    def __init__(self):
+        self.batch_shapes = []
+        self.generate_kwargs = []
+    
+    def generate(self, input_ids=None, attention_mask=None, **kwargs):
+        self.batch_shapes.append(tuple(input_ids.shape))
+        self.generate_kwargs.append(kwargs)
+        return input_ids
+
+
+@pytest.fixture
+def fake_marian():
+    """Create a (model, tokenizer) pair that upper-cases its input"""
+    return FakeModel(), FakeTokenizer()
+
+
+@pytest.fixture
+def fake_marian_routes():
+    """Patch model loading to give every model folder its own fake (model, tokenizer) pair"""
+    pairs = {}
+    
+    def load(kind):
+        def from_pretrained(path, *args, **kwargs):
+            route = os.path.basename(path).replace('opus-mt-', '')
+            pair = pairs.setdefault(route, (FakeModel(), FakeTokenizer()))
+            return pair[0] if kind == 'model' else pair[1]
+        return from_pretrained
+    
+    with patch('translator.MarianMTModel.from_pretrained', side_effect=load('model')), \
+            patch('translator.MarianTokenizer.from_pretrained', side_effect=load('tokenizer')):
+        yield pairs
+
+
+@pytest.fixture
+def tiny_model_dir(temp_model_dir):
+    """Save a tiny randomly initialized Marian model (weights only)"""
+    import torch
+    from transformers.models.marian import MarianConfig, MarianMTModel
+    config = MarianConfig(
+        vocab_size=32, d_model=16, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2,
+        encoder_ffn_dim=32, decoder_ffn_dim=32, max_position_embeddings=64,
+        pad_token_id=2, eos_token_id=0, decoder_start_token_id=2
+    )
+    path = os.path.join(temp_model_dir, 'opus-mt-en-es')
+    torch.manual_seed(0)
+    MarianMTModel(config).save_pretrained(path)
+    return path
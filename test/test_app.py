@@ -40,6 +40,7 @@ class TestFlaskApp:
     def test_supported_languages_route(self, mock_translator, client):
         """Test the supported languages route"""
         mock_translator.get_supported_langs.return_value = [['en', 'es'], ['es', 'en'], ['fr', 'en']]
+        mock_translator.get_pivot_pairs.return_value = {}
         
         response = client.get('/supported_languages')
         assert response.status_code == 200
@@ -50,6 +51,19 @@ class TestFlaskApp:
         assert 'total_pairs' in data
         assert data['total_pairs'] == 3
         
+    @patch('app.translator')
+    def test_supported_languages_pivot_pairs(self, mock_translator, client):
+        """Test that pairs translated through a pivot are listed with their chain"""
+        mock_translator.get_supported_langs.return_value = [['en', 'es'], ['fr', 'en'], ['fr', 'es']]
+        mock_translator.get_pivot_pairs.return_value = {'fr-es': ['fr-en', 'en-es']}
+        
+        response = client.get('/supported_languages')
+        assert response.status_code == 200
+        
+        data = json.loads(response.data)
+        assert data['total_pairs'] == 3
+        assert data['pivot_pairs'] == {'fr-es': ['fr-en', 'en-es']}
+        
     @patch('app.translator')
     def test_translate_success(self, mock_translator, client):
         """Test successful translation"""
@@ -72,6 +86,63 @@ class TestFlaskApp:
         assert result['source_language'] == 'en'
         assert result['target_language'] == 'es'
         
+    @patch('app.translator')
+    def test_translate_with_profile(self, mock_translator, client):
+        """Test that the requested generation profile is passed to the translator"""
+        mock_translator.translate.return_value = "Hola mundo"
+        
+        data = {'source': 'en', 'target': 'es', 'text': 'Hello world', 'profile': 'fast'}
+        response = client.post('/translate',
+                             data=json.dumps(data),
+                             content_type='application/json')
+        
+        assert response.status_code == 200
+        assert json.loads(response.data)['profile'] == 'fast'
+        mock_translator.translate.assert_called_once_with('en', 'es', 'Hello world', 'fast')
+        
+    @patch('app.translator')
+    def test_translate_default_profile(self, mock_translator, client):
+        """Test that requests without a profile use the server default"""
+        mock_translator.translate.return_value = "Hola mundo"
+        
+        data = {'source': 'en', 'target': 'es', 'text': 'Hello world'}
+        with patch('app.Config.GENERATION_PROFILE', 'fast'):
+            response = client.post('/translate',
+                                 data=json.dumps(data),
+                                 content_type='application/json')
+        
+        assert response.status_code == 200
+        mock_translator.translate.assert_called_once_with('en', 'es', 'Hello world', 'fast')
+        
+    @patch('app.translator')
+    def test_translate_unknown_profile(self, mock_translator, client):
+        """Test that an unknown profile is rejected"""
+        for endpoint, field, value in [('/translate', 'text', 'Hello'), ('/translate/batch', 'texts', ['Hello'])]:
+            data = {'source': 'en', 'target': 'es', field: value, 'profile': 'turbo'}
+            response = client.post(endpoint,
+                                 data=json.dumps(data),
+                                 content_type='application/json')
+            
+            assert response.status_code == 400
+            assert 'turbo' in json.loads(response.data)['error']
+        mock_translator.translate.assert_not_called()
+        mock_translator.translate_batch.assert_not_called()
+        
+    @patch('app.translator')
+    def test_translate_profile_must_be_string(self, mock_translator, client):
+        """Test that a profile that is not a string is rejected with 400"""
+        for endpoint, field, value, profile in [('/translate', 'text', 'Hello', ['fast']),
+                                                 ('/translate/batch', 'texts', ['Hello'], {})]:
+            data = {'source': 'en', 'target': 'es', field: value, 'profile': profile}
+            response = client.post(endpoint,
+                                 data=json.dumps(data),
+                                 content_type='application/json')
+            
+            assert response.status_code == 400
+            assert 'Unknown profile' in json.loads(response.data)['error']
+        mock_translator.translate.assert_not_called()
+        mock_translator.translate_batch.assert_not_called()
+        
     def test_translate_missing_fields(self, client):
         """Test translation with missing required fields"""
         data = {
@@ -117,6 +188,7 @@ class TestFlaskApp:
     def test_translate_unsupported_language_pair(self, mock_translator, client):
         """Test translation with unsupported language pair"""
         mock_translator.get_supported_langs.return_value = [['en', 'es']]
+        mock_translator.is_supported.return_value = False
         
         data = {
             'source': 'fr',
@@ -132,6 +204,91 @@ class TestFlaskApp:
         assert 'error' in result
         assert 'not supported' in result['error']
         
+    @patch('app.translator')
+    def test_translate_stream(self, mock_translator, client):
+        """Test that segments are streamed as server-sent events"""
+        mock_translator.translate_stream.return_value = iter([
+            {'type': 'start', 'segments': 2, 'separator': ''},
+            {'type': 'segment', 'index': 0, 'text': 'Hola.', 'separator': ' '},
+            {'type': 'segment', 'index': 1, 'text': 'Adiós.', 'separator': ''},
+            {'type': 'done', 'translated_text': 'Hola. Adiós.'}
+        ])
+        
+        data = {
+            'source': 'en',
+            'target': 'es',
+            'text': 'Hello. Bye.'
+        }
+        response = client.post('/translate/stream',
+                             data=json.dumps(data),
+                             content_type='application/json')
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        body = response.get_data(as_text=True)
+        assert body.count('event: segment') == 2
+        assert 'Adiós.' in body
+        assert 'event: done' in body
+        
+    @patch('app.translator')
+    def test_translate_model_loading(self, mock_translator, client):
+        """Test that a model still loading is answered with 503 and Retry-After"""
+        from translator import ModelNotReady
+        mock_translator.translate.side_effect = ModelNotReady('en-es', 7)
+        
+        data = {
+            'source': 'en',
+            'target': 'es',
+            'text': 'Hello world'
+        }
+        response = client.post('/translate',
+                             data=json.dumps(data),
+                             content_type='application/json')
+        
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '7'
+        assert json.loads(response.data)['retry_after'] == 7
+        
+    @patch('app.translator')
+    def test_translate_stream_model_loading(self, mock_translator, client):
+        """Test that a stream for a loading model is refused before it starts"""
+        from translator import ModelNotReady
+        
+        def loading_stream(source, target, text):
+            raise ModelNotReady('en-es', 3)
+            yield
+        mock_translator.translate_stream.side_effect = loading_stream
+        
+        data = {
+            'source': 'en',
+            'target': 'es',
+            'text': 'Hello world'
+        }
+        response = client.post('/translate/stream',
+                             data=json.dumps(data),
+                             content_type='application/json')
+        
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '3'
+        
+    @patch('app.translator')
+    def test_translate_stream_unsupported_language_pair(self, mock_translator, client):
+        """Test that validation errors are returned as JSON before streaming"""
+        mock_translator.is_supported.return_value = False
+        mock_translator.get_supported_langs.return_value = [['en', 'es']]
+        
+        data = {
+            'source': 'fr',
+            'target': 'de',
+            'text': 'Bonjour'
+        }
+        response = client.post('/translate/stream',
+                             data=json.dumps(data),
+                             content_type='application/json')
+        
+        assert response.status_code == 400
+        assert 'not supported' in json.loads(response.data)['error']
+        
     @patch('app.translator')
     def test_translate_batch_success(self, mock_translator, client):
         """Test successful batch translation"""
@@ -152,6 +309,123 @@ class TestFlaskApp:
         assert result['success'] is True
         assert result['count'] == 2
         assert len(result['results']) == 2
+        assert result['profile'] == 'quality'
+        mock_translator.translate_batch.assert_called_once_with(
+            'en', 'es', ['Hello world', 'Goodbye world'], 'quality')
+        
+    @patch('app.translator')
+    def test_metrics(self, mock_translator, client):
+        """Test the Prometheus metrics endpoint"""
+        mock_translator.get_memory_stats.return_value = {'models': {'en-es': {'bytes': 2048, 'pinned': False}}}
+        client.get('/health')
+        
+        response = client.get('/metrics')
+        
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        text = response.data.decode()
+        assert '# TYPE translator_generate_seconds histogram' in text
+        assert 'translator_resident_model_bytes{route="en-es"} 2048.0' in text
+        assert 'http_requests_total{endpoint="/health",method="GET",status="200"}' in text
+        
+    @patch('app.translator')
+    def test_capture_mode(self, mock_translator, client, temp_model_dir):
+        """Test that capture mode records the request shape without the text"""
+        from capture import WorkloadRecorder, read_capture
+        mock_translator.translate_batch.return_value = ['Hola', 'Adiós']
+        path = os.path.join(temp_model_dir, 'workload.jsonl')
+        recorder = WorkloadRecorder(path)
+        
+        data = {'source': 'en', 'target': 'es', 'texts': ['Hello', 'Goodbye']}
+        with patch('app.workload_recorder', recorder):
+            client.post('/translate/batch', data=json.dumps(data), content_type='application/json')
+            client.get('/health')
+        recorder.close()
+        
+        records = read_capture(path)
+        assert len(records) == 1
+        assert records[0]['route'] == 'en-es'
+        assert records[0]['lengths'] == [5, 7]
+        assert records[0]['status'] == 200
+        with open(path) as f:
+            assert 'Hello' not in f.read()
+        
+    @patch('app.translator')
+    def test_translate_multi_single_text(self, mock_translator, client):
+        """Test translating one text into several languages"""
+        mock_translator.is_supported.return_value = True
+        mock_translator.translate_multi.return_value = {'es': ['Hola'], 'fr': ['Bonjour']}
+        
+        data = {'source': 'en', 'targets': ['es', 'fr', 'es'], 'text': 'Hello'}
+        response = client.post('/translate/multi',
+                             data=json.dumps(data),
+                             content_type='application/json')
+        
+        assert response.status_code == 200
+        result = json.loads(response.data)
+        assert result['translations'] == {'es': 'Hola', 'fr': 'Bonjour'}
+        assert result['target_languages'] == ['es', 'fr']
+        mock_translator.translate_multi.assert_called_once_with('en', ['es', 'fr'], ['Hello'])
+        
+    @patch('app.translator')
+    def test_translate_multi_text_list(self, mock_translator, client):
+        """Test that a list of texts gets a list per target"""
+        mock_translator.is_supported.return_value = True
+        mock_translator.translate_multi.return_value = {'es': ['Hola', 'Adiós']}
+        
+        data = {'source': 'en', 'targets': ['es'], 'texts': ['Hello', 'Goodbye']}
+        response = client.post('/translate/multi',
+                             data=json.dumps(data),
+                             content_type='application/json')
+        
+        assert response.status_code == 200
+        result = json.loads(response.data)
+        assert result['translations'] == {'es': ['Hola', 'Adiós']}
+        assert result['count'] == 2
+        
+    @patch('app.translator')
+    def test_translate_multi_unsupported_target(self, mock_translator, client):
+        """Test that an unsupported target rejects the whole request"""
+        mock_translator.is_supported.side_effect = lambda source, target: target != 'xx'
+        mock_translator.get_supported_langs.return_value = [['en', 'es']]
+        
+        data = {'source': 'en', 'targets': ['es', 'xx'], 'text': 'Hello'}
+        response = client.post('/translate/multi',
+                             data=json.dumps(data),
+                             content_type='application/json')
+        
+        assert response.status_code == 400
+        assert 'en-xx' in json.loads(response.data)['error']
+        mock_translator.translate_multi.assert_not_called()
+        
+    @pytest.mark.parametrize('data', [
+        {'source': 'en', 'text': 'Hello'},
+        {'source': 'en', 'targets': 'es', 'text': 'Hello'},
+        {'source': 'en', 'targets': ['es'], 'texts': []},
+        {'source': 'en', 'targets': ['es'], 'text': '  '},
+        {'source': 'en', 'targets': [f'l{i}' for i in range(21)], 'text': 'Hello'},
+    ])
+    def test_translate_multi_invalid(self, client, data):
+        """Test validation of the multi-target request"""
+        response = client.post('/translate/multi',
+                             data=json.dumps(data),
+                             content_type='application/json')
+        assert response.status_code == 400
+        
+    @patch('app.translator')
+    def test_translate_multi_model_not_ready(self, mock_translator, client):
+        """Test that a loading model is answered with 503"""
+        from translator import ModelNotReady
+        mock_translator.is_supported.return_value = True
+        mock_translator.translate_multi.side_effect = ModelNotReady('en-fr', 3)
+        
+        data = {'source': 'en', 'targets': ['es', 'fr'], 'text': 'Hello'}
+        response = client.post('/translate/multi',
+                             data=json.dumps(data),
+                             content_type='application/json')
+        
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '3'
         
     def test_translate_batch_missing_fields(self, client):
         """Test batch translation with missing fields"""
@@ -200,12 +474,42 @@ class TestFlaskApp:
         assert 'error' in result
         assert 'list' in result['error']
         
+    @patch('app.translator')
+    def test_ready_route(self, mock_translator, client):
+        """Test that /ready answers 503 until warmup has finished"""
+        mock_translator.get_warmup_status.return_value = {
+            'state': 'running', 'routes': {'en-es': {'state': 'running'}}
+        }
+        mock_translator.is_ready.return_value = False
+        response = client.get('/ready')
+        assert response.status_code == 503
+        assert json.loads(response.data)['warmup']['state'] == 'running'
+        
+        mock_translator.get_warmup_status.return_value = {
+            'state': 'done', 'routes': {'en-es': {'state': 'done', 'seconds': 0.5}}
+        }
+        mock_translator.is_ready.return_value = True
+        response = client.get('/ready')
+        assert response.status_code == 200
+        assert json.loads(response.data)['status'] == 'ready'
+        
+    def test_health_route_is_liveness(self, client):
+        """Test that /health answers without waiting for warmup"""
+        response = client.get('/health')
+        assert response.status_code == 200
+        
     @patch('app.translator')
     def test_models_info_route(self, mock_translator, client):
         """Test the models info route"""
         mock_translator.get_loaded_models.return_value = ['en-es', 'fr-en']
         mock_translator.get_supported_langs.return_value = [['en', 'es'], ['fr', 'en']]
         mock_translator.models_dir = '/test/models'
+        mock_translator.get_cache_stats.return_value = {'enabled': True, 'entries': 0, 'routes': {}}
+        mock_translator.get_memory_stats.return_value = {'resident_bytes': 0, 'models': {}}
+        mock_translator.get_inference_stats.return_value = {'enabled': False}
+        mock_translator.get_load_states.return_value = {
+            'en-es': {'state': 'ready', 'seconds': 1.2, 'error': None}
+        }
         
         response = client.get('/models')
         assert response.status_code == 200
@@ -214,30 +518,45 @@ class TestFlaskApp:
         assert 'loaded_models' in data
         assert 'supported_languages' in data
         assert 'models_directory' in data
+        assert 'cache' in data
+        assert 'memory' in data
+        assert data['model_states']['en-es']['state'] == 'ready'
         assert len(data['loaded_models']) == 2
         
-    @patch('subprocess.run')
-    def test_download_model_success(self, mock_subprocess, client):
-        """Test successful model download"""
-        # Mock successful subprocess
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = "Model downloaded successfully"
-        mock_result.stderr = ""
-        mock_subprocess.return_value = mock_result
+    @patch('download_model.download_language_model')
+    def test_download_model_success(self, mock_download, client):
+        """Test that a download runs as a background job with a status endpoint"""
+        from app import download_jobs
+        
+        def fake_download(source, target, progress=None, models_dir=None):
+            progress('config.json', 10, 10)
+            progress('pytorch_model.bin', 512, 1024)
+        mock_download.side_effect = fake_download
         
         data = {
             'source': 'en',
             'target': 'fr'
         }
-        response = client.post('/download_model',
-                             data=json.dumps(data),
-                             content_type='application/json')
-        
+        with patch('app.translator') as mock_translator:
+            response = client.post('/download_model',
+                                 data=json.dumps(data),
+                                 content_type='application/json')
+            
+            assert response.status_code == 202
+            result = json.loads(response.data)
+            assert result['success'] is True
+            assert result['status_url'] == f"/download_model/{result['job_id']}"
+            
+            download_jobs.wait(result['job_id'], timeout=5)
+            mock_translator.refresh_route.assert_called_once_with('en-fr')
+        
+        response = client.get(result['status_url'])
         assert response.status_code == 200
-        result = json.loads(response.data)
-        assert result['success'] is True
-        assert 'downloaded successfully' in result['message']
+        status = json.loads(response.data)
+        assert status['state'] == 'done'
+        assert status['files']['pytorch_model.bin'] == {'bytes_done': 512, 'total': 1024}
+        assert status['bytes_done'] == 522
+        assert status['bytes_total'] == 1034
         
     def test_download_model_missing_fields(self, client):
         """Test model download with missing fields"""
@@ -269,15 +588,12 @@ class TestFlaskApp:
         assert 'error' in result
         assert 'different' in result['error']
         
-    @patch('subprocess.run')
-    def test_download_model_subprocess_error(self, mock_subprocess, client):
-        """Test model download with subprocess error"""
-        # Mock failed subprocess
-        mock_result = MagicMock()
-        mock_result.returncode = 1
-        mock_result.stdout = ""
-        mock_result.stderr = "Download failed"
-        mock_subprocess.return_value = mock_result
+    @patch('download_model.download_language_model')
+    def test_download_model_error(self, mock_download, client):
+        """Test that a failed download is reported by the job status"""
+        from app import download_jobs
+        from download_model import DownloadError
+        mock_download.side_effect = DownloadError("Error downloading config.json: HTTP Error 404")
         
         data = {
             'source': 'en',
@@ -286,15 +602,23 @@ class TestFlaskApp:
         response = client.post('/download_model',
                              data=json.dumps(data),
                              content_type='application/json')
+        job_id = json.loads(response.data)['job_id']
+        download_jobs.wait(job_id, timeout=5)
         
-        assert response.status_code == 500
-        result = json.loads(response.data)
-        assert result['success'] is False
-        assert 'Failed to download' in result['message']
+        response = client.get(f'/download_model/{job_id}')
+        status = json.loads(response.data)
+        assert status['state'] == 'failed'
+        assert '404' in status['error']
+        
+    def test_download_status_unknown_job(self, client):
+        """Test status of a job that does not exist"""
+        response = client.get('/download_model/unknown')
+        assert response.status_code == 404
         
+    @patch('app.translator')
     @patch('os.path.exists')
     @patch('shutil.rmtree')
-    def test_delete_model_success(self, mock_rmtree, mock_exists, client):
+    def test_delete_model_success(self, mock_rmtree, mock_exists, mock_translator, client):
         """Test successful model deletion"""
         mock_exists.return_value = True
         
@@ -310,6 +634,7 @@ class TestFlaskApp:
         result = json.loads(response.data)
         assert result['success'] is True
         assert 'deleted successfully' in result['message']
+        mock_translator.refresh_route.assert_called_once_with('en-es')
         
     def test_delete_model_missing_fields(self, client):
         """Test model deletion with missing fields"""
@@ -359,6 +684,24 @@ class TestFlaskApp:
         response = client.get('/lang_routes?lang=en')
         assert response.status_code == 200
         
+    @patch('app.translator')
+    def test_supported_languages_etag(self, mock_translator, client):
+        """Test that unchanged language lists are answered with 304"""
+        mock_translator.get_supported_langs.return_value = [['en', 'es']]
+        mock_translator.get_pivot_pairs.return_value = {}
+        
+        response = client.get('/supported_languages')
+        assert response.status_code == 200
+        etag = response.headers.get('ETag')
+        assert etag
+        
+        response = client.get('/supported_languages', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        
+        mock_translator.get_supported_langs.return_value = [['en', 'es'], ['es', 'en']]
+        response = client.get('/supported_languages', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        
     def test_lang_routes_missing_param(self, client):
         """Test lang_routes without required parameter"""
         response = client.get('/lang_routes')
@@ -0,0 +1,210 @@
+import pytest
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+from asgi_app import AsyncServer, RouteQueues, route_key
+
+
+async def call(server, method, path, payload=None):
+    """Send one request to an ASGI app and collect its response"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'root_path': '',
+        'headers': [(b'content-type', b'application/json')] if payload is not None else [],
+        'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+    }
+    await server(scope, receive, send)
+    start = sent[0]
+    return {
+        'status': start['status'],
+        'headers': {name.decode(): value.decode() for name, value in start['headers']},
+        'body': b''.join(message.get('body', b'') for message in sent[1:]),
+        'messages': sent,
+    }
+
+
+def blocking_app(release):
+    """WSGI app whose en-es translations wait until release is set"""
+    def wsgi_app(environ, start_response):
+        payload = json.loads(environ['wsgi.input'].read() or b'{}')
+        if payload.get('target') == 'es':
+            release.wait(5)
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [json.dumps({'translated_text': 'ok'}).encode('utf-8')]
+    return wsgi_app
+
+
+class TestRouteKey:
+    """Test cases for picking the queue of a request"""
+
+    @pytest.mark.parametrize('path,payload,expected', [
+        ('/translate', {'source': 'en', 'target': 'es', 'text': 'hi'}, 'en-es'),
+        ('/translate/batch', {'source': 'en', 'target': 'fr', 'texts': ['hi']}, 'en-fr'),
+        ('/translate/multi', {'source': 'en', 'targets': ['es', 'fr']}, 'en-multi'),
+        ('/translate', {'source': 'en'}, None),
+        ('/translate', ['en', 'es'], None),
+        ('/health', {'source': 'en', 'target': 'es'}, None),
+    ])
+    def test_route_key(self, path, payload, expected):
+        """Test that translation requests are queued by language route"""
+        assert route_key(path, payload) == expected
+
+    @pytest.mark.parametrize('path,payload,expected', [
+        ('/translate', {'source': 'en', 'target': 'es'}, 'en-es'),
+        ('/translate', {'source': 'en', 'target': 'xx'}, None),
+        ('/translate/multi', {'source': 'en', 'targets': ['es', 'fr']}, 'en-multi'),
+        ('/translate/multi', {'source': 'en', 'targets': ['es', 'xx']}, None),
+        ('/translate/multi', {'source': 'en', 'targets': 'es'}, None),
+    ])
+    def test_unsupported_pairs_are_not_queued(self, path, payload, expected):
+        """Test that only supported pairs get a queue"""
+        def is_supported(source, target):
+            return target in ('es', 'fr')
+        assert route_key(path, payload, is_supported) == expected
+
+
+class TestRouteQueues:
+    """Test cases for the per-route admission control"""
+
+    def test_depth_limit(self):
+        """Test that a route refuses requests once its queue is full"""
+        queues = RouteQueues(concurrency=1, max_depth=2, max_wait=0)
+        assert queues.reserve('en-es')[0]
+        assert queues.reserve('en-es')[0]
+        assert not queues.reserve('en-es')[0]
+        # Other routes have their own queue
+        assert queues.reserve('en-fr')[0]
+
+        queues.release('en-es')
+        assert queues.reserve('en-es')[0]
+
+    def test_estimated_wait_limit(self):
+        """Test that a request is refused when it would wait too long"""
+        queues = RouteQueues(concurrency=1, max_depth=10, max_wait=5)
+        queues.reserve('en-es')
+        queues.release('en-es', 4.0)
+
+        assert queues.reserve('en-es') == (True, 0.0)
+        assert queues.reserve('en-es') == (True, 4.0)
+        assert queues.reserve('en-es') == (False, 8.0)
+
+    def test_idle_route_keeps_average(self):
+        """Test that an idle route drops its queue but keeps its average duration"""
+        queues = RouteQueues(smoothing=0.5)
+        queues.reserve('en-es')
+        queues.release('en-es', 2.0)
+        queues.reserve('en-es')
+        queues.release('en-es', 4.0)
+        assert queues.stats()['routes'] == {'en-es': {'depth': 0, 'average_seconds': 3.0}}
+
+
+class TestAsyncServer:
+    """Test cases for the ASGI server"""
+
+    def test_serves_flask_routes(self):
+        """Test that other routes are answered by the Flask handlers"""
+        from app import app
+        server = AsyncServer(app, threads=2)
+        response = asyncio.run(call(server, 'GET', '/health'))
+        assert response['status'] == 200
+        assert json.loads(response['body']) == {'status': 'healthy'}
+
+    @patch('app.translator')
+    def test_translate(self, mock_translator):
+        """Test a translation through the route queue"""
+        from app import app
+        mock_translator.is_supported.return_value = True
+        mock_translator.translate.return_value = 'Hola mundo'
+        server = AsyncServer(app, threads=2)
+
+        response = asyncio.run(call(server, 'POST', '/translate', {'source': 'en', 'target': 'es', 'text': 'Hello world'}))
+
+        assert response['status'] == 200
+        assert json.loads(response['body'])['translated_text'] == 'Hola mundo'
+        stats = server.queues.stats()['routes']['en-es']
+        assert stats['depth'] == 0 and stats['average_seconds'] is not None
+
+    @patch('app.translator')
+    def test_unsupported_pair_skips_queue(self, mock_translator):
+        """Test that an unsupported pair is answered by the handler without a queue"""
+        from app import app
+        from asgi_app import supported_by_translator
+        mock_translator.is_supported.return_value = False
+        mock_translator.get_supported_langs.return_value = []
+        server = AsyncServer(app, threads=2, is_supported=supported_by_translator)
+
+        response = asyncio.run(call(server, 'POST', '/translate', {'source': 'en', 'target': 'zz', 'text': 'Hello'}))
+
+        assert response['status'] == 400
+        assert server.queues.stats()['routes'] == {}
+
+    def test_full_queue_answers_429(self):
+        """Test that a request beyond the queue limit fails fast with Retry-After"""
+        import metrics
+        release = threading.Event()
+        server = AsyncServer(blocking_app(release), threads=4, queues=RouteQueues(concurrency=1, max_depth=1))
+        rejected = metrics.REJECTED_REQUESTS_TOTAL.get(route='en-es')
+
+        async def scenario():
+            first = asyncio.ensure_future(call(server, 'POST', '/translate', {'source': 'en', 'target': 'es', 'text': 'a'}))
+            while server.queues.depth('en-es') == 0:
+                await asyncio.sleep(0.01)
+            second = await call(server, 'POST', '/translate', {'source': 'en', 'target': 'es', 'text': 'b'})
+            other = await call(server, 'POST', '/translate', {'source': 'en', 'target': 'fr', 'text': 'c'})
+            release.set()
+            return await first, second, other
+
+        first, second, other = asyncio.run(scenario())
+
+        assert first['status'] == 200
+        assert other['status'] == 200
+        assert second['status'] == 429
+        assert second['headers']['retry-after'] == '1'
+        assert json.loads(second['body'])['route'] == 'en-es'
+        assert metrics.REJECTED_REQUESTS_TOTAL.get(route='en-es') == rejected + 1
+
+    def test_streamed_response(self):
+        """Test that each chunk of a streamed response is sent as it is produced"""
+        def wsgi_app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/event-stream')])
+            return iter([b'data: 1\n\n', b'', b'data: 2\n\n'])
+
+        response = asyncio.run(call(AsyncServer(wsgi_app), 'POST', '/translate/stream',
+                                    {'source': 'en', 'target': 'es', 'text': 'a'}))
+
+        assert response['body'] == b'data: 1\n\ndata: 2\n\n'
+        chunks = [message for message in response['messages'] if message.get('more_body')]
+        assert len(chunks) == 2
+        assert response['headers']['content-type'] == 'text/event-stream'
+
+    def test_app_error_answers_500(self):
+        """Test that an exception escaping the WSGI app becomes a 500"""
+        def wsgi_app(environ, start_response):
+            raise RuntimeError('boom')
+
+        response = asyncio.run(call(AsyncServer(wsgi_app), 'GET', '/'))
+        assert response['status'] == 500
+
+    def test_lifespan(self):
+        """Test the startup and shutdown handshake"""
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(AsyncServer(lambda environ, start_response: [])({'type': 'lifespan'}, receive, send))
+        assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
@@ -0,0 +1,133 @@
+import pytest
+import threading
+import time
+from batching import MicroBatcher, plan_length_buckets
+
+
+class TestMicroBatcher:
+    """Test cases for the micro-batching scheduler"""
+
+    def test_single_request(self):
+        """Test that a lone request is executed after the wait window"""
+        batcher = MicroBatcher(lambda key, texts: [t.upper() for t in texts], max_wait_ms=1)
+        try:
+            assert batcher.translate('en-es', 'hello', timeout=5) == 'HELLO'
+        finally:
+            batcher.close()
+
+    def test_concurrent_requests_share_batch(self):
+        """Test that concurrent requests for a route are grouped"""
+        calls = []
+
+        def run_batch(key, texts):
+            calls.append(list(texts))
+            return [f"{key}:{t}" for t in texts]
+
+        batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=200)
+        try:
+            futures = [batcher.submit('en-es', f'text {i}') for i in range(5)]
+            results = [f.result(timeout=5) for f in futures]
+        finally:
+            batcher.close()
+
+        # Each caller gets its own result
+        assert results == [f'en-es:text {i}' for i in range(5)]
+        assert len(calls) == 1
+        assert len(calls[0]) == 5
+
+    def test_max_batch_size(self):
+        """Test that batches never exceed the configured size"""
+        sizes = []
+
+        def run_batch(key, texts):
+            sizes.append(len(texts))
+            return texts
+
+        batcher = MicroBatcher(run_batch, max_batch_size=3, max_wait_ms=200)
+        try:
+            futures = [batcher.submit('en-es', str(i)) for i in range(7)]
+            results = [f.result(timeout=5) for f in futures]
+        finally:
+            batcher.close()
+
+        assert results == [str(i) for i in range(7)]
+        assert max(sizes) <= 3
+        assert sum(sizes) == 7
+
+    def test_routes_are_batched_separately(self):
+        """Test that requests for different routes never share a batch"""
+        calls = []
+        lock = threading.Lock()
+
+        def run_batch(key, texts):
+            with lock:
+                calls.append((key, len(texts)))
+            return [key] * len(texts)
+
+        batcher = MicroBatcher(run_batch, max_wait_ms=50)
+        try:
+            first = batcher.submit('en-es', 'a')
+            second = batcher.submit('es-en', 'b')
+            assert first.result(timeout=5) == 'en-es'
+            assert second.result(timeout=5) == 'es-en'
+        finally:
+            batcher.close()
+
+        assert sorted(calls) == [('en-es', 1), ('es-en', 1)]
+
+    def test_batch_error_propagates(self):
+        """Test that a failing batch fails every request in it"""
+        def run_batch(key, texts):
+            raise RuntimeError("generate failed")
+
+        batcher = MicroBatcher(run_batch, max_wait_ms=1)
+        try:
+            future = batcher.submit('en-es', 'hello')
+            with pytest.raises(RuntimeError):
+                future.result(timeout=5)
+        finally:
+            batcher.close()
+
+    def test_submit_after_close(self):
+        """Test that a closed scheduler rejects new requests"""
+        batcher = MicroBatcher(lambda key, texts: texts)
+        batcher.close()
+        with pytest.raises(RuntimeError):
+            batcher.submit('en-es', 'hello')
+
+    def test_observe_wait(self):
+        """Test that the time each request waited for its batch is reported"""
+        waits = []
+        batcher = MicroBatcher(lambda key, texts: texts, max_wait_ms=50,
+                               observe_wait=lambda key, seconds: waits.append((key, seconds)))
+        try:
+            futures = [batcher.submit('en-es', text) for text in ('a', 'b')]
+            assert [future.result(timeout=5) for future in futures] == ['a', 'b']
+        finally:
+            batcher.close()
+        assert [key for key, _ in waits] == ['en-es', 'en-es']
+        assert all(0 <= seconds < 5 for _, seconds in waits)
+
+
+class TestPlanLengthBuckets:
+    """Test cases for token-budgeted length bucketing"""
+
+    def test_empty(self):
+        """Test that no items produce no buckets"""
+        assert plan_length_buckets([], 100) == []
+
+    def test_sorted_by_length(self):
+        """Test that buckets hold items of similar length"""
+        buckets = plan_length_buckets([50, 1, 49, 2], 100)
+        assert buckets == [[1, 3], [2, 0]]
+
+    def test_budget_respected(self):
+        """Test that padded size stays within the budget"""
+        lengths = [10] * 25
+        buckets = plan_length_buckets(lengths, 100)
+        assert all(len(bucket) * 10 <= 100 for bucket in buckets)
+        assert sorted(i for bucket in buckets for i in bucket) == list(range(25))
+
+    def test_oversized_item_gets_own_bucket(self):
+        """Test that an item longer than the budget is still scheduled"""
+        assert plan_length_buckets([500, 5], 100) == [[1], [0]]
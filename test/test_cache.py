@@ -0,0 +1,70 @@
+import pytest
+from cache import TranslationCache, normalize_text
+
+
+class TestTranslationCache:
+    """Test cases for the in-memory translation cache"""
+
+    def test_normalize_text(self):
+        """Test that whitespace differences map to the same text"""
+        assert normalize_text("  Hello \n  world ") == "Hello world"
+
+    def test_get_and_put(self):
+        """Test storing and retrieving a translation"""
+        cache = TranslationCache()
+        assert cache.get('en-es', 'Hello') is None
+        cache.put('en-es', 'Hello', 'Hola')
+        assert cache.get('en-es', ' Hello ') == 'Hola'
+        assert cache.get('es-en', 'Hello') is None
+
+    def test_settings_are_part_of_key(self):
+        """Test that different generation settings do not share entries"""
+        cache = TranslationCache()
+        cache.put('en-es', 'Hello', 'Hola', settings='quality')
+        assert cache.get('en-es', 'Hello', settings='fast') is None
+        assert cache.get('en-es', 'Hello', settings='quality') == 'Hola'
+
+    def test_entry_limit_evicts_least_recently_used(self):
+        """Test LRU eviction when the entry limit is reached"""
+        cache = TranslationCache(max_entries=2)
+        cache.put('en-es', 'one', 'uno')
+        cache.put('en-es', 'two', 'dos')
+        cache.get('en-es', 'one')
+        cache.put('en-es', 'three', 'tres')
+
+        assert cache.get('en-es', 'two') is None
+        assert cache.get('en-es', 'one') == 'uno'
+        assert cache.get('en-es', 'three') == 'tres'
+        assert cache.stats()['routes']['en-es']['evictions'] == 1
+
+    def test_byte_limit(self):
+        """Test that the cache stays within its byte budget"""
+        cache = TranslationCache(max_entries=1000, max_bytes=2000)
+        for i in range(50):
+            cache.put('en-es', f'text {i} ' * 5, f'texto {i} ' * 5)
+
+        stats = cache.stats()
+        assert stats['bytes'] <= 2000
+        assert 0 < stats['entries'] < 50
+
+    def test_get_many_counts_hits_and_misses(self):
+        """Test per-route hit and miss counters"""
+        cache = TranslationCache()
+        cache.put('en-es', 'Hello', 'Hola')
+        results = cache.get_many('en-es', ['Hello', 'Bye', 'Hello'])
+
+        assert results == ['Hola', None, 'Hola']
+        counters = cache.stats()['routes']['en-es']
+        assert counters['hits'] == 2
+        assert counters['misses'] == 1
+
+    def test_invalidate_route(self):
+        """Test removing all entries of a route"""
+        cache = TranslationCache()
+        cache.put('en-es', 'Hello', 'Hola')
+        cache.put('en-fr', 'Hello', 'Bonjour')
+
+        assert cache.invalidate_route('en-es') == 1
+        assert cache.get('en-es', 'Hello') is None
+        assert cache.get('en-fr', 'Hello') == 'Bonjour'
+        assert len(cache) == 1
@@ -0,0 +1,37 @@
+import os
+from capture import WorkloadRecorder, read_capture, request_shape
+
+
+class TestCapture:
+    """Test cases for the workload capture"""
+
+    def test_request_shape_has_no_content(self):
+        """Test that only the shape of a request is kept"""
+        shape = request_shape('/translate/batch', {
+            'source': 'en', 'target': 'es', 'texts': ['Hello', 'Secret message'], 'profile': 'fast'
+        })
+        assert shape == {'endpoint': '/translate/batch', 'route': 'en-es', 'lengths': [5, 14],
+                         'batch_size': 2, 'profile': 'fast'}
+        assert request_shape('/translate', {'source': 'en', 'target': 'es', 'text': 'Hi'})['lengths'] == [2]
+
+    def test_other_endpoints_are_not_captured(self):
+        """Test that only replayable endpoints are captured"""
+        assert request_shape('/download_model', {'source': 'en', 'target': 'es'}) is None
+        assert request_shape('/translate', None) is None
+
+    def test_record_and_read(self, temp_model_dir):
+        """Test that records are appended and read back in arrival order"""
+        path = os.path.join(temp_model_dir, 'capture', 'workload.jsonl')
+        recorder = WorkloadRecorder(path)
+        shape = request_shape('/translate', {'source': 'en', 'target': 'es', 'text': 'Hello'})
+        recorder.record(shape, 20.0, 200, 0.25)
+        recorder.record(shape, 10.0, 503, 0.01)
+        recorder.close()
+        with open(path, 'a') as f:
+            f.write('not json\n')
+
+        records = read_capture(path)
+        assert [record['arrived'] for record in records] == [10.0, 20.0]
+        assert records[1]['status'] == 200 and records[1]['seconds'] == 0.25
+        with open(path) as f:
+            assert 'Hello' not in f.read()
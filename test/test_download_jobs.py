@@ -0,0 +1,98 @@
+import pytest
+import threading
+from download_jobs import DownloadJobManager
+
+
+class TestDownloadJobManager:
+    """Test cases for background model download jobs"""
+
+    def test_job_reports_progress(self):
+        """Test that progress callbacks are reflected in the job status"""
+        def download(source, target, progress):
+            progress('vocab.json', 50, 100)
+            progress('vocab.json', 100, 100)
+
+        manager = DownloadJobManager(download)
+        job, created = manager.submit('en', 'es')
+        assert created
+        manager.wait(job.id, timeout=5)
+
+        status = job.to_dict()
+        assert status['state'] == 'done'
+        assert status['files'] == {'vocab.json': {'bytes_done': 100, 'total': 100}}
+        assert status['finished'] >= status['started']
+
+    def test_duplicate_requests_share_a_job(self):
+        """Test that a pair already downloading is not downloaded twice"""
+        release = threading.Event()
+        calls = []
+
+        def download(source, target, progress):
+            calls.append((source, target))
+            release.wait(5)
+
+        manager = DownloadJobManager(download)
+        first, created_first = manager.submit('en', 'es')
+        second, created_second = manager.submit('en', 'es')
+        release.set()
+        manager.wait(first.id, timeout=5)
+
+        assert created_first and not created_second
+        assert first is second
+        assert calls == [('en', 'es')]
+
+        # Once finished, the pair can be downloaded again
+        third, created_third = manager.submit('en', 'es')
+        manager.wait(third.id, timeout=5)
+        assert created_third and third.id != first.id
+
+    def test_concurrency_is_bounded(self):
+        """Test that jobs beyond max_concurrent wait in the queue"""
+        release = threading.Event()
+        started = threading.Event()
+
+        def download(source, target, progress):
+            started.set()
+            release.wait(5)
+
+        manager = DownloadJobManager(download, max_concurrent=1)
+        first, _ = manager.submit('en', 'es')
+        second, _ = manager.submit('en', 'fr')
+        started.wait(5)
+
+        assert first.state == 'running'
+        assert second.state == 'queued'
+        release.set()
+        manager.wait(second.id, timeout=5)
+        assert second.state == 'done'
+
+    def test_failure_and_completion_callback(self):
+        """Test that failures are recorded and only successes are registered"""
+        completed = []
+
+        def download(source, target, progress):
+            if target == 'xx':
+                raise RuntimeError('HTTP Error 404: Not Found')
+
+        manager = DownloadJobManager(download, on_complete=completed.append)
+        ok, _ = manager.submit('en', 'es')
+        bad, _ = manager.submit('en', 'xx')
+        manager.wait(ok.id, timeout=5)
+        manager.wait(bad.id, timeout=5)
+
+        assert bad.state == 'failed'
+        assert '404' in bad.error
+        assert [job.route for job in completed] == ['en-es']
+
+    def test_finished_jobs_are_pruned(self):
+        """Test that only the most recent finished jobs are kept"""
+        manager = DownloadJobManager(lambda source, target, progress: None, history=2)
+        jobs = []
+        for target in ['es', 'fr', 'de']:
+            job, _ = manager.submit('en', target)
+            manager.wait(job.id, timeout=5)
+            jobs.append(job)
+        manager.submit('en', 'it')
+
+        assert manager.get(jobs[0].id) is None
+        assert manager.get(jobs[2].id) is not None
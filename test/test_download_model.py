@@ -0,0 +1,214 @@
+import pytest
+import os
+import json
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from download_model import MANIFEST_FILENAME, DownloadError, download_language_model
+
+FILES = {
+    'config.json': b'c' * 1500,
+    'vocab.json': b'v' * 1500,
+    'pytorch_model.bin': bytes(range(256)) * 20,
+}
+
+
+class ModelServer(ThreadingHTTPServer):
+    """Local stand-in for the model bucket with Range support"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ModelRequestHandler)
+        self.files = {f'/opus-mt-en-es/{name}': data for name, data in FILES.items()}
+        self.requests = []
+        # path -> bytes sent before the connection is dropped (once)
+        self.drop_after = {}
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class ModelRequestHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('Range')))
+        data = self.server.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+
+        start = 0
+        if self.headers.get('Range'):
+            start = int(self.headers['Range'].split('=')[1].split('-')[0])
+            if start >= len(data):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(data) - 1}/{len(data)}')
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        drop_after = self.server.drop_after.pop(self.path, None)
+        if drop_after is not None:
+            self.wfile.write(body[:drop_after])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def model_server():
+    """Serve fake model files over HTTP"""
+    server = ModelServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    with patch('download_model.HUGGINGFACE_S3_BASE_URL', server.base_url), \
+            patch('download_model.FILENAMES', list(FILES)), \
+            patch('download_model.CHUNK_SIZE', 1000):
+        yield server
+    server.shutdown()
+    server.server_close()
+
+
+def publish_manifest(server, **overrides):
+    files = {name: {'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+             for name, data in FILES.items()}
+    for name, entry in overrides.items():
+        files[name.replace('_bin', '.bin')].update(entry)
+    server.files[f'/opus-mt-en-es/{MANIFEST_FILENAME}'] = json.dumps({'files': files}).encode()
+
+
+class TestDownloadModel:
+    """Test cases for the model downloader"""
+
+    def test_download_reports_progress(self, model_server, tmp_path):
+        """Test that every chunk of every file is reported"""
+        reports = []
+        models_dir = str(tmp_path / 'data')
+        download_language_model('en', 'es', progress=lambda *args: reports.append(args), models_dir=models_dir)
+
+        model_dir = os.path.join(models_dir, 'opus-mt-en-es')
+        assert os.path.getsize(os.path.join(model_dir, 'vocab.json')) == 1500
+        vocab_reports = [report for report in reports if report[0] == 'vocab.json']
+        assert vocab_reports == [('vocab.json', 0, 1500), ('vocab.json', 1000, 1500), ('vocab.json', 1500, 1500)]
+        assert {report[0] for report in reports} == set(FILES)
+
+    def test_download_writes_verified_manifest(self, model_server, tmp_path):
+        """Test that files are checked against the published manifest and recorded"""
+        publish_manifest(model_server)
+        models_dir = str(tmp_path / 'data')
+        download_language_model('en', 'es', models_dir=models_dir)
+
+        model_dir = os.path.join(models_dir, 'opus-mt-en-es')
+        with open(os.path.join(model_dir, MANIFEST_FILENAME)) as f:
+            manifest = json.load(f)['files']
+        assert manifest['pytorch_model.bin'] == {
+            'size': len(FILES['pytorch_model.bin']),
+            'sha256': hashlib.sha256(FILES['pytorch_model.bin']).hexdigest()
+        }
+        assert sorted(os.listdir(models_dir)) == ['.opus-mt-en-es.lock', 'opus-mt-en-es']
+        assert not any(name.endswith('.part') for name in os.listdir(model_dir))
+        # Written after every file is in place
+        marker = os.path.join(model_dir, '.download-complete')
+        assert os.path.getmtime(marker) >= max(os.path.getmtime(os.path.join(model_dir, name)) for name in FILES)
+
+    def test_dropped_connection_is_resumed(self, model_server, tmp_path):
+        """Test that an interrupted file continues with a Range request"""
+        model_server.drop_after['/opus-mt-en-es/pytorch_model.bin'] = 2000
+        models_dir = str(tmp_path / 'data')
+        download_language_model('en', 'es', models_dir=models_dir)
+
+        with open(os.path.join(models_dir, 'opus-mt-en-es', 'pytorch_model.bin'), 'rb') as f:
+            assert f.read() == FILES['pytorch_model.bin']
+        weight_requests = [request for request in model_server.requests
+                           if request[0] == '/opus-mt-en-es/pytorch_model.bin']
+        assert weight_requests == [('/opus-mt-en-es/pytorch_model.bin', None),
+                                   ('/opus-mt-en-es/pytorch_model.bin', 'bytes=2000-')]
+
+    def test_failed_download_keeps_partial_files(self, model_server, tmp_path):
+        """Test that a failed download leaves no model and resumes on the next attempt"""
+        model_server.drop_after['/opus-mt-en-es/pytorch_model.bin'] = 3000
+        models_dir = str(tmp_path / 'data')
+        with patch('download_model.Config.DOWNLOAD_RETRIES', 0):
+            with pytest.raises(DownloadError):
+                download_language_model('en', 'es', models_dir=models_dir)
+
+        assert not os.path.exists(os.path.join(models_dir, 'opus-mt-en-es'))
+        part = os.path.join(models_dir, '.opus-mt-en-es.partial', 'pytorch_model.bin.part')
+        assert os.path.getsize(part) == 3000
+
+        download_language_model('en', 'es', models_dir=models_dir)
+        assert ('/opus-mt-en-es/pytorch_model.bin', 'bytes=3000-') in model_server.requests
+        assert not os.path.exists(os.path.join(models_dir, '.opus-mt-en-es.partial'))
+
+    def test_checksum_mismatch_is_rejected(self, model_server, tmp_path):
+        """Test that a file not matching the manifest fails and is not kept"""
+        publish_manifest(model_server, pytorch_model_bin={'sha256': '0' * 64})
+        models_dir = str(tmp_path / 'data')
+        with pytest.raises(DownloadError, match='pytorch_model.bin'):
+            download_language_model('en', 'es', models_dir=models_dir)
+
+        assert not os.path.exists(os.path.join(models_dir, 'opus-mt-en-es'))
+        assert not os.path.exists(os.path.join(models_dir, '.opus-mt-en-es.partial', 'pytorch_model.bin.part'))
+
+    def test_failed_download_keeps_existing_model(self, model_server, tmp_path):
+        """Test that a failed update does not touch the installed model"""
+        model_dir = tmp_path / 'data' / 'opus-mt-en-es'
+        model_dir.mkdir(parents=True)
+        (model_dir / 'config.json').write_bytes(b'old')
+        del model_server.files['/opus-mt-en-es/vocab.json']
+
+        with pytest.raises(DownloadError, match='vocab.json'):
+            download_language_model('en', 'es', models_dir=str(tmp_path / 'data'))
+        assert (model_dir / 'config.json').read_bytes() == b'old'
+
+    def test_download_in_progress_elsewhere_is_rejected(self, model_server, tmp_path):
+        """Test that a model being downloaded by another process is not downloaded twice"""
+        import subprocess
+        import sys
+        models_dir = tmp_path / 'data'
+        models_dir.mkdir()
+        holder = subprocess.Popen([sys.executable, '-c', (
+            'import fcntl, sys, time\n'
+            'handle = open(sys.argv[1], "a")\n'
+            'fcntl.flock(handle, fcntl.LOCK_EX)\n'
+            'print("locked", flush=True)\n'
+            'time.sleep(30)\n'
+        ), str(models_dir / '.opus-mt-en-es.lock')], stdout=subprocess.PIPE)
+        try:
+            assert holder.stdout.readline() == b'locked\n'
+            with pytest.raises(DownloadError, match='already being downloaded'):
+                download_language_model('en', 'es', models_dir=str(models_dir))
+            assert not model_server.requests
+        finally:
+            holder.kill()
+            holder.wait()
+
+        download_language_model('en', 'es', models_dir=str(models_dir))
+        assert os.path.exists(models_dir / 'opus-mt-en-es' / 'config.json')
+
+    def test_missing_model_raises(self, model_server, tmp_path):
+        """Test that an unknown pair raises without creating a model directory"""
+        models_dir = str(tmp_path / 'data')
+        with pytest.raises(DownloadError):
+            download_language_model('en', 'fr', models_dir=models_dir)
+        assert not os.path.exists(os.path.join(models_dir, 'opus-mt-en-fr'))
+        assert not os.path.exists(os.path.join(models_dir, '.opus-mt-en-fr.partial'))
+
+    def test_replaced_model_drops_stale_safetensors(self, model_server, tmp_path):
+        """Test that converted weights of the previous download are not kept"""
+        model_dir = tmp_path / 'data' / 'opus-mt-en-es'
+        model_dir.mkdir(parents=True)
+        (model_dir / 'model.safetensors').write_bytes(b'old')
+
+        download_language_model('en', 'es', models_dir=str(tmp_path / 'data'))
+        assert not (model_dir / 'model.safetensors').exists()
+        assert (model_dir / 'pytorch_model.bin').read_bytes() == FILES['pytorch_model.bin']
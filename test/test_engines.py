@@ -0,0 +1,84 @@
+import pytest
+import os
+import torch
+from unittest.mock import patch
+from transformers.models.marian import MarianMTModel
+
+pytest.importorskip('onnxruntime')
+
+from engines import (DECODER_FILENAME, ENCODER_FILENAME, ONNX_DIRNAME, OnnxMarianEngine,
+                     export_onnx, load_onnx_engine, onnx_export_is_current)
+
+
+@pytest.fixture
+def input_batch():
+    """Padded batch of source ids for the tiny model (eos = 0, pad = 2)"""
+    input_ids = torch.tensor([[5, 9, 12, 7, 0], [8, 4, 0, 2, 2], [11, 0, 2, 2, 2]])
+    return {'input_ids': input_ids, 'attention_mask': (input_ids != 2).long()}
+
+
+class TestOnnxEngine:
+    """Test cases for the ONNX Runtime engine"""
+
+    def test_export_writes_graphs(self, tiny_model_dir):
+        """Test that the export is stored next to the model files"""
+        assert not onnx_export_is_current(tiny_model_dir)
+        output_dir = export_onnx(tiny_model_dir)
+
+        assert output_dir == os.path.join(tiny_model_dir, ONNX_DIRNAME)
+        assert os.path.exists(os.path.join(output_dir, ENCODER_FILENAME))
+        assert os.path.exists(os.path.join(output_dir, DECODER_FILENAME))
+        assert onnx_export_is_current(tiny_model_dir)
+
+    @pytest.mark.parametrize('num_beams', [1, 3])
+    def test_generate_matches_transformers(self, tiny_model_dir, input_batch, num_beams):
+        """Test that greedy and beam search give the same ids as MarianMTModel.generate"""
+        model = MarianMTModel.from_pretrained(tiny_model_dir).eval()
+        engine = load_onnx_engine(tiny_model_dir)
+
+        expected = model.generate(**input_batch, num_beams=num_beams, max_new_tokens=8)
+        generated = engine.generate(**input_batch, num_beams=num_beams, max_new_tokens=8)
+        assert torch.equal(generated, expected)
+
+    def test_export_is_reused_until_weights_change(self, tiny_model_dir):
+        """Test that the export only runs again when the weights are newer"""
+        load_onnx_engine(tiny_model_dir)
+        with patch('engines.export_onnx') as export:
+            load_onnx_engine(tiny_model_dir)
+            export.assert_not_called()
+
+            weights = os.path.join(tiny_model_dir, 'model.safetensors')
+            future = os.path.getmtime(weights) + 10
+            os.utime(weights, (future, future))
+            with patch('engines.OnnxMarianEngine'):
+                load_onnx_engine(tiny_model_dir)
+            export.assert_called_once()
+
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_translator_uses_engine_per_route(self, mock_tokenizer, tiny_model_dir):
+        """Test that a route configured as onnx is served by the ONNX engine"""
+        from translator import Translator
+        translator = Translator(os.path.dirname(tiny_model_dir))
+
+        with patch('translator.Config.ROUTE_ENGINES', {'en-es': 'onnx'}):
+            assert translator.get_engine('en-es') == 'onnx'
+            assert translator.get_engine('es-en') == 'torch'
+            success_code, _ = translator.load_model('en-es')
+
+        assert success_code == 1
+        model, _ = translator.models['en-es']
+        assert isinstance(model, OnnxMarianEngine)
+        assert translator.get_memory_stats()['models']['en-es']['bytes'] > 0
+
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_missing_onnxruntime_is_reported(self, mock_tokenizer, tiny_model_dir):
+        """Test that the onnx engine fails cleanly without onnxruntime"""
+        from translator import Translator
+        translator = Translator(os.path.dirname(tiny_model_dir))
+
+        with patch('translator.Config.ROUTE_ENGINES', {'en-es': 'onnx'}), \
+                patch('engines.onnxruntime', None):
+            success_code, message = translator.load_model('en-es')
+
+        assert success_code == 0
+        assert 'onnxruntime' in message
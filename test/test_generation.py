@@ -0,0 +1,33 @@
+import pytest
+from generation import PROFILES, generate_kwargs, resolve_profile
+
+
+class TestGenerationProfiles:
+    """Test cases for the named generation profiles"""
+
+    def test_fast_profile_limits_output_length(self):
+        """Test that the fast profile is greedy and bounded by the source length"""
+        assert generate_kwargs("fast", 10) == {"num_beams": 1, "max_new_tokens": 25, "max_length": None}
+        assert generate_kwargs("fast", 1)["max_new_tokens"] < generate_kwargs("fast", 40)["max_new_tokens"]
+
+    def test_fast_profile_respects_model_limit(self):
+        """Test that the length limit never goes past the model's max_length"""
+        assert generate_kwargs("fast", 500, max_length=512)["max_new_tokens"] == 511
+        assert generate_kwargs("fast", 10, max_length=512)["max_new_tokens"] == 25
+
+    def test_quality_profile_keeps_model_defaults(self):
+        """Test that the quality profile leaves beam search to the model's generation config"""
+        assert generate_kwargs("quality", 10) == {}
+
+    @pytest.mark.parametrize('name,default,expected', [
+        (None, 'fast', 'fast'), ('quality', 'fast', 'quality'), (None, 'unknown', 'quality')
+    ])
+    def test_resolve_profile(self, name, default, expected):
+        """Test that requests without a profile use the default"""
+        assert resolve_profile(name, default) == expected
+
+    def test_resolve_unknown_profile(self):
+        """Test that an unknown requested profile names the available ones"""
+        with pytest.raises(ValueError) as error:
+            resolve_profile("turbo", "quality")
+        assert all(name in str(error.value) for name in PROFILES)
@@ -0,0 +1,124 @@
+import pytest
+import threading
+import time
+import torch
+from inference_pool import InferencePool, plan_core_slices
+
+
+@pytest.fixture(autouse=True)
+def restore_torch_threads():
+    """The pool sets the process-wide torch thread count"""
+    threads = torch.get_num_threads()
+    yield
+    torch.set_num_threads(threads)
+
+
+class TestPlanCoreSlices:
+    """Test cases for splitting cores among inference workers"""
+
+    def test_even_split(self):
+        """Test that cores are divided into contiguous slices"""
+        assert plan_core_slices(list(range(8)), 2) == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+    def test_configured_threads(self):
+        """Test that a configured slice size leaves the remaining cores unused"""
+        assert plan_core_slices([0, 1, 2, 3, 4, 5], 2, threads=2) == [[0, 1], [2, 3]]
+
+    def test_more_workers_than_cores(self):
+        """Test that workers share cores round-robin when there are too few"""
+        assert plan_core_slices([0, 1], 3) == [[0], [1], [0]]
+
+    def test_keeps_core_ids(self):
+        """Test that the slices use the given core ids, not their positions"""
+        assert plan_core_slices([2, 3, 6, 7], 2) == [[2, 3], [6, 7]]
+
+
+class TestInferencePool:
+    """Test cases for the inference worker pool"""
+
+    def test_run_returns_result(self):
+        """Test that a call runs on an inference worker and returns its result"""
+        pool = InferencePool(1, pin=False, cpus=[0])
+        try:
+            name = pool.run(lambda: threading.current_thread().name)
+        finally:
+            pool.close()
+        assert name.startswith('inference-')
+
+    def test_exception_propagates(self):
+        """Test that an exception raised by the call reaches the caller"""
+        def fail():
+            raise ValueError('boom')
+
+        pool = InferencePool(1, pin=False, cpus=[0])
+        try:
+            with pytest.raises(ValueError, match='boom'):
+                pool.run(fail)
+            # The worker survives the failed call
+            assert pool.run(lambda: 42) == 42
+        finally:
+            pool.close()
+
+    def test_wait_is_recorded_per_route(self):
+        """Test that the wait for a free worker is labelled with the call's route"""
+        import metrics
+        before = metrics.INFERENCE_WAIT_SECONDS.get(route='en-es')[0]
+        pool = InferencePool(1, pin=False, cpus=[0])
+        try:
+            assert pool.run(lambda text: text.upper(), 'hola', route='en-es') == 'HOLA'
+        finally:
+            pool.close()
+        assert metrics.INFERENCE_WAIT_SECONDS.get(route='en-es')[0] == before + 1
+
+    def test_calls_use_free_workers(self):
+        """Test that concurrent calls run side by side on different workers"""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def meet():
+            barrier.wait()
+            return threading.current_thread().name
+
+        pool = InferencePool(2, pin=False, cpus=[0, 1])
+        try:
+            futures = [pool.submit(meet) for _ in range(2)]
+            names = {future.result(timeout=5) for future in futures}
+        finally:
+            pool.close()
+        assert names == {'inference-0', 'inference-1'}
+
+    def test_sets_torch_threads_to_slice(self):
+        """Test that the torch thread count matches the cores of a worker"""
+        pool = InferencePool(2, pin=False, cpus=[0, 1, 2, 3])
+        try:
+            assert torch.get_num_threads() == 2
+            stats = pool.stats()
+        finally:
+            pool.close()
+        assert stats['workers'] == 2
+        assert stats['threads_per_worker'] == 2
+        assert stats['cores'] == [[0, 1], [2, 3]]
+
+    def test_stats_report_busy_and_queued(self):
+        """Test that stats count running and waiting calls"""
+        release = threading.Event()
+        pool = InferencePool(1, pin=False, cpus=[0])
+        try:
+            futures = [pool.submit(release.wait, 5) for _ in range(2)]
+            deadline = time.time() + 5
+            while pool.stats()['busy'] != 1 and time.time() < deadline:
+                time.sleep(0.01)
+            stats = pool.stats()
+            release.set()
+            for future in futures:
+                future.result(timeout=5)
+        finally:
+            pool.close()
+        assert stats['busy'] == 1
+        assert stats['queued'] == 1
+
+    def test_closed_pool_rejects_calls(self):
+        """Test that no call is accepted after close"""
+        pool = InferencePool(1, pin=False, cpus=[0])
+        pool.close()
+        with pytest.raises(RuntimeError):
+            pool.submit(lambda: None)
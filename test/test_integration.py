@@ -11,6 +11,7 @@ class TestIntegration:
         """Test complete workflow: check languages -> translate"""
         # Mock the translator for this test
         mock_translator.get_supported_langs.return_value = [['en', 'es']]
+        mock_translator.get_pivot_pairs.return_value = {}
         mock_translator.translate.return_value = "Hola mundo"
         
         # 1. Check supported languages
@@ -37,17 +38,12 @@ class TestIntegration:
         assert result['success'] is True
         assert result['translated_text'] == "Hola mundo"
         
-    @patch('subprocess.run')
+    @patch('download_model.download_language_model')
     @patch('os.path.exists')
     @patch('shutil.rmtree')
-    def test_model_download_and_delete_workflow(self, mock_rmtree, mock_exists, mock_subprocess, client):
+    def test_model_download_and_delete_workflow(self, mock_rmtree, mock_exists, mock_download, client):
         """Test model download and delete workflow"""
-        # Mock successful download
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = "Model downloaded"
-        mock_result.stderr = ""
-        mock_subprocess.return_value = mock_result
+        from app import download_jobs
         
         # Mock model exists for deletion
         mock_exists.return_value = True
@@ -62,10 +58,13 @@ class TestIntegration:
                              data=json.dumps(download_data),
                              content_type='application/json')
         
-        assert response.status_code == 200
+        assert response.status_code == 202
         result = json.loads(response.data)
         assert result['success'] is True
         
+        job = download_jobs.wait(result['job_id'], timeout=5)
+        assert job.state == 'done'
+        
         # 2. Delete model
         delete_data = {
             'source': 'en',
@@ -240,3 +239,36 @@ class TestIntegration:
         assert data['status'] == 'healthy'
         assert isinstance(data['loaded_models'], list)
         assert isinstance(data['supported_languages'], list)
+        
+    @patch('translator.Config.CACHE_ENABLED', False)
+    def test_real_inference_with_tiny_model(self, temp_model_dir):
+        """Test the unmocked load and generate path on a locally built model"""
+        from benchmarks.tiny_model import build_tiny_model
+        from translator import Translator
+        build_tiny_model(temp_model_dir, 'xx', 'yy', d_model=32, layers=1, max_length=16)
+        
+        translator = Translator(temp_model_dir)
+        assert translator.get_supported_langs() == [['xx', 'yy']]
+        
+        single = translator.translate('xx', 'yy', 'Hello, where is the train station?')
+        batch = translator.translate_batch('xx', 'yy', ['Hello!', 'Thank you very much.'], 'fast')
+        
+        assert isinstance(single, str) and not single.startswith('Error')
+        assert len(batch) == 2 and not any(text.startswith('Error') for text in batch)
+        
+    @patch('translator.Config.CACHE_ENABLED', False)
+    def test_process_pool_matches_local_inference(self, temp_model_dir):
+        """Test that translating in an inference process gives the same result as in the server"""
+        from benchmarks.tiny_model import build_tiny_model
+        from translator import Translator
+        build_tiny_model(temp_model_dir, 'xx', 'yy', d_model=32, layers=1, max_length=16)
+        texts = ['Hello!', 'Thank you very much.']
+        expected = Translator(temp_model_dir).translate_batch('xx', 'yy', texts, 'fast')
+        
+        with patch('translator.Config.INFERENCE_PROCESSES', 1):
+            translator = Translator(temp_model_dir)
+        try:
+            assert translator.translate_batch('xx', 'yy', texts, 'fast') == expected
+            assert translator.get_inference_stats()['processes']['routes'] == {'xx-yy': 0}
+        finally:
+            translator.process_pool.close()
@@ -0,0 +1,90 @@
+import pytest
+import json
+import os
+import subprocess
+import sys
+from metrics import Counter, Gauge, Histogram, Registry, update_model_gauges, RESIDENT_MODEL_BYTES
+
+
+class TestMetrics:
+    """Test cases for the Prometheus metrics"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that histograms render cumulative buckets, sum and count"""
+        histogram = Histogram("stage_seconds", "Stage time", ["route"], buckets=[0.1, 1.0])
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, route="en-es")
+
+        lines = histogram.render()
+        assert lines[:2] == ["# HELP stage_seconds Stage time", "# TYPE stage_seconds histogram"]
+        assert 'stage_seconds_bucket{route="en-es",le="0.1"} 2' in lines
+        assert 'stage_seconds_bucket{route="en-es",le="1.0"} 3' in lines
+        assert 'stage_seconds_bucket{route="en-es",le="+Inf"} 4' in lines
+        assert 'stage_seconds_sum{route="en-es"} 3.65' in lines
+        assert 'stage_seconds_count{route="en-es"} 4' in lines
+        assert histogram.get(route="en-es") == (4, pytest.approx(3.65))
+
+    def test_counter_labels(self):
+        """Test that every label combination is its own series with escaped values"""
+        counter = Counter("requests_total", "Requests", ["endpoint", "status"])
+        counter.inc(endpoint="/translate", status=200)
+        counter.inc(endpoint="/translate", status=200)
+        counter.inc(endpoint='/a"b', status=500)
+
+        registry = Registry()
+        registry.register(counter)
+        text = registry.render()
+        assert 'requests_total{endpoint="/translate",status="200"} 2.0' in text
+        assert 'requests_total{endpoint="/a\\"b",status="500"} 1.0' in text
+        assert text.endswith("\n")
+
+    def test_gauge_and_model_memory(self):
+        """Test that the resident model gauge follows the residency stats"""
+        update_model_gauges({"models": {"en-es": {"bytes": 1024, "pinned": False}}})
+        assert RESIDENT_MODEL_BYTES.get(route="en-es") == 1024
+
+        update_model_gauges({"models": {}})
+        assert RESIDENT_MODEL_BYTES.render()[2:] == []
+
+        gauge = Gauge("queue_depth", "Queued requests")
+        gauge.set(3)
+        assert gauge.render()[-1] == "queue_depth 3.0"
+
+    def test_multiprocess_snapshots_are_merged(self, tmp_path):
+        """Test that counters and histograms are summed over every process and gauges kept per live process"""
+        counter = Counter("requests_total", "Requests", ["status"])
+        gauge = Gauge("queue_depth", "Queued requests")
+        histogram = Histogram("stage_seconds", "Stage time", buckets=[1.0])
+        registry = Registry()
+        for metric in (counter, gauge, histogram):
+            registry.register(metric)
+        registry.enable_multiprocess(str(tmp_path))
+        counter.inc(status=200)
+        gauge.set(2)
+        histogram.observe(0.5)
+
+        # A live worker and one that has exited
+        live = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+        dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+        dead.wait()
+        other = {"requests_total": [[["200"], 3]], "queue_depth": [[[], 5]], "stage_seconds": [[[], [[0, 1], 2.0, 1]]]}
+        try:
+            for pid in (live.pid, dead.pid):
+                with open(tmp_path / f"{pid}.json", "w") as f:
+                    json.dump(other, f)
+            text = registry.render()
+        finally:
+            live.kill()
+            live.wait()
+
+        assert 'requests_total{status="200"} 7.0' in text
+        assert f'queue_depth{{pid="{os.getpid()}"}} 2.0' in text
+        assert f'queue_depth{{pid="{live.pid}"}} 5.0' in text
+        assert f'pid="{dead.pid}"' not in text
+        assert 'stage_seconds_bucket{le="1.0"} 1' in text
+        assert 'stage_seconds_bucket{le="+Inf"} 3' in text
+        assert 'stage_seconds_count 3' in text
+        assert sorted(os.listdir(tmp_path)) == sorted(f"{pid}.json" for pid in (os.getpid(), live.pid, dead.pid))
+
+        registry.enable_multiprocess(str(tmp_path))
+        assert os.listdir(tmp_path) == []
@@ -0,0 +1,172 @@
+import pytest
+import os
+import time
+import tempfile
+from unittest.mock import MagicMock, patch
+from translator import Translator
+import prefork
+
+
+def wait_child(pid, timeout=10):
+    """Wait for a forked child and return its exit code (None if it hung and was killed)"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if done:
+            return os.waitstatus_to_exitcode(status)
+        time.sleep(0.05)
+    os.kill(pid, 9)
+    os.waitpid(pid, 0)
+    return None
+
+
+class TestPrefork:
+    """Test cases for the pre-fork production server helpers"""
+
+    @pytest.mark.parametrize('configured,workers,cpus,expected', [
+        (0, 2, 8, 4), (0, 3, 8, 2), (0, 8, 4, 1), (3, 2, 8, 3)
+    ])
+    def test_worker_torch_threads(self, configured, workers, cpus, expected):
+        """Test that cores are divided among the workers unless configured"""
+        with patch('prefork.Config.TORCH_THREADS_PER_WORKER', configured):
+            assert prefork.worker_torch_threads(workers, cpus) == expected
+
+    @pytest.mark.parametrize('configured,slot,expected', [
+        (0, 0, [0, 1]), (0, 1, [2, 3]), (1, 1, [1])
+    ])
+    def test_worker_cpus(self, configured, slot, expected):
+        """Test that each worker gets its own share of the cores"""
+        with patch('prefork.Config.TORCH_THREADS_PER_WORKER', configured):
+            assert prefork.worker_cpus(slot, 2, [0, 1, 2, 3]) == expected
+
+    def test_assign_slot(self):
+        """Test that a new worker takes the lowest slot no live worker holds"""
+        live = [MagicMock(cpu_slot=0), MagicMock(cpu_slot=2)]
+        worker = MagicMock()
+        prefork.assign_slot(worker, live, 3)
+        assert worker.cpu_slot == 1
+
+        # Old workers of a graceful reload still hold every slot
+        prefork.assign_slot(worker, live + [MagicMock(cpu_slot=1)], 3)
+        assert worker.cpu_slot == 0
+
+    @patch('translator.Config.INFERENCE_WORKERS', 2)
+    @patch('translator.Config.INFERENCE_PIN_CPUS', False)
+    def test_worker_inference_pool_uses_its_share(self):
+        """Test that the inference pool of a worker divides only that worker's cores"""
+        import torch
+        with tempfile.TemporaryDirectory() as temp_dir, patch('prefork._master', True):
+            translator = Translator(temp_dir)
+        threads = torch.get_num_threads()
+        try:
+            translator.after_fork(cpus=[2, 3])
+            assert translator.get_inference_stats()["cores"] == [[2], [3]]
+        finally:
+            translator.inference_pool.close()
+            torch.set_num_threads(threads)
+
+    def test_preload_waits_for_warmup_and_freezes(self):
+        """Test that the master finishes the warmup before forking"""
+        translator = MagicMock()
+        translator.wait_for_warmup.return_value = {'state': 'done', 'routes': {}}
+        with patch('prefork.gc') as mock_gc:
+            prefork.preload(translator)
+        translator.wait_for_warmup.assert_called_once_with()
+        mock_gc.freeze.assert_called_once()
+
+    def test_reload_rereads_routes(self):
+        """Test that a graceful reload refreshes and warms up the routes in the master"""
+        translator = MagicMock()
+        with patch('prefork.gc'):
+            prefork.reload_master(translator, ['en-es', 'es-en'])
+        assert [call.args[0] for call in translator.refresh_route.call_args_list] == ['en-es', 'es-en']
+        translator.warmup.assert_called_once_with(['en-es', 'es-en'])
+
+    def test_worker_reports_its_own_metrics(self):
+        """Test that a worker drops the master's metrics and writes its snapshots"""
+        translator = MagicMock()
+        with patch('prefork.torch'), patch('prefork.metrics') as mock_metrics:
+            mock_metrics.REGISTRY.directory = 'metrics'
+            prefork.init_worker(translator, 2)
+            prefork.exit_worker()
+        mock_metrics.REGISTRY.reset.assert_called_once_with()
+        mock_metrics.REGISTRY.start_flusher.assert_called_once()
+        mock_metrics.REGISTRY.write_snapshot.assert_called_once_with()
+
+    @patch('translator.Config.INFERENCE_WORKERS', 2)
+    @patch('translator.Config.INFERENCE_PROCESSES', 2)
+    def test_master_has_no_inference_pool(self):
+        """Test that the inference pools are only started in the forked workers"""
+        translator = MagicMock()
+        with patch('prefork.torch'), patch('prefork.metrics'), patch('prefork._master', False), \
+                patch('prefork.Config.METRICS_DIR', 'metrics'):
+            prefork.prepare_master()
+            assert prefork.in_master()
+            with tempfile.TemporaryDirectory() as temp_dir:
+                master_translator = Translator(temp_dir)
+                assert master_translator.inference_pool is None
+                assert master_translator.process_pool is None
+            prefork.init_worker(translator, 2)
+            assert not prefork.in_master()
+        translator.after_fork.assert_called_once_with(cpus=prefork.worker_cpus(0, 2))
+
+    @patch('translator.Config.INFERENCE_PROCESSES', 1)
+    @patch('translator.MarianMTModel.from_pretrained')
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_worker_moves_preloaded_routes_to_process_pool(self, mock_tokenizer, mock_model, fake_marian):
+        """Test that routes the master loaded in-process are reloaded into the worker's inference processes"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "opus-mt-en-es")
+            os.makedirs(path)
+            mock_model.return_value, mock_tokenizer.return_value = fake_marian
+            with patch('prefork._master', True):
+                translator = Translator(temp_dir)
+                translator.load_model("en-es")
+            assert translator.process_pool is None
+
+            remote = type(fake_marian[0])()
+            with patch('translator.ProcessInferencePool') as mock_pool:
+                mock_pool.return_value.load.return_value = remote
+                translator.after_fork()
+                assert translator.wait_for_warmup(5)["state"] == "done"
+
+            mock_pool.return_value.load.assert_called_once_with("en-es", path, "torch", "fp32")
+            assert translator.models["en-es"][0] is remote
+            assert len(remote.batch_shapes) > 0
+
+    @patch('translator.MarianMTModel.from_pretrained')
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_wait_for_warmup(self, mock_tokenizer, mock_model, fake_marian):
+        """Test that waiting returns once the background warmup is done"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "opus-mt-en-es"))
+            mock_model.return_value, mock_tokenizer.return_value = fake_marian
+            translator = Translator(temp_dir)
+            translator.start_warmup(["en-es"])
+
+            assert translator.wait_for_warmup(5)["state"] == "done"
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+    @patch('translator.Config.CACHE_ENABLED', False)
+    @patch('translator.MarianMTModel.from_pretrained')
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_forked_worker_serves_preloaded_model(self, mock_tokenizer, mock_model, fake_marian):
+        """Test that a worker forked after loading translates without reloading"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "opus-mt-en-es"))
+            mock_model.return_value, mock_tokenizer.return_value = fake_marian
+            translator = Translator(temp_dir)
+            # The parent's micro-batcher thread does not exist in the child
+            assert translator.translate("en", "es", "hello") == "HELLO"
+
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    translator.after_fork()
+                    ok = translator.translate("en", "es", "good morning") == "GOOD MORNING"
+                    code = 0 if ok and mock_model.call_count == 1 else 1
+                finally:
+                    os._exit(code)
+
+            assert wait_child(pid) == 0
@@ -0,0 +1,117 @@
+import pytest
+import gc
+import os
+import signal
+import numpy as np
+import torch
+from transformers.models.marian import MarianMTModel
+from process_pool import ProcessInferencePool, _create_buffer, _pack, _unpack
+
+
+@pytest.fixture(scope='module')
+def pool():
+    """Two inference processes shared by the tests (each takes seconds to start)"""
+    pool = ProcessInferencePool(2, pin=False, cpus=[0])
+    yield pool
+    pool.close()
+
+
+def copy_model(path, route):
+    """Make the tiny model also available under another route"""
+    target = os.path.join(os.path.dirname(path), f'opus-mt-{route}')
+    MarianMTModel.from_pretrained(path).save_pretrained(target)
+    return target
+
+
+class TestSharedBuffer:
+    """Test cases for passing token ids through shared memory"""
+
+    def test_roundtrip(self):
+        """Test that arrays written to the buffer are read back unchanged"""
+        fd, buffer = _create_buffer(1024)
+        try:
+            arrays = [np.arange(6).reshape(2, 3), np.ones((2, 3), dtype=np.int32)]
+            packed = _pack(buffer, arrays)
+            assert packed == ('shm', [(2, 3), (2, 3)])
+            result = _unpack(buffer, packed)
+        finally:
+            buffer.close()
+            os.close(fd)
+        assert [array.tolist() for array in result] == [array.tolist() for array in arrays]
+        assert all(array.dtype == np.int64 for array in result)
+
+    def test_large_payload_sent_inline(self):
+        """Test that arrays larger than the buffer are sent through the pipe"""
+        fd, buffer = _create_buffer(64)
+        try:
+            packed = _pack(buffer, [np.zeros((4, 4))])
+            assert packed[0] == 'inline'
+            assert _unpack(buffer, packed)[0].shape == (4, 4)
+        finally:
+            buffer.close()
+            os.close(fd)
+
+
+class TestProcessInferencePool:
+    """Test cases for generating in separate processes"""
+
+    def test_generate_matches_local_model(self, pool, tiny_model_dir):
+        """Test that the remote model generates the same ids as the local one"""
+        remote = pool.load('en-es', tiny_model_dir)
+        local = MarianMTModel.from_pretrained(tiny_model_dir)
+        input_ids = torch.tensor([[5, 6, 7, 0], [8, 9, 0, 2]])
+        attention_mask = torch.tensor([[1, 1, 1, 1], [1, 1, 1, 0]])
+
+        expected = local.generate(input_ids=input_ids, attention_mask=attention_mask, num_beams=1, max_new_tokens=5)
+        generated = remote.generate(input_ids=input_ids, attention_mask=attention_mask, num_beams=1, max_new_tokens=5)
+
+        assert torch.equal(generated, expected)
+        assert remote.generation_config.max_length == local.generation_config.max_length
+
+    def test_routes_keep_their_process(self, pool, tiny_model_dir):
+        """Test that routes are spread over the processes and a reload keeps its process"""
+        first = pool.load('en-es', tiny_model_dir)
+        second = pool.load('en-fr', copy_model(tiny_model_dir, 'en-fr'))
+        routes = pool.stats()['routes']
+        assert routes['en-es'] != routes['en-fr']
+
+        reloaded = pool.load('en-es', tiny_model_dir)
+        assert pool.stats()['routes']['en-es'] == routes['en-es']
+        assert first is not reloaded and second is not None
+
+    def test_released_route_frees_its_process(self, pool, tiny_model_dir):
+        """Test that a route is unassigned once the server drops its model"""
+        model = pool.load('en-it', copy_model(tiny_model_dir, 'en-it'))
+        assert 'en-it' in pool.stats()['routes']
+        del model
+        gc.collect()
+        assert 'en-it' not in pool.stats()['routes']
+
+    def test_stale_proxy_does_not_release_reload(self, pool, tiny_model_dir):
+        """Test that dropping an old proxy keeps a newer load of the route"""
+        old = pool.load('en-es', tiny_model_dir)
+        new = pool.load('en-es', tiny_model_dir)
+        del old
+        gc.collect()
+        assert 'en-es' in pool.stats()['routes']
+        assert new.generate(input_ids=torch.tensor([[5, 0]]), max_new_tokens=2).shape[0] == 1
+
+    def test_load_error(self, pool, temp_model_dir):
+        """Test that a failed load raises and leaves the route unassigned"""
+        with pytest.raises(RuntimeError):
+            pool.load('xx-yy', os.path.join(temp_model_dir, 'missing'))
+        assert 'xx-yy' not in pool.stats()['routes']
+
+    def test_restarts_exited_process(self, pool, tiny_model_dir):
+        """Test that a process that died is restarted and reloads its routes"""
+        model = pool.load('en-es', tiny_model_dir)
+        index = pool.stats()['routes']['en-es']
+        pid = pool.stats()['pids'][index]
+        os.kill(pid, signal.SIGKILL)
+
+        generated = model.generate(input_ids=torch.tensor([[5, 6, 0]]), num_beams=1, max_new_tokens=3)
+
+        assert generated.shape[0] == 1
+        stats = pool.stats()
+        assert stats['restarts'] == 1
+        assert stats['pids'][index] not in (None, pid)
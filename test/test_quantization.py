@@ -0,0 +1,54 @@
+import pytest
+import os
+import torch
+from unittest.mock import patch
+from transformers.models.marian import MarianMTModel
+from quantization import QUANTIZED_FILENAME, load_quantized_model, quantize_model
+
+
+class TestQuantization:
+    """Test cases for dynamic int8 quantization"""
+
+    def test_quantize_model_replaces_linear_layers(self, tiny_model_dir):
+        """Test that Linear layers become dynamically quantized"""
+        model = quantize_model(MarianMTModel.from_pretrained(tiny_model_dir))
+        assert not any(type(m) is torch.nn.Linear for m in model.modules())
+
+    def test_quantized_weights_are_cached(self, tiny_model_dir):
+        """Test that the second load reuses the cached int8 weights"""
+        input_ids = torch.tensor([[5, 6, 7, 0]])
+        first = load_quantized_model(tiny_model_dir)
+        assert os.path.exists(os.path.join(tiny_model_dir, QUANTIZED_FILENAME))
+
+        with patch('quantization.MarianMTModel.from_pretrained') as from_pretrained:
+            second = load_quantized_model(tiny_model_dir)
+            from_pretrained.assert_not_called()
+
+        expected = first.generate(input_ids=input_ids, max_new_tokens=5)
+        assert torch.equal(second.generate(input_ids=input_ids, max_new_tokens=5), expected)
+
+    def test_stale_cache_is_rebuilt(self, tiny_model_dir):
+        """Test that replacing the fp32 weights invalidates the cache"""
+        load_quantized_model(tiny_model_dir)
+        cache_path = os.path.join(tiny_model_dir, QUANTIZED_FILENAME)
+        stat = os.stat(cache_path)
+        os.utime(cache_path, (stat.st_atime, stat.st_mtime - 100))
+
+        with patch('quantization.MarianMTModel.from_pretrained', wraps=MarianMTModel.from_pretrained) as from_pretrained:
+            load_quantized_model(tiny_model_dir)
+            from_pretrained.assert_called_once()
+
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_translator_loads_int8_per_route(self, mock_tokenizer, tiny_model_dir):
+        """Test that a route configured as int8 is loaded quantized"""
+        from translator import Translator
+        translator = Translator(os.path.dirname(tiny_model_dir))
+
+        with patch('translator.Config.ROUTE_PRECISION', {'en-es': 'int8'}):
+            assert translator.get_precision('en-es') == 'int8'
+            assert translator.get_precision('es-en') == 'fp32'
+            success_code, _ = translator.load_model('en-es')
+
+        assert success_code == 1
+        model, _ = translator.models['en-es']
+        assert not any(type(m) is torch.nn.Linear for m in model.modules())
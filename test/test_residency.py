@@ -0,0 +1,87 @@
+import pytest
+import torch
+from residency import ModelResidency, model_footprint
+
+
+def make_model(n_params):
+    """Create a small torch module with n_params float32 parameters"""
+    return torch.nn.Linear(n_params, 1, bias=False)
+
+
+class TestModelResidency:
+    """Test cases for the memory-budgeted model residency manager"""
+
+    def test_model_footprint(self):
+        """Test that parameters are measured in bytes"""
+        assert model_footprint(make_model(100)) == 400
+        assert model_footprint(object()) == 0
+
+    def test_dict_behaviour(self):
+        """Test that the manager can be used like the old models dict"""
+        models = ModelResidency()
+        models['en-es'] = (make_model(10), 'tokenizer')
+
+        assert 'en-es' in models
+        assert models['en-es'][1] == 'tokenizer'
+        assert len(models) == 1
+        assert models.keys() == ['en-es']
+
+        del models['en-es']
+        assert 'en-es' not in models
+        assert models.total_bytes() == 0
+
+    def test_max_models_evicts_least_recently_used(self):
+        """Test eviction by number of resident models"""
+        models = ModelResidency(max_models=2)
+        models['en-es'] = (make_model(10), None)
+        models['es-en'] = (make_model(10), None)
+        models['en-es']  # touch
+        models['en-fr'] = (make_model(10), None)
+
+        assert sorted(models.keys()) == ['en-es', 'en-fr']
+        assert models.evictions == 1
+
+    def test_memory_budget(self):
+        """Test eviction by measured memory"""
+        models = ModelResidency(max_bytes=1000)
+        models['en-es'] = (make_model(100), None)
+        models['es-en'] = (make_model(100), None)
+        models['en-fr'] = (make_model(100), None)
+
+        assert models.total_bytes() <= 1000
+        assert 'en-es' not in models
+
+    def test_pinned_routes_are_never_evicted(self):
+        """Test that pinned routes survive eviction"""
+        models = ModelResidency(max_models=2, pinned=['en-es'])
+        models['en-es'] = (make_model(10), None)
+        models['es-en'] = (make_model(10), None)
+        models['en-fr'] = (make_model(10), None)
+
+        assert 'en-es' in models
+        assert 'es-en' not in models
+
+    def test_make_room_before_load(self):
+        """Test that room is made for a model that is about to load"""
+        models = ModelResidency(max_bytes=1000)
+        models['en-es'] = (make_model(100), None)
+        models['es-en'] = (make_model(100), None)
+
+        evicted = models.make_room(500)
+        assert evicted == ['en-es']
+        assert models.stats()['resident_bytes'] == 400
+
+    def test_reserve_evicts_only_when_stored(self):
+        """Test that a reservation keeps room for a load without evicting before it finishes"""
+        models = ModelResidency(max_models=2)
+        models['en-es'] = (make_model(10), None)
+        models['es-en'] = (make_model(10), None)
+
+        models.reserve('en-fr', 40)
+        assert models.keys() == ['en-es', 'es-en']
+        assert models.stats()['reserved_bytes'] == 40
+
+        models.release('en-fr')
+        models['en-de'] = (make_model(10), None)
+        assert models.keys() == ['es-en', 'en-de']
+        assert models.stats()['reserved_bytes'] == 0
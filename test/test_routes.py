@@ -0,0 +1,84 @@
+import pytest
+import os
+from unittest.mock import patch
+from routes import RouteRegistry, parse_model_folder
+
+
+class TestRouteRegistry:
+    """Test cases for the cached language route index"""
+
+    def test_parse_model_folder(self):
+        """Test extracting language codes from folder names"""
+        assert parse_model_folder('opus-mt-en-es') == ('en', 'es')
+        assert parse_model_folder('opus-mt-en') is None
+        assert parse_model_folder('translation_memory.sqlite3') is None
+
+    def test_missing_directory(self, temp_model_dir):
+        """Test a models directory that does not exist"""
+        registry = RouteRegistry(os.path.join(temp_model_dir, 'missing'))
+        assert registry.pairs() == []
+        assert not registry.has('en', 'es')
+
+    def test_lookups(self, sample_model_dir):
+        """Test pair listing and O(1) membership checks"""
+        os.makedirs(os.path.join(sample_model_dir, 'opus-mt-en-fr'))
+        registry = RouteRegistry(sample_model_dir)
+
+        assert registry.pairs() == [['en', 'es'], ['en', 'fr']]
+        assert registry.has('en', 'es')
+        assert not registry.has('es', 'en')
+        assert registry.targets_for('en') == ['es', 'fr']
+
+    def test_scans_only_when_directory_changes(self, sample_model_dir):
+        """Test that the directory is listed again only after a change"""
+        registry = RouteRegistry(sample_model_dir)
+        with patch('routes.os.listdir', wraps=os.listdir) as listdir:
+            registry.pairs()
+            registry.has('en', 'es')
+            registry.targets_for('en')
+            assert listdir.call_count == 1
+
+            os.makedirs(os.path.join(sample_model_dir, 'opus-mt-es-en'))
+            # Make sure the mtime differs even on coarse clocks
+            stat = os.stat(sample_model_dir)
+            os.utime(sample_model_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+            assert registry.has('es', 'en')
+            assert listdir.call_count == 2
+
+    def test_invalidate(self, sample_model_dir):
+        """Test forcing a re-scan"""
+        registry = RouteRegistry(sample_model_dir)
+        with patch('routes.os.listdir', wraps=os.listdir) as listdir:
+            registry.pairs()
+            registry.invalidate()
+            registry.pairs()
+            assert listdir.call_count == 2
+
+    def test_pivot_chains(self, temp_model_dir):
+        """Test shortest model chains between pairs without a model of their own"""
+        for folder in ['opus-mt-en-es', 'opus-mt-es-en', 'opus-mt-en-fr', 'opus-mt-fr-en']:
+            os.makedirs(os.path.join(temp_model_dir, folder))
+        registry = RouteRegistry(temp_model_dir)
+
+        assert registry.chain('en', 'es') == [('en', 'es')]
+        assert registry.chain('es', 'fr') == [('es', 'en'), ('en', 'fr')]
+        assert registry.chain('es', 'fr', max_hops=1) is None
+        assert registry.chain('es', 'de') is None
+        assert registry.chain('es', 'es') is None
+        assert registry.pivot_pairs() == {
+            ('es', 'fr'): [('es', 'en'), ('en', 'fr')],
+            ('fr', 'es'): [('fr', 'en'), ('en', 'es')],
+        }
+
+    def test_chains_follow_new_models(self, temp_model_dir):
+        """Test that a new model changes the chains after a re-scan"""
+        for folder in ['opus-mt-es-en', 'opus-mt-en-de']:
+            os.makedirs(os.path.join(temp_model_dir, folder))
+        registry = RouteRegistry(temp_model_dir)
+        assert registry.chain('es', 'de') == [('es', 'en'), ('en', 'de')]
+
+        os.makedirs(os.path.join(temp_model_dir, 'opus-mt-es-de'))
+        registry.invalidate()
+        assert registry.chain('es', 'de') == [('es', 'de')]
+        assert registry.pivot_pairs() == {}
@@ -0,0 +1,42 @@
+import pytest
+from segmentation import join_segments, split_segments
+
+
+class TestSegmentation:
+    """Test cases for sentence segmentation of long texts"""
+
+    def test_split_sentences(self):
+        """Test splitting on terminal punctuation"""
+        segments, separators = split_segments("Hello world. How are you? Fine!")
+        assert segments == ["Hello world.", "How are you?", "Fine!"]
+        assert separators == ["", " ", " ", ""]
+
+    def test_abbreviation_is_not_a_boundary(self):
+        """Test that a period before a lowercase word does not split"""
+        segments, _ = split_segments("Bring fruit, e.g. apples. Then leave.")
+        assert segments == ["Bring fruit, e.g. apples.", "Then leave."]
+
+    def test_line_breaks_split_and_are_preserved(self):
+        """Test that paragraph breaks survive reassembly"""
+        text = "  First paragraph\n\nSecond paragraph.\nThird line  "
+        segments, separators = split_segments(text)
+        assert segments == ["First paragraph", "Second paragraph.", "Third line"]
+        assert join_segments(segments, separators) == text
+
+    def test_long_sentence_is_chunked(self):
+        """Test that sentences longer than max_chars are split between words"""
+        text = "one two three four five six seven"
+        segments, separators = split_segments(text, max_chars=10)
+        assert all(len(segment) <= 10 for segment in segments)
+        assert join_segments(segments, separators) == text
+
+    def test_whitespace_only(self):
+        """Test text without any words"""
+        segments, separators = split_segments("   ")
+        assert segments == []
+        assert join_segments(segments, separators) == "   "
+
+    def test_join_translated_segments(self):
+        """Test reassembling translated segments"""
+        _, separators = split_segments("Hello.\n\nBye.")
+        assert join_segments(["Hola.", "Adiós."], separators) == "Hola.\n\nAdiós."
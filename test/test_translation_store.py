@@ -0,0 +1,57 @@
+import pytest
+import os
+from translation_store import TranslationStore
+
+
+class TestTranslationStore:
+    """Test cases for the SQLite translation memory"""
+
+    @pytest.fixture
+    def store(self, temp_model_dir):
+        store = TranslationStore(os.path.join(temp_model_dir, 'memory.sqlite3'))
+        yield store
+        store.close()
+
+    def test_put_and_get_many(self, store):
+        """Test bulk insert and lookup"""
+        store.put_many('en-es', ['Hello', 'Bye'], ['Hola', 'Adiós'])
+        results = store.get_many('en-es', ['Bye', 'Unknown', ' Hello '])
+        assert results == ['Adiós', None, 'Hola']
+
+    def test_routes_and_settings_are_isolated(self, store):
+        """Test that route and settings are part of the key"""
+        store.put_many('en-es', ['Hello'], ['Hola'], settings='fast')
+        assert store.get_many('en-fr', ['Hello'], settings='fast') == [None]
+        assert store.get_many('en-es', ['Hello'], settings='quality') == [None]
+        assert store.get_many('en-es', ['Hello'], settings='fast') == ['Hola']
+
+    def test_wal_mode(self, store):
+        """Test that the database uses write-ahead logging"""
+        mode = store._connection().execute('PRAGMA journal_mode').fetchone()[0]
+        assert mode.lower() == 'wal'
+
+    def test_shared_between_instances(self, temp_model_dir):
+        """Test that a second instance (another worker) sees stored rows"""
+        path = os.path.join(temp_model_dir, 'memory.sqlite3')
+        TranslationStore(path).put_many('en-es', ['Hello'], ['Hola'])
+        assert TranslationStore(path).get_many('en-es', ['Hello']) == ['Hola']
+
+    def test_invalidate_route(self, store):
+        """Test removing a route's translations"""
+        store.put_many('en-es', ['Hello', 'Bye'], ['Hola', 'Adiós'])
+        store.put_many('en-fr', ['Hello'], ['Bonjour'])
+
+        assert store.invalidate_route('en-es') == 2
+        assert store.get_many('en-es', ['Hello']) == [None]
+        assert store.get_many('en-fr', ['Hello']) == ['Bonjour']
+
+    def test_prune_removes_least_recently_used(self, store):
+        """Test size-based pruning by last use"""
+        store.put_many('en-es', ['old'], ['viejo'])
+        store.put_many('en-es', ['new'], ['nuevo'])
+        store.get_many('en-es', ['new'])
+
+        removed = store.prune(target_bytes=len('new') + len('nuevo'))
+        assert removed == 1
+        assert store.get_many('en-es', ['old', 'new']) == [None, 'nuevo']
+        assert store.stats()['entries'] == 1
@@ -1,8 +1,9 @@
 import pytest
 import os
 import tempfile
+import threading
 from unittest.mock import MagicMock, patch
-from translator import Translator
+from translator import ModelNotReady, Translator
 
 class TestTranslator:
     """Test the Translator class functionality"""
@@ -114,3 +115,552 @@ class TestTranslator:
             
             translator.clear_all_models()
             assert len(translator.models) == 0
+
+    def test_translate_uses_batched_generate(self, fake_marian):
+        """Test that single translations run through the shared generate path"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["en-es"] = (model, tokenizer)
+            
+            result = translator.translate("en", "es", "Hello world")
+            
+            assert result == "HELLO WORLD"
+            assert tokenizer.calls == [["Hello world"]]
+            assert len(model.batch_shapes) == 1
+
+    @patch('translator.Config.INFERENCE_WORKERS', 2)
+    @patch('translator.Config.INFERENCE_PIN_CPUS', False)
+    def test_generate_runs_on_inference_pool(self, fake_marian):
+        """Test that generate calls are dispatched to the inference workers"""
+        import torch
+        threads = torch.get_num_threads()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["en-es"] = (model, tokenizer)
+            names = []
+            generate = model.generate
+            
+            def record_thread(*args, **kwargs):
+                names.append(threading.current_thread().name)
+                return generate(*args, **kwargs)
+            
+            model.generate = record_thread
+            try:
+                assert translator.translate_batch("en", "es", ["one", "two"]) == ["ONE", "TWO"]
+                assert translator.get_inference_stats()["workers"] == 2
+            finally:
+                translator.inference_pool.close()
+                torch.set_num_threads(threads)
+            assert names and all(name.startswith("inference-") for name in names)
+
+    def test_inference_pool_disabled_by_default(self):
+        """Test that generate runs on the calling thread without workers"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            assert translator.inference_pool is None
+            assert translator.get_inference_stats() == {"enabled": False, "processes": {"enabled": False}}
+
+    def test_generate_records_stage_metrics(self, fake_marian):
+        """Test that tokenize, generate and decode are measured per route"""
+        import metrics
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["xx-yy"] = (model, tokenizer)
+            
+            histograms = [metrics.TOKENIZE_SECONDS, metrics.GENERATE_SECONDS, metrics.DECODE_SECONDS,
+                          metrics.BATCH_SIZE, metrics.INPUT_TOKENS, metrics.OUTPUT_TOKENS]
+            before = [histogram.get(route="xx-yy") for histogram in histograms]
+            
+            translator.translate_batch("xx", "yy", ["one two", "three"], "quality")
+            
+            counts, sums = zip(*[(after[0] - start[0], after[1] - start[1])
+                                 for start, after in zip(before, [h.get(route="xx-yy") for h in histograms])])
+            # One batch of two texts with 3 source tokens; padding is not
+            # counted as output
+            assert counts == (1, 1, 1, 1, 2, 2)
+            assert sums[3:] == (2, 3, 3)
+
+    def test_translate_batch_length_buckets(self, fake_marian):
+        """Test that batch inputs are bucketed by length and keep their order"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["en-es"] = (model, tokenizer)
+            texts = ["a " * 30, "b", "c c", "d " * 29]
+            
+            with patch('translator.Config.BATCH_TOKEN_BUDGET', 59):
+                result = translator.translate_batch("en", "es", texts)
+            
+            assert result == [text.strip().upper() for text in texts]
+            # Short texts are not padded to the width of the long ones
+            assert sorted(model.batch_shapes) == [(1, 29), (1, 30), (2, 2)]
+
+    def test_translate_batch_splits_on_out_of_memory(self, fake_marian):
+        """Test that an out-of-memory sub-batch is split and retried"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            generate = model.generate
+            
+            def limited_generate(input_ids=None, **kwargs):
+                if input_ids.shape[0] > 1:
+                    raise RuntimeError("CUDA out of memory")
+                return generate(input_ids=input_ids, **kwargs)
+            
+            model.generate = limited_generate
+            translator.models["en-es"] = (model, tokenizer)
+            
+            result = translator.translate_batch("en", "es", ["one", "two", "three"])
+            assert result == ["ONE", "TWO", "THREE"]
+
+    def test_translate_batch_error_per_item(self, fake_marian):
+        """Test that a failing item only affects its own sub-batch"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            generate = model.generate
+            
+            def failing_generate(input_ids=None, **kwargs):
+                if input_ids.shape[1] > 2:
+                    raise RuntimeError("CUDA out of memory")
+                return generate(input_ids=input_ids, **kwargs)
+            
+            model.generate = failing_generate
+            translator.models["en-es"] = (model, tokenizer)
+            
+            result = translator.translate_batch("en", "es", ["one", "a b c", "two"])
+            assert result[0] == "ONE"
+            assert result[1].startswith("Error during batch translation")
+            assert result[2] == "TWO"
+
+    def test_translate_uses_cache(self, fake_marian):
+        """Test that repeated translations are served from the cache"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["en-es"] = (model, tokenizer)
+            
+            assert translator.translate("en", "es", "Hello world") == "HELLO WORLD"
+            assert translator.translate("en", "es", "Hello  world ") == "HELLO WORLD"
+            
+            assert len(model.batch_shapes) == 1
+            stats = translator.get_cache_stats()
+            assert stats["routes"]["en-es"]["hits"] == 1
+
+    def test_generation_profiles(self, fake_marian):
+        """Test that each profile has its own generate settings and cache entries"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["en-es"] = (model, tokenizer)
+            
+            assert translator.translate("en", "es", "Hello world", "fast") == "HELLO WORLD"
+            assert translator.translate_batch("en", "es", ["Hello world"], "quality") == ["HELLO WORLD"]
+            assert translator.translate("en", "es", "Hello world", "fast") == "HELLO WORLD"
+            
+            # Greedy with a limit relative to the 2 source tokens, then the model's defaults
+            assert model.generate_kwargs == [{"num_beams": 1, "max_new_tokens": 13, "max_length": None}, {}]
+
+    def test_default_and_unknown_profile(self, fake_marian):
+        """Test that the server default applies and unknown profiles are rejected"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["en-es"] = (model, tokenizer)
+            
+            with patch('translator.Config.GENERATION_PROFILE', 'fast'):
+                translator.translate("en", "es", "Hello")
+            assert model.generate_kwargs == [{"num_beams": 1, "max_new_tokens": 12, "max_length": None}]
+            
+            with pytest.raises(ValueError):
+                translator.translate_batch("en", "es", ["Hello"], "turbo")
+
+    def test_translate_batch_only_generates_misses(self, fake_marian):
+        """Test that only uncached, unique texts reach generate"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["en-es"] = (model, tokenizer)
+            translator.translate_batch("en", "es", ["one"])
+            tokenizer.calls.clear()
+            
+            result = translator.translate_batch("en", "es", ["one", "two", "two", "three"])
+            
+            assert result == ["ONE", "TWO", "TWO", "THREE"]
+            assert tokenizer.calls == [["two", "three"]]
+
+    def test_translation_store_second_tier(self, fake_marian):
+        """Test that the on-disk store serves translations after a restart"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch('translator.Config.TRANSLATION_STORE_ENABLED', True):
+                first = Translator(temp_dir)
+                first.models["en-es"] = fake_marian
+                assert first.translate_batch("en", "es", ["one", "two"]) == ["ONE", "TWO"]
+                
+                # A fresh instance has a cold memory cache but shares the store
+                second = Translator(temp_dir)
+                model, tokenizer = fake_marian
+                tokenizer.calls.clear()
+                second.models["en-es"] = (model, tokenizer)
+                
+                assert second.translate_batch("en", "es", ["one", "two", "three"]) == ["ONE", "TWO", "THREE"]
+                assert tokenizer.calls == [["three"]]
+                
+                second.invalidate_route("en-es")
+                assert second.store.get_many("en-es", ["one"]) == [None]
+
+    @patch('translator.MarianMTModel.from_pretrained')
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_load_model_evicts_least_recently_used(self, mock_tokenizer, mock_model):
+        """Test that loading beyond MAX_RESIDENT_MODELS evicts an unpinned model"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for route in ["en-es", "es-en", "en-fr"]:
+                os.makedirs(os.path.join(temp_dir, f"opus-mt-{route}"))
+            
+            with patch('translator.Config.MAX_RESIDENT_MODELS', 2):
+                translator = Translator(temp_dir)
+            translator.pin_route("en-es")
+            
+            translator.load_model("en-es")
+            translator.load_model("es-en")
+            translator.load_model("en-fr")
+            
+            assert sorted(translator.get_loaded_models()) == ["en-es", "en-fr"]
+            assert translator.get_memory_stats()["evictions"] == 1
+
+    @patch('translator.MarianMTModel.from_pretrained')
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_failed_load_evicts_nothing(self, mock_tokenizer, mock_model):
+        """Test that resident models are only evicted once the new model has loaded"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for route in ["en-es", "es-en"]:
+                os.makedirs(os.path.join(temp_dir, f"opus-mt-{route}"))
+            
+            with patch('translator.Config.MAX_RESIDENT_MODELS', 1):
+                translator = Translator(temp_dir)
+            translator.load_model("en-es")
+            
+            mock_model.side_effect = OSError("corrupt weights")
+            success_code, _ = translator.load_model("es-en")
+            
+            assert success_code == 0
+            assert translator.get_loaded_models() == ["en-es"]
+            assert translator.get_memory_stats()["reserved_bytes"] == 0
+
+    def test_generate_uses_pair_of_request(self, fake_marian):
+        """Test that a request keeps its model when the route is evicted while it waits"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            translator.models["en-es"] = fake_marian
+            pair, _ = translator._ensure_loaded("en-es")
+            
+            del translator.models["en-es"]
+            assert translator._generate("en-es", pair, ["hola"]) == ["HOLA"]
+
+    def test_translate_long_text_is_segmented(self, fake_marian):
+        """Test that long texts are translated sentence by sentence in one batch"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["en-es"] = (model, tokenizer)
+            text = "First sentence here.\n\nSecond one is longer than that!  Third."
+            
+            with patch('translator.Config.SEGMENT_MAX_CHARS', 20):
+                result = translator.translate("en", "es", text)
+            
+            assert result == "FIRST SENTENCE HERE.\n\nSECOND ONE IS LONGER THAN THAT!  THIRD."
+            # All segments went through a single tokenizer call
+            assert len(tokenizer.calls) == 1
+            assert "Third." in tokenizer.calls[0]
+
+    def test_translate_batch_mixes_long_and_short_texts(self, fake_marian):
+        """Test that segments of long texts are reassembled per input"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["en-es"] = (model, tokenizer)
+            texts = ["short", "A long text. With two sentences.", "tiny"]
+            
+            with patch('translator.Config.SEGMENT_MAX_CHARS', 15):
+                result = translator.translate_batch("en", "es", texts)
+            
+            assert result == ["SHORT", "A LONG TEXT. WITH TWO SENTENCES.", "TINY"]
+
+    def test_translate_stream_yields_segments(self, fake_marian):
+        """Test that streamed segments reassemble into the full translation"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["en-es"] = (model, tokenizer)
+            
+            events = list(translator.translate_stream("en", "es", "One. Two.\nThree. Four."))
+            
+            assert events[0]["type"] == "start"
+            segments = [event["text"] for event in events if event["type"] == "segment"]
+            assert segments == ["ONE.", "TWO.", "THREE.", "FOUR."]
+            assert events[-1] == {"type": "done", "translated_text": "ONE. TWO.\nTHREE. FOUR."}
+            # The first segment is generated alone, the rest together
+            assert [len(call) for call in tokenizer.calls] == [1, 3]
+
+    def test_translate_stream_stops_when_closed(self, fake_marian):
+        """Test that closing the stream stops translating further segments"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            model, tokenizer = fake_marian
+            translator.models["en-es"] = (model, tokenizer)
+            
+            stream = translator.translate_stream("en", "es", "One. Two. Three.")
+            next(stream)
+            assert next(stream)["text"] == "ONE."
+            stream.close()
+            
+            assert len(tokenizer.calls) == 1
+
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_concurrent_loads_share_one_load(self, mock_tokenizer):
+        """Test that requests for an unloaded route wait on a single load"""
+        import threading
+        import time
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "opus-mt-en-es"))
+            translator = Translator(temp_dir)
+            
+            def slow_load(path):
+                time.sleep(0.2)
+                return MagicMock()
+            
+            with patch('translator.MarianMTModel.from_pretrained', side_effect=slow_load) as mock_model:
+                results = []
+                threads = [threading.Thread(target=lambda: results.append(translator.load_model("en-es")))
+                           for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            
+            assert mock_model.call_count == 1
+            assert [code for code, _ in results] == [1, 1, 1, 1]
+            state = translator.get_load_states()["en-es"]
+            assert state["state"] == "ready"
+            assert state["seconds"] >= 0.2
+
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_loading_model_raises_not_ready(self, mock_tokenizer, fake_marian):
+        """Test that a caller gets ModelNotReady instead of waiting past the timeout"""
+        import threading
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "opus-mt-en-es"))
+            translator = Translator(temp_dir)
+            release = threading.Event()
+            model, tokenizer = fake_marian
+            mock_tokenizer.return_value = tokenizer
+            
+            def blocked_load(path):
+                release.wait(5)
+                return model
+            
+            with patch('translator.MarianMTModel.from_pretrained', side_effect=blocked_load), \
+                    patch('translator.Config.MODEL_LOAD_WAIT_SECONDS', 0):
+                with pytest.raises(ModelNotReady) as error:
+                    translator.translate("en", "es", "hello")
+                assert error.value.retry_after >= 1
+                assert translator.get_load_states()["en-es"]["state"] == "loading"
+                
+                release.set()
+                assert translator.start_loading("en-es").result(5)[0] == 1
+            
+            assert translator.get_load_states()["en-es"]["state"] == "ready"
+            assert translator.translate("en", "es", "hello") == "HELLO"
+
+    def test_failed_load_state(self):
+        """Test that a failed load is reported with its error"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            translator.translate("fr", "de", "Bonjour")
+            
+            state = translator.get_load_states()["fr-de"]
+            assert state["state"] == "failed"
+            assert "not found" in state["error"]
+
+    @patch('translator.MarianMTModel.from_pretrained')
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_warmup_loads_and_generates(self, mock_tokenizer, mock_model, fake_marian):
+        """Test that warmup preloads routes and runs generations of several lengths"""
+        from translator import WARMUP_TEXTS
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "opus-mt-en-es"))
+            model, tokenizer = fake_marian
+            mock_model.return_value = model
+            mock_tokenizer.return_value = tokenizer
+            translator = Translator(temp_dir)
+            assert not translator.is_ready()
+            
+            translator.start_warmup(["en-es"]).join(5)
+            
+            assert translator.is_ready()
+            assert "en-es" in translator.get_loaded_models()
+            status = translator.get_warmup_status()
+            assert status["routes"]["en-es"]["state"] == "done"
+            # Each text alone, then all of them as one batch
+            assert [len(call) for call in tokenizer.calls] == [1] * len(WARMUP_TEXTS) + [len(WARMUP_TEXTS)]
+            # Warmup output is not cached
+            assert translator.get_cache_stats()["entries"] == 0
+
+    def test_warmup_failure_is_not_ready(self):
+        """Test that a route that cannot be warmed up keeps the service not ready"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            status = translator.warmup(["fr-de"])
+            
+            assert status["state"] == "failed"
+            assert "not found" in status["routes"]["fr-de"]["error"]
+            assert not translator.is_ready()
+
+    def test_warmup_without_routes_is_ready(self):
+        """Test that the service is ready right away when no routes are configured"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            translator = Translator(temp_dir)
+            translator.warmup([])
+            assert translator.is_ready()
+
+    def test_pivot_pair_is_supported(self):
+        """Test that a pair without a model is served through a pivot language"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for route in ["es-en", "en-fr"]:
+                os.makedirs(os.path.join(temp_dir, f"opus-mt-{route}"))
+            translator = Translator(temp_dir)
+            
+            assert translator.is_supported("es", "fr")
+            assert translator.get_route_chain("es", "fr") == ["es-en", "en-fr"]
+            assert translator.get_supported_langs() == [["en", "fr"], ["es", "en"], ["es", "fr"]]
+            assert translator.get_pivot_pairs() == {"es-fr": ["es-en", "en-fr"]}
+            assert translator.get_lang_routes("es") == [["es", "en"], ["es", "fr"]]
+            
+            with patch('translator.Config.PIVOT_ENABLED', False):
+                assert not translator.is_supported("es", "fr")
+                assert translator.get_route_chain("es", "fr") == ["es-fr"]
+
+    def test_pivot_translation_runs_cached_stages(self, fake_marian_routes):
+        """Test that a pivoted pair runs one batched stage per model and caches each stage"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for route in ["es-en", "en-fr", "en-de"]:
+                os.makedirs(os.path.join(temp_dir, f"opus-mt-{route}"))
+            translator = Translator(temp_dir)
+            
+            assert translator.translate("es", "fr", "hola mundo") == "HOLA MUNDO"
+            assert translator.translate_batch("es", "fr", ["uno", "dos", "uno"]) == ["UNO", "DOS", "UNO"]
+            assert sorted(translator.get_loaded_models()) == ["en-fr", "es-en"]
+            
+            # The es-en stage is shared with every pair that pivots through English
+            first_stage = fake_marian_routes["es-en"][0]
+            calls = len(first_stage.batch_shapes)
+            assert translator.translate_batch("es", "de", ["uno", "dos"]) == ["UNO", "DOS"]
+            assert len(first_stage.batch_shapes) == calls
+            assert fake_marian_routes["en-de"][0].batch_shapes == [(2, 1)]
+
+    def test_model_replaced_on_disk_is_reloaded(self, fake_marian_routes):
+        """Test that a route drops its cache and reloads once a download of it completes"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "opus-mt-en-es")
+            os.makedirs(path)
+            weights = os.path.join(path, "model.safetensors")
+            marker = os.path.join(path, ".download-complete")
+            for filename in (weights, marker):
+                with open(filename, "wb") as f:
+                    f.write(b"old")
+            translator = Translator(temp_dir)
+            assert translator.translate("en", "es", "hola") == "HOLA"
+            old_model = fake_marian_routes.pop("en-es")[0]
+            
+            with patch('translator.MODEL_CHECK_SECONDS', 0):
+                # A download served by another worker process is still replacing the files
+                modified = os.path.getmtime(weights) + 10
+                os.utime(weights, (modified, modified))
+                assert translator.translate("en", "es", "hola") == "HOLA"
+                assert translator.models["en-es"][0] is old_model
+                
+                # The download has completed
+                os.utime(marker, (modified, modified))
+                assert translator.translate("en", "es", "hola") == "HOLA"
+            
+            new_model = fake_marian_routes["en-es"][0]
+            assert translator.models["en-es"][0] is new_model
+            assert len(new_model.batch_shapes) == 1
+            assert len(old_model.batch_shapes) == 1
+
+    def test_model_check_is_throttled(self, fake_marian_routes):
+        """Test that a route's model files are checked at most once per interval"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "opus-mt-en-es"))
+            translator = Translator(temp_dir)
+            translator.translate("en", "es", "hola")
+            
+            with patch('translator._model_version', return_value=0.0) as version:
+                for _ in range(3):
+                    assert translator.translate("en", "es", "hola") == "HOLA"
+            assert version.call_count == 1
+
+    def test_pivot_stage_failure_is_reported(self, fake_marian_routes):
+        """Test that a failing second stage returns its error"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for route in ["es-en", "en-fr"]:
+                os.makedirs(os.path.join(temp_dir, f"opus-mt-{route}"))
+            translator = Translator(temp_dir)
+            translator.translate("es", "fr", "hola")
+            fake_marian_routes["en-fr"][0].generate = MagicMock(side_effect=RuntimeError("boom"))
+            
+            result = translator.translate_batch("es", "fr", ["adios"])
+            assert result[0].startswith("Error during batch translation")
+            assert "boom" in result[0]
+
+    def test_translate_multi_shares_source_side(self, fake_marian_routes):
+        """Test that segmentation and the shared first stage run once for all targets"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for route in ["es-en", "en-fr", "en-de"]:
+                os.makedirs(os.path.join(temp_dir, f"opus-mt-{route}"))
+            translator = Translator(temp_dir)
+            text = "uno dos. tres cuatro."
+            
+            with patch('translator.Config.SEGMENT_MAX_CHARS', 10), \
+                    patch('translator.split_segments', wraps=__import__('segmentation').split_segments) as split:
+                result = translator.translate_multi("es", ["en", "fr", "de"], [text, "cinco"])
+            
+            expected = [text.upper(), "CINCO"]
+            assert result == {"en": expected, "fr": expected, "de": expected}
+            assert split.call_count == 1
+            first_stage_model, first_stage_tokenizer = fake_marian_routes["es-en"]
+            assert len(first_stage_model.batch_shapes) == 1
+            assert len(first_stage_tokenizer.calls) == 1
+
+    def test_translate_multi_runs_models_concurrently(self, fake_marian_routes):
+        """Test that generate calls of different models overlap"""
+        import threading
+        with tempfile.TemporaryDirectory() as temp_dir:
+            targets = ["es", "fr", "de"]
+            for target in targets:
+                os.makedirs(os.path.join(temp_dir, f"opus-mt-en-{target}"))
+            translator = Translator(temp_dir)
+            for target in targets:
+                translator.load_model(f"en-{target}")
+            
+            # Only passes if all three models generate at the same time
+            barrier = threading.Barrier(len(targets), timeout=5)
+            for target in targets:
+                model = fake_marian_routes[f"en-{target}"][0]
+                model.generate = lambda generate=model.generate, **kwargs: (barrier.wait(), generate(**kwargs))[1]
+            
+            result = translator.translate_multi("en", targets, ["hello"])
+            assert result == {target: ["HELLO"] for target in targets}
+
+    def test_translate_multi_reports_errors_per_target(self, fake_marian_routes):
+        """Test that a missing model fails only its own target"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "opus-mt-en-es"))
+            translator = Translator(temp_dir)
+            
+            result = translator.translate_multi("en", ["es", "it"], ["hello"])
+            assert result["es"] == ["HELLO"]
+            assert "Model directory not found" in result["it"][0]
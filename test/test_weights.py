@@ -0,0 +1,85 @@
+import pytest
+import os
+import torch
+from unittest.mock import patch
+from transformers.models.marian import MarianMTModel
+
+from weights import (PICKLE_FILENAME, SAFETENSORS_FILENAME, convert_to_safetensors,
+                     ensure_safetensors, safetensors_is_current)
+
+
+@pytest.fixture
+def pickled_model_dir(tiny_model_dir):
+    """Turn the tiny model into a download-style directory with pytorch_model.bin only"""
+    model = MarianMTModel.from_pretrained(tiny_model_dir)
+    torch.save(model.state_dict(), os.path.join(tiny_model_dir, PICKLE_FILENAME))
+    os.remove(os.path.join(tiny_model_dir, SAFETENSORS_FILENAME))
+    return tiny_model_dir
+
+
+def mapped_file(tensor):
+    """Get the file a tensor's memory is mapped from, or None for anonymous memory"""
+    address = tensor.data_ptr()
+    with open('/proc/self/maps') as f:
+        for line in f:
+            fields = line.split()
+            start, end = (int(value, 16) for value in fields[0].split('-'))
+            if start <= address < end:
+                return fields[5] if len(fields) > 5 else None
+    return None
+
+
+class TestSafetensorsConversion:
+    """Test cases for safetensors model storage"""
+
+    def test_conversion_gives_same_model(self, pickled_model_dir):
+        """Test that the converted weights generate the same ids"""
+        original = MarianMTModel.from_pretrained(pickled_model_dir, use_safetensors=False).eval()
+        assert not safetensors_is_current(pickled_model_dir)
+
+        convert_to_safetensors(pickled_model_dir)
+        converted = MarianMTModel.from_pretrained(pickled_model_dir).eval()
+
+        input_ids = torch.tensor([[5, 9, 12, 7, 0]])
+        assert torch.equal(original.generate(input_ids=input_ids, max_new_tokens=8),
+                           converted.generate(input_ids=input_ids, max_new_tokens=8))
+        assert converted.lm_head.weight.data_ptr() == converted.model.shared.weight.data_ptr()
+
+    def test_conversion_keeps_weights_mtime(self, pickled_model_dir):
+        """Test that derived caches are not invalidated and a newer download is"""
+        convert_to_safetensors(pickled_model_dir)
+        pickled = os.path.join(pickled_model_dir, PICKLE_FILENAME)
+        converted = os.path.join(pickled_model_dir, SAFETENSORS_FILENAME)
+        assert os.path.getmtime(converted) == os.path.getmtime(pickled)
+        assert safetensors_is_current(pickled_model_dir)
+
+        future = os.path.getmtime(pickled) + 10
+        os.utime(pickled, (future, future))
+        assert not safetensors_is_current(pickled_model_dir)
+
+    @pytest.mark.skipif(not os.path.exists('/proc/self/maps'), reason='needs /proc/self/maps')
+    def test_converted_weights_are_memory_mapped(self, pickled_model_dir):
+        """Test that loading safetensors maps the weights from the file"""
+        convert_to_safetensors(pickled_model_dir)
+        model = MarianMTModel.from_pretrained(pickled_model_dir)
+        weight = model.model.encoder.layers[0].fc1.weight
+        assert mapped_file(weight) == os.path.join(pickled_model_dir, SAFETENSORS_FILENAME)
+
+    def test_failed_conversion_falls_back(self, pickled_model_dir):
+        """Test that a conversion error leaves the pickled weights in use"""
+        with patch('weights.save_model', side_effect=OSError('disk full')):
+            assert ensure_safetensors(pickled_model_dir) is False
+        assert not os.path.exists(os.path.join(pickled_model_dir, SAFETENSORS_FILENAME))
+
+    @pytest.mark.parametrize('conversion,expected', [('off', False), ('lazy', True)])
+    @patch('translator.MarianTokenizer.from_pretrained')
+    def test_translator_converts_lazily(self, mock_tokenizer, pickled_model_dir, conversion, expected):
+        """Test that the first load converts the model when enabled"""
+        from translator import Translator
+        translator = Translator(os.path.dirname(pickled_model_dir))
+
+        with patch('translator.Config.SAFETENSORS_CONVERSION', conversion):
+            success_code, _ = translator.load_model('en-es')
+
+        assert success_code == 1
+        assert os.path.exists(os.path.join(pickled_model_dir, SAFETENSORS_FILENAME)) is expected
@@ -0,0 +1,201 @@
+"""
+Persistent translation memory backed by SQLite.
+
+The store lives next to the downloaded models and is shared by every worker
+process on the host. It runs in WAL mode so readers never block the single
+writer, and it is pruned by last use once it grows past its size limit.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Hashable, List, Optional
+
+from cache import normalize_text
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+# Check the store size after this many inserted rows
+_PRUNE_INTERVAL = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    route TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (route, settings, source)
+);
+CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used);
+"""
+
+
+class TranslationStore():
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Open (or create) a translation store.
+
+        Args:
+            path (str): Path of the SQLite database file
+            max_bytes (int): Size of stored text above which the least
+                recently used translations are pruned
+        """
+        self.path = path
+        self.max_bytes = max(1, int(max_bytes))
+        self._local = threading.local()
+        self._inserted = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def get_many(self, route: str, texts: List[str], settings: Hashable = None) -> List[Optional[str]]:
+        """
+        Look up several texts for the same route.
+
+        Returns:
+            List with the stored translation or None for each text
+        """
+        sources = [normalize_text(text) for text in texts]
+        settings_key = repr(settings)
+        found: Dict[str, str] = {}
+
+        conn = self._connection()
+        unique = list(dict.fromkeys(sources))
+        for start in range(0, len(unique), _QUERY_CHUNK):
+            chunk = unique[start:start + _QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT source, translation FROM translations "
+                f"WHERE route = ? AND settings = ? AND source IN ({placeholders})",
+                [route, settings_key, *chunk]
+            ).fetchall()
+            found.update(rows)
+
+        if found:
+            now = time.time()
+            with conn:
+                conn.executemany(
+                    "UPDATE translations SET last_used = ? WHERE route = ? AND settings = ? AND source = ?",
+                    [(now, route, settings_key, source) for source in found]
+                )
+
+        return [found.get(source) for source in sources]
+
+    def put_many(self, route: str, texts: List[str], translations: List[str], settings: Hashable = None):
+        """Store several translations for the same route in one transaction"""
+        now = time.time()
+        settings_key = repr(settings)
+        rows = []
+        for text, translation in zip(texts, translations):
+            source = normalize_text(text)
+            size = len(source.encode("utf-8")) + len(translation.encode("utf-8"))
+            rows.append((route, settings_key, source, translation, size, now))
+        if not rows:
+            return
+
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO translations "
+                "(route, settings, source, translation, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+        with self._lock:
+            self._inserted += len(rows)
+            should_prune = self._inserted >= _PRUNE_INTERVAL
+            if should_prune:
+                self._inserted = 0
+        if should_prune:
+            self.prune()
+
+    def invalidate_route(self, route: str) -> int:
+        """
+        Remove every stored translation for a route.
+
+        Returns:
+            Number of removed translations
+        """
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM translations WHERE route = ?", (route,))
+        return cursor.rowcount
+
+    def prune(self, target_bytes: Optional[int] = None) -> int:
+        """
+        Delete least recently used translations until the store fits.
+
+        Args:
+            target_bytes (int): Size to shrink to, defaults to 90% of max_bytes
+                once the store exceeds max_bytes
+
+        Returns:
+            Number of removed translations
+        """
+        conn = self._connection()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+        if target_bytes is None:
+            if total <= self.max_bytes:
+                return 0
+            target_bytes = int(self.max_bytes * 0.9)
+
+        removed = 0
+        while total > target_bytes:
+            rows = conn.execute(
+                "SELECT rowid, size FROM translations ORDER BY last_used LIMIT ?", (_QUERY_CHUNK,)
+            ).fetchall()
+            if not rows:
+                break
+
+            doomed = []
+            for rowid, size in rows:
+                if total <= target_bytes:
+                    break
+                doomed.append((rowid,))
+                total -= size
+            with conn:
+                conn.executemany("DELETE FROM translations WHERE rowid = ?", doomed)
+            removed += len(doomed)
+        return removed
+
+    def stats(self) -> Dict:
+        """Get number of stored translations and their total size"""
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM translations"
+        ).fetchone()
+        return {
+            "enabled": True,
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes
+        }
+
+    def close(self):
+        """Close the connection owned by the calling thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def after_fork(self):
+        """Forget connections inherited from the parent process (SQLite connections must not cross fork)"""
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection (sqlite3 connections are per thread)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -1,6 +1,103 @@
 from transformers.models.marian import MarianTokenizer, MarianMTModel
+import math
 import os
-from typing import List, Tuple, Union
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+from batching import MicroBatcher, plan_length_buckets
+from cache import TranslationCache
+from config import Config
+from engines import ENGINES, load_onnx_engine
+from generation import generate_kwargs, resolve_profile
+from inference_pool import InferencePool
+import metrics
+import prefork
+from process_pool import ProcessInferencePool
+from quantization import PRECISIONS, load_quantized_model
+from residency import ModelResidency, estimate_model_size, weights_mtime
+from routes import RouteRegistry
+from segmentation import join_segments, split_segments
+from translation_store import TranslationStore
+from weights import ensure_safetensors
+
+# Load time assumed for a route that has never finished loading
+DEFAULT_LOAD_SECONDS = 5
+
+# Seconds between checks of a route's model for changes on disk
+MODEL_CHECK_SECONDS = 1
+
+# Dummy inputs at typical lengths (a phrase, a sentence, a paragraph) used to
+# warm up a route's first generate calls before it takes traffic
+WARMUP_TEXTS = [
+    "Hello, how are you?",
+    "The weather was nice yesterday, so we walked to the old market and bought fresh bread.",
+    "The meeting has been moved to Thursday afternoon because several members of the team "
+    "are travelling this week. Please review the attached report before then and send any "
+    "comments to the project coordinator, who will collect them and prepare a short summary "
+    "for the discussion.",
+]
+
+
+def _is_out_of_memory(error: Exception) -> bool:
+    """Check whether an exception was caused by running out of memory"""
+    if isinstance(error, MemoryError):
+        return True
+    message = str(error).lower()
+    return isinstance(error, RuntimeError) and (
+        "out of memory" in message or "can't allocate memory" in message
+    )
+
+
+def _model_max_length(model) -> Union[int, None]:
+    """Get the generation length limit of a model (or engine), if it has one"""
+    max_length = getattr(getattr(model, "generation_config", None), "max_length", None)
+    return max_length if isinstance(max_length, int) else None
+
+
+def _model_version(path: str) -> float:
+    """
+    Get the version of a model directory's files: the time its last download
+    completed, or the weights modification time for a model that was not
+    downloaded by download_model.py.
+    """
+    marker = os.path.join(path, Config.DOWNLOAD_COMPLETE_FILENAME)
+    if os.path.exists(marker):
+        return os.path.getmtime(marker)
+    return weights_mtime(path)
+
+
+def _raise_first_error(results: List[Union[str, Exception]]):
+    """Raise the first exception in a list of generate results"""
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+
+def load_route_model(path: str, engine: str = "torch", precision: str = "fp32"):
+    """
+    Read a route's model (or inference engine) from disk.
+    
+    Args:
+        path (str): Model directory
+        engine (str): 'torch' or 'onnx'
+        precision (str): 'fp32' or 'int8', only used by the torch engine
+    """
+    if engine == "onnx":
+        return load_onnx_engine(path)
+    if precision == "int8":
+        return load_quantized_model(path)
+    return MarianMTModel.from_pretrained(path)
+
+
+class ModelNotReady(Exception):
+    """Raised when a route's model is still loading after the caller's wait timeout"""
+    
+    def __init__(self, route: str, retry_after: int):
+        super().__init__(f"Model for {route} is still loading, retry in {retry_after} seconds")
+        self.route = route
+        self.retry_after = retry_after
+
 
 class Translator():
     def __init__(self, models_dir: str = "data"):
@@ -10,35 +107,226 @@ class Translator():
         Args:
             models_dir (str): Directory where the opus-mt models are stored
         """
-        self.models = {}
+        self.models = ModelResidency(
+            max_bytes=Config.MODEL_MEMORY_BUDGET_MB * 1024 * 1024,
+            max_models=Config.MAX_RESIDENT_MODELS,
+            pinned=Config.PINNED_ROUTES
+        )
         self.models_dir = models_dir 
+        self.routes = RouteRegistry(models_dir)
+        
+        # Models load on a background executor, with at most one load in
+        # flight per route that every waiting request shares
+        self._loader = self._create_loader()
+        self._loading: Dict[str, Future] = {}
+        self._load_states: Dict[str, Dict] = {}
+        self._load_lock = threading.Lock()
+        
+        # Version of each loaded route's model files (see _model_version), so
+        # every worker process notices a model replaced on disk by another
+        # one, and when each route was last checked
+        self._weights_mtimes: Dict[str, float] = {}
+        self._weights_checked: Dict[str, float] = {}
+        
+        # Startup warmup, reported by the readiness endpoint
+        self._warmup = {"state": "pending", "routes": {}}
+        self._warmup_thread = None
+        
+        # Concurrent single-text requests are grouped per route
+        self.batcher = self._create_batcher()
+        
+        # Generate calls of /translate/multi, one model per thread
+        self._fanout = self._create_fanout()
+        
+        # Cores the inference pools divide among their workers (None = all the
+        # cores of this process); a pre-fork worker gets its own share
+        self.cpus: Optional[List[int]] = None
+        
+        # Generate calls run on workers pinned to their own slice of cores
+        self.inference_pool = self._create_inference_pool()
+        
+        # Or in separate processes, each holding the models of its routes
+        self.process_pool = self._create_process_pool()
+        
+        # Repeated texts are served from memory instead of the model
+        self.cache = None
+        if Config.CACHE_ENABLED:
+            self.cache = TranslationCache(
+                max_entries=Config.CACHE_SIZE,
+                max_bytes=Config.CACHE_MAX_MB * 1024 * 1024
+            )
+        
+        # Optional on-disk translation memory shared by worker processes
+        self.store = None
+        if Config.TRANSLATION_STORE_ENABLED:
+            self.store = TranslationStore(
+                Config.TRANSLATION_STORE_PATH or os.path.join(models_dir, Config.TRANSLATION_STORE_FILENAME),
+                max_bytes=Config.TRANSLATION_STORE_MAX_MB * 1024 * 1024
+            )
+
+    def _create_loader(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=max(1, Config.MODEL_LOAD_WORKERS),
+            thread_name_prefix="model-loader"
+        )
+
+    def _create_fanout(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=max(1, Config.MULTI_TARGET_WORKERS),
+            thread_name_prefix="multi-target"
+        )
+
+    def _create_inference_pool(self):
+        # Not in a pre-fork master: its threads would break OpenMP in the workers
+        if Config.INFERENCE_WORKERS <= 0 or prefork.in_master():
+            return None
+        return InferencePool(
+            Config.INFERENCE_WORKERS,
+            threads_per_worker=Config.INFERENCE_THREADS_PER_WORKER,
+            interop_threads=Config.INFERENCE_INTEROP_THREADS,
+            pin=Config.INFERENCE_PIN_CPUS,
+            cpus=self.cpus
+        )
+
+    def _create_process_pool(self):
+        # The master's processes would be shared by every forked worker
+        if Config.INFERENCE_PROCESSES <= 0 or prefork.in_master():
+            return None
+        return ProcessInferencePool(
+            Config.INFERENCE_PROCESSES,
+            threads_per_process=Config.INFERENCE_PROCESS_THREADS,
+            pin=Config.INFERENCE_PIN_CPUS,
+            buffer_bytes=Config.INFERENCE_PROCESS_BUFFER_MB * 1024 * 1024,
+            cpus=self.cpus
+        )
+
+    def _create_batcher(self):
+        if not Config.MICRO_BATCH_ENABLED:
+            return None
+        return MicroBatcher(
+            self._generate_batch,
+            max_batch_size=Config.MICRO_BATCH_MAX_SIZE,
+            max_wait_ms=Config.MICRO_BATCH_MAX_WAIT_MS,
+            observe_wait=lambda key, seconds: metrics.QUEUE_WAIT_SECONDS.observe(seconds, route=key[0])
+        )
+
+    def after_fork(self, cpus: Optional[List[int]] = None):
+        """
+        Reset per-process state in a worker forked from a process that has
+        already loaded models.
+        
+        Threads do not survive fork, so the loader and fan-out executors, the
+        micro-batcher and the inference pool are recreated and the parent's
+        SQLite connections are dropped. Loaded models are kept and shared copy-on-write.
+        The inference processes, never started in the master, start here; the
+        routes the master preloaded in-process are then reloaded into them in
+        the background and keep being served in-process until they are.
+        
+        Args:
+            cpus (List[int]): This worker's share of the cores, divided among
+                its inference workers or processes (None = every core)
+        """
+        self.cpus = cpus
+        self._loader = self._create_loader()
+        self._load_lock = threading.Lock()
+        self._loading = {route: future for route, future in self._loading.items() if future.done()}
+        self._warmup_thread = None
+        self.batcher = self._create_batcher()
+        self._fanout = self._create_fanout()
+        self.inference_pool = self._create_inference_pool()
+        if self.store is not None:
+            self.store.after_fork()
+        if self.process_pool is None:
+            self.process_pool = self._create_process_pool()
+            preloaded = self.models.keys()
+            if self.process_pool is not None and preloaded:
+                self.start_warmup(preloaded)
 
     def get_supported_langs(self) -> List[List[str]]:
         """
         Get list of supported language pairs based on downloaded models.
         
+        Pairs served by pivoting through another language follow the pairs
+        that have a model of their own.
+        
+        Returns:
+            List of [source, target] language pairs
+        """
+        pairs = self.routes.pairs()
+        if Config.PIVOT_ENABLED:
+            pairs += [[source, target] for source, target in self.routes.pivot_pairs(Config.PIVOT_MAX_HOPS)]
+        return pairs
+
+    def get_pivot_pairs(self) -> Dict[str, List[str]]:
+        """
+        Get the pairs translated through a chain of models.
+        
+        Returns:
+            Dictionary of pair -> model routes, e.g. {'es-fr': ['es-en', 'en-fr']}
+        """
+        if not Config.PIVOT_ENABLED:
+            return {}
+        pivots = self.routes.pivot_pairs(Config.PIVOT_MAX_HOPS)
+        return {f"{source}-{target}": [f"{a}-{b}" for a, b in chain] for (source, target), chain in pivots.items()}
+
+    def get_route_chain(self, source: str, target: str) -> List[str]:
+        """
+        Get the model routes that translate a pair, in order.
+        
+        Args:
+            source (str): Source language code
+            target (str): Target language code
+            
+        Returns:
+            The direct route, the shortest pivot chain if there is no direct
+            model, or the direct route again if the pair cannot be served
+            (its load then reports the missing model)
+        """
+        route = f'{source}-{target}'
+        if not Config.PIVOT_ENABLED or self.routes.has(source, target):
+            return [route]
+        chain = self.routes.chain(source, target, Config.PIVOT_MAX_HOPS)
+        return [f"{a}-{b}" for a, b in chain] if chain else [route]
+
+    def is_supported(self, source: str, target: str) -> bool:
+        """
+        Check whether a language pair can be translated.
+        
+        Args:
+            source (str): Source language code
+            target (str): Target language code
+            
+        Returns:
+            True if a model for the route is available, or a chain of
+            models can pivot through other languages
+        """
+        if self.routes.has(source, target):
+            return True
+        return Config.PIVOT_ENABLED and self.routes.chain(source, target, Config.PIVOT_MAX_HOPS) is not None
+
+    def get_lang_routes(self, source: str) -> List[List[str]]:
+        """
+        Get the supported language pairs that start at a source language.
+        
+        Args:
+            source (str): Source language code
+            
         Returns:
             List of [source, target] language pairs
         """
-        if not os.path.exists(self.models_dir):
-            return []
-            
-        routes = []
-        for folder in os.listdir(self.models_dir):
-            if folder.startswith('opus-mt-') and len(folder.split('-')) >= 4:
-                # Extract source and target languages from folder name
-                # Format: opus-mt-{source}-{target}
-                parts = folder.split('-')
-                if len(parts) >= 4:
-                    source = parts[2]
-                    target = parts[3]
-                    routes.append([source, target])
-        return routes 
+        targets = self.routes.targets_for(source)
+        if Config.PIVOT_ENABLED:
+            targets += [target for pivot_source, target in self.routes.pivot_pairs(Config.PIVOT_MAX_HOPS)
+                        if pivot_source == source]
+        return [[source, target] for target in targets]
 
     def load_model(self, route: str) -> Tuple[int, str]:
         """
         Load a translation model into memory.
         
+        Waits for the load, joining one that is already in progress for the
+        route instead of starting another.
+        
         Args:
             route (str): Language route in format 'source-target' (e.g., 'en-es')
             
@@ -47,24 +335,345 @@ class Translator():
             success_code: 1 for success, 0 for failure
             message: Description of the result
         """
+        success_code, message, _ = self.start_loading(route).result()
+        return success_code, message
+
+    def start_loading(self, route: str) -> Future:
+        """
+        Start loading a model in the background, unless it is already loading.
+        
+        Args:
+            route (str): Language route, e.g. 'en-es'
+            
+        Returns:
+            Future with the (success_code, message, (model, tokenizer)) result
+            of the load, the pair being None if it failed
+        """
+        with self._load_lock:
+            future = self._loading.get(route)
+            if future is not None:
+                return future
+            previous = self._load_states.get(route, {})
+            self._load_states[route] = {
+                "state": "loading",
+                "started": time.time(),
+                "seconds": None,
+                "last_seconds": previous.get("seconds") or previous.get("last_seconds"),
+                "error": None
+            }
+            future = self._loader.submit(self._run_load, route)
+            self._loading[route] = future
+            return future
+
+    def _run_load(self, route: str) -> Tuple[int, str, Optional[Tuple]]:
+        """Load a model on the executor and record how it went"""
+        started = time.perf_counter()
+        try:
+            success_code, message, pair = self._load_model(route)
+        except Exception as e:
+            success_code, message, pair = 0, f"Error loading model for {route}: {str(e)}", None
+        elapsed = round(time.perf_counter() - started, 3)
+        metrics.MODEL_LOAD_SECONDS.observe(elapsed, route=route, state="ready" if success_code else "failed")
+        
+        with self._load_lock:
+            self._loading.pop(route, None)
+            state = self._load_states[route]
+            state["state"] = "ready" if success_code else "failed"
+            state["seconds"] = elapsed
+            state["error"] = None if success_code else message
+        return success_code, message, pair
+
+    def _ensure_loaded(self, route: str) -> Tuple[Optional[Tuple], str]:
+        """
+        Make sure a route's model is resident, waiting up to Config.MODEL_LOAD_WAIT_SECONDS.
+        
+        The caller keeps the returned pair for its generate calls, so the
+        model cannot be evicted from under a request that is already running.
+        
+        Returns:
+            Tuple of ((model, tokenizer), message), the pair being None if
+            the model could not be loaded
+            
+        Raises:
+            ModelNotReady: If the model is still loading after the wait
+        """
+        pair = self.models.get(route)
+        if pair is not None:
+            return pair, f"Model for {route} is loaded"
+        
+        future = self.start_loading(route)
+        try:
+            _, message, pair = future.result(timeout=max(0, Config.MODEL_LOAD_WAIT_SECONDS))
+        except FutureTimeoutError:
+            raise ModelNotReady(route, self._retry_after(route))
+        return pair, message
+
+    def _retry_after(self, route: str) -> int:
+        """Estimate the seconds left for a loading route from its previous load time"""
+        with self._load_lock:
+            state = self._load_states.get(route, {})
+            expected = state.get("last_seconds") or DEFAULT_LOAD_SECONDS
+            elapsed = time.time() - state.get("started", time.time())
+        return max(1, math.ceil(expected - elapsed))
+
+    def get_load_states(self) -> Dict[str, Dict]:
+        """
+        Get the load state of every route that has been requested.
+        
+        Returns:
+            Dictionary of route -> {state, seconds, error} where state is
+            'loading', 'ready', 'failed' or 'unloaded' (evicted after loading)
+            and seconds is the load time (so far, while loading)
+        """
+        with self._load_lock:
+            states = {route: dict(state) for route, state in self._load_states.items()}
+        
+        report = {}
+        now = time.time()
+        for route, state in states.items():
+            name = state["state"]
+            if name == "ready" and route not in self.models:
+                name = "unloaded"
+            seconds = state["seconds"]
+            if name == "loading":
+                seconds = round(now - state["started"], 3)
+            report[route] = {"state": name, "seconds": seconds, "error": state["error"]}
+        return report
+
+    def _load_model(self, route: str) -> Tuple[int, str, Optional[Tuple]]:
+        """Read a model and its tokenizer from disk (runs on the loader executor)"""
         model_name = f'opus-mt-{route}'
         path = os.path.join(self.models_dir, model_name)
         
         if not os.path.exists(path):
-            return 0, f"Model directory not found: {path}. Make sure you have downloaded model for {route} translation"
+            return (0, f"Model directory not found: {path}. Make sure you have downloaded model for {route} translation",
+                    None)
             
+        # Keep room for the new model; least recently used models are only
+        # evicted once it has loaded
+        self.models.reserve(route, estimate_model_size(path))
         try:
-            print(f"Loading model from {path}...")
-            model = MarianMTModel.from_pretrained(path)
+            # Models downloaded before conversion was enabled are converted here
+            if Config.SAFETENSORS_CONVERSION in ("download", "lazy"):
+                ensure_safetensors(path)
+            self._weights_mtimes[route] = _model_version(path)
+            
+            # The precision setting only applies to the torch engine
+            engine = self.get_engine(route)
+            precision = self.get_precision(route)
+            print(f"Loading model from {path} ({engine if engine == 'onnx' else precision})...")
+            if self.process_pool is not None:
+                # The model lives in its inference process, only a proxy is kept here
+                model = self.process_pool.load(route, path, engine, precision)
+            else:
+                model = load_route_model(path, engine, precision)
             tokenizer = MarianTokenizer.from_pretrained(path)
             
-            self.models[route] = (model, tokenizer)
-            return 1, f"Successfully loaded model for {route} translation"
+            pair = (model, tokenizer)
+            self.models[route] = pair
+            return 1, f"Successfully loaded model for {route} translation", pair
+            
+        except Exception as e:
+            self.models.release(route)
+            return 0, f"Error loading model for {route}: {str(e)}", None
+
+    def get_precision(self, route: str) -> str:
+        """
+        Get the inference precision configured for a route.
+        
+        Args:
+            route (str): Language route, e.g. 'en-es'
+            
+        Returns:
+            'fp32' or 'int8' (dynamically quantized Linear layers)
+        """
+        precision = Config.ROUTE_PRECISION.get(route, Config.MODEL_PRECISION)
+        return precision if precision in PRECISIONS else "fp32"
+
+    def get_engine(self, route: str) -> str:
+        """
+        Get the inference engine configured for a route.
+        
+        Args:
+            route (str): Language route, e.g. 'en-es'
+            
+        Returns:
+            'torch' (transformers generate) or 'onnx' (ONNX Runtime)
+        """
+        engine = Config.ROUTE_ENGINES.get(route, Config.MODEL_ENGINE)
+        return engine if engine in ENGINES else "torch"
+
+    def start_warmup(self, routes: List[str]) -> threading.Thread:
+        """
+        Warm up routes in a background thread.
+        
+        Args:
+            routes (List[str]): Language routes to preload, e.g. ['en-es']
+            
+        Returns:
+            The started warmup thread
+        """
+        thread = threading.Thread(target=self.warmup, args=(list(routes),), name="warmup", daemon=True)
+        self._warmup_thread = thread
+        thread.start()
+        return thread
+
+    def wait_for_warmup(self, timeout: float = None) -> Dict:
+        """
+        Block until a warmup started with start_warmup has finished.
+        
+        Returns:
+            Warmup status as returned by get_warmup_status
+        """
+        thread = self._warmup_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.get_warmup_status()
+
+    def warmup(self, routes: List[str]) -> Dict:
+        """
+        Load routes and run a few dummy generations at typical lengths.
+        
+        The first generate calls of a model are much slower than the rest
+        (allocator, kernel selection), so they are paid here instead of by
+        the first real requests. Results bypass the translation cache.
+        
+        Args:
+            routes (List[str]): Language routes to preload, e.g. ['en-es']
+            
+        Returns:
+            Warmup status as returned by get_warmup_status
+        """
+        self._warmup = {"state": "running", "routes": {route: {"state": "pending"} for route in routes}}
+        
+        for route in routes:
+            started = time.perf_counter()
+            status = self._warmup["routes"][route]
+            status["state"] = "running"
+            try:
+                success_code, message, pair = self.start_loading(route).result()
+                if not success_code:
+                    raise RuntimeError(message)
+                for text in WARMUP_TEXTS:
+                    _raise_first_error(self._generate(route, pair, [text]))
+                _raise_first_error(self._generate(route, pair, WARMUP_TEXTS))
+                status["state"] = "done"
+            except Exception as e:
+                status["state"] = "failed"
+                status["error"] = str(e)
+                print(f"Warmup failed for {route}: {str(e)}")
+            status["seconds"] = round(time.perf_counter() - started, 3)
+        
+        failed = any(status["state"] == "failed" for status in self._warmup["routes"].values())
+        self._warmup["state"] = "failed" if failed else "done"
+        return self.get_warmup_status()
+
+    def get_warmup_status(self) -> Dict:
+        """
+        Get the startup warmup progress.
+        
+        Returns:
+            Dictionary with the overall state ('pending', 'running', 'done'
+            or 'failed') and the state, time and error of each route
+        """
+        return {
+            "state": self._warmup["state"],
+            "routes": {route: dict(status) for route, status in self._warmup["routes"].items()}
+        }
+
+    def is_ready(self) -> bool:
+        """
+        Check whether warmup finished for every configured route.
+        
+        Returns:
+            True once the service can take traffic
+        """
+        return self._warmup["state"] == "done"
+
+    def _generate_batch(self, key: Tuple[str, str], texts: List[str]) -> List[Union[str, Exception]]:
+        """Run a micro-batch, whose key is the (route, profile) of its requests"""
+        route, profile = key
+        # Reloads the model if it was evicted while the batch was collected
+        pair, message = self._ensure_loaded(route)
+        if pair is None:
+            raise RuntimeError(message)
+        return self._generate(route, pair, texts, profile)
+
+    def _generate(self, route: str, pair: Tuple, texts: List[str], profile: str = None) -> List[Union[str, Exception]]:
+        """
+        Translate texts with an already loaded model, on the next free
+        inference worker when the pool is enabled.
+        """
+        if self.inference_pool is not None:
+            return self.inference_pool.run(self._run_generate, route, pair, texts, profile, route=route)
+        return self._run_generate(route, pair, texts, profile)
+
+    def _run_generate(self, route: str, pair: Tuple, texts: List[str],
+                      profile: str = None) -> List[Union[str, Exception]]:
+        """
+        Translate texts with an already loaded model using length buckets.
+        
+        Texts are sorted by token length and split into sub-batches bounded
+        by Config.BATCH_TOKEN_BUDGET, so short texts do not pay for the
+        padding of a long one. Results are returned in input order.
+        
+        Args:
+            route (str): Language route of an already loaded model
+            pair (Tuple): The route's (model, tokenizer)
+            texts (List[str]): Texts to translate
+            profile (str): Generation profile (server default if not given)
             
+        Returns:
+            List with the translated text, or the exception that made it
+            fail, for each input
+        """
+        model, tokenizer = pair
+        profile = resolve_profile(profile, Config.GENERATION_PROFILE)
+        
+        started = time.perf_counter()
+        input_ids = tokenizer(texts, truncation=True)["input_ids"]
+        metrics.TOKENIZE_SECONDS.observe(time.perf_counter() - started, route=route)
+        lengths = [len(ids) for ids in input_ids]
+        for length in lengths:
+            metrics.INPUT_TOKENS.observe(length, route=route)
+        
+        results: List[Union[str, Exception]] = [None] * len(texts)
+        for bucket in plan_length_buckets(lengths, Config.BATCH_TOKEN_BUDGET):
+            self._generate_bucket(route, model, tokenizer, [input_ids[i] for i in bucket], bucket, results, profile)
+        return results
+
+    def _generate_bucket(self, route: str, model, tokenizer, input_ids: List[List[int]],
+                         indices: List[int], results: List[Union[str, Exception]], profile: str):
+        """Run one padded generate call, splitting it in half on out-of-memory"""
+        try:
+            batch = tokenizer.pad({"input_ids": input_ids}, return_tensors="pt")
+            settings = generate_kwargs(profile, max(len(ids) for ids in input_ids), _model_max_length(model))
+            started = time.perf_counter()
+            generated = model.generate(**batch, **settings)
+            generated_at = time.perf_counter()
+            translated: List[str] = tokenizer.batch_decode(generated, skip_special_tokens=True)
+            decoded_at = time.perf_counter()
         except Exception as e:
-            return 0, f"Error loading model for {route}: {str(e)}"
+            if _is_out_of_memory(e) and len(indices) > 1:
+                middle = len(indices) // 2
+                self._generate_bucket(route, model, tokenizer, input_ids[:middle], indices[:middle], results, profile)
+                self._generate_bucket(route, model, tokenizer, input_ids[middle:], indices[middle:], results, profile)
+                return
+            for index in indices:
+                results[index] = e
+            return
+        
+        metrics.GENERATE_SECONDS.observe(generated_at - started, route=route)
+        metrics.DECODE_SECONDS.observe(decoded_at - generated_at, route=route)
+        metrics.BATCH_SIZE.observe(len(indices), route=route)
+        # The decoder start token is the pad token, so it is not counted
+        for length in (generated != tokenizer.pad_token_id).sum(dim=1).tolist():
+            metrics.OUTPUT_TOKENS.observe(length, route=route)
+        
+        for index, text in zip(indices, translated):
+            results[index] = text
 
-    def translate(self, source: str, target: str, text: str) -> str:
+    def translate(self, source: str, target: str, text: str, profile: str = None) -> str:
         """
         Translate text from source language to target language.
         
@@ -72,32 +681,72 @@ class Translator():
             source (str): Source language code (e.g., 'en')
             target (str): Target language code (e.g., 'es') 
             text (str): Text to translate
+            profile (str): Generation profile, e.g. 'fast' or 'quality'
+                (Config.GENERATION_PROFILE if not given)
             
         Returns:
             Translated text or error message
+            
+        Raises:
+            ValueError: If the profile is unknown
         """
-        route = f'{source}-{target}'
+        profile = resolve_profile(profile, Config.GENERATION_PROFILE)
+        chain = self.get_route_chain(source, target)
+        
+        # Long texts are split into sentences and translated as one batch
+        if len(text) > Config.SEGMENT_MAX_CHARS:
+            segments, separators = split_segments(text, Config.SEGMENT_MAX_CHARS)
+            results, failed = self._translate_chain(chain, segments, "Error during translation", profile=profile)
+            if failed:
+                return results[min(failed)]
+            return join_segments(results, separators)
+        
+        # A pivoted pair runs one stage per model
+        self._prefetch(chain)
+        result = text
+        for route in chain:
+            success, result = self._translate_one(route, result, profile)
+            if not success:
+                return result
+        return result
+
+    def _translate_one(self, route: str, text: str, profile: str) -> Tuple[bool, str]:
+        """
+        Translate a single text with one model through the cache tiers and
+        the micro-batcher.
+        
+        Returns:
+            Tuple of (success, translated text or error message)
+        """
+        cached = self._lookup(route, [text], profile)[0]
+        if cached is not None:
+            return True, cached
         
         # Load model if not already in memory
-        if route not in self.models:
-            success_code, message = self.load_model(route)
-            if not success_code:
-                return message 
+        pair, message = self._ensure_loaded(route)
+        if pair is None:
+            return False, message
 
         try:
-            model, tokenizer = self.models[route]
+            # Share a generate call with concurrent requests for this route
+            # and profile
+            if self.batcher is not None:
+                result = self.batcher.translate((route, profile), text)
+            else:
+                result = self._generate(route, pair, [text], profile)[0]
             
-            # Use modern transformers API
-            batch = tokenizer(text, return_tensors="pt")
-            generated = model.generate(**batch)
-            translated: List[str] = tokenizer.batch_decode(generated, skip_special_tokens=True)
+            if isinstance(result, Exception):
+                raise result
+            if result is None:
+                return False, "Translation failed"
             
-            return translated[0] if translated else "Translation failed"
+            self._remember(route, [text], [result], profile)
+            return True, result
             
         except Exception as e:
-            return f"Error during translation: {str(e)}"
+            return False, f"Error during translation: {str(e)}"
 
-    def translate_batch(self, source: str, target: str, texts: List[str]) -> List[str]:
+    def translate_batch(self, source: str, target: str, texts: List[str], profile: str = None) -> List[str]:
         """
         Translate multiple texts at once for better efficiency.
         
@@ -105,31 +754,360 @@ class Translator():
             source (str): Source language code
             target (str): Target language code
             texts (List[str]): List of texts to translate
+            profile (str): Generation profile (Config.GENERATION_PROFILE if not given)
             
         Returns:
             List of translated texts
+            
+        Raises:
+            ValueError: If the profile is unknown
         """
-        route = f'{source}-{target}'
+        profile = resolve_profile(profile, Config.GENERATION_PROFILE)
+        chain = self.get_route_chain(source, target)
+        segments, layout = self._split_texts(texts)
+        results, failed = self._translate_chain(chain, segments, profile=profile)
+        return self._join_texts(results, failed, layout)
+
+    def translate_multi(self, source: str, targets: List[str], texts: List[str],
+                        profile: str = None) -> Dict[str, List[str]]:
+        """
+        Translate the same texts into several target languages.
         
-        # Load model if not already in memory
-        if route not in self.models:
-            success_code, message = self.load_model(route)
-            if not success_code:
-                return [message] * len(texts)
+        The texts are segmented once, and targets whose chains start with the
+        same model (e.g. es-en for es-fr and es-de when pivoting) share that
+        stage, including its cache lookups. The generate calls of different
+        models run concurrently on the fan-out executor, whose
+        Config.MULTI_TARGET_WORKERS threads are shared by all requests.
+        
+        Args:
+            source (str): Source language code
+            targets (List[str]): Target language codes
+            texts (List[str]): Texts to translate
+            profile (str): Generation profile (Config.GENERATION_PROFILE if not given)
+            
+        Returns:
+            Dictionary of target -> translated texts (or error messages)
+        """
+        profile = resolve_profile(profile, Config.GENERATION_PROFILE)
+        segments, layout = self._split_texts(texts)
+        chains = {target: self.get_route_chain(source, target) for target in dict.fromkeys(targets)}
+        
+        # Every model involved starts loading at once
+        for chain in chains.values():
+            for route in chain:
+                if route not in self.models:
+                    self.start_loading(route)
+        
+        first_routes = list(dict.fromkeys(chain[0] for chain in chains.values()))
+        futures = {route: self._fanout.submit(self._translate_many, route, segments, profile=profile) for route in first_routes}
+        first_stages = {route: future.result() for route, future in futures.items()}
+        
+        def finish(chain: List[str]) -> List[str]:
+            results, failed = first_stages[chain[0]]
+            results, failed = self._translate_chain(chain[1:], results, failed=failed, profile=profile)
+            return self._join_texts(results, failed, layout)
+        
+        futures = {target: self._fanout.submit(finish, chain) for target, chain in chains.items()}
+        return {target: future.result() for target, future in futures.items()}
 
-        try:
-            model, tokenizer = self.models[route]
+    def _split_texts(self, texts: List[str]) -> Tuple[List[str], List[Tuple[int, int, List[str]]]]:
+        """
+        Split long texts into sentences so all of them go into one
+        length-bucketed batch.
+        
+        Returns:
+            Tuple of (segments, layout) where layout has the (start, count,
+            separators) of each text's segments
+        """
+        segments: List[str] = []
+        layout = []
+        for text in texts:
+            if len(text) > Config.SEGMENT_MAX_CHARS:
+                parts, separators = split_segments(text, Config.SEGMENT_MAX_CHARS)
+            else:
+                parts, separators = [text], ['', '']
+            layout.append((len(segments), len(parts), separators))
+            segments.extend(parts)
+        return segments, layout
+
+    def _join_texts(self, results: List[str], failed: Set[int],
+                    layout: List[Tuple[int, int, List[str]]]) -> List[str]:
+        """Reassemble translated segments per text, or report a segment's error"""
+        translations = []
+        for start, count, separators in layout:
+            failure = next((i for i in range(start, start + count) if i in failed), None)
+            if failure is not None:
+                translations.append(results[failure])
+            else:
+                translations.append(join_segments(results[start:start + count], separators))
+        return translations
+
+    def translate_stream(self, source: str, target: str, text: str, profile: str = None) -> Iterator[Dict]:
+        """
+        Translate text segment by segment, yielding each one as soon as it is ready.
+        
+        The first segment is translated on its own to minimize time to first
+        output, the rest in groups of Config.STREAM_CHUNK_SEGMENTS. Closing
+        the generator (e.g. the client disconnected) stops further work.
+        
+        Args:
+            source (str): Source language code
+            target (str): Target language code
+            text (str): Text to translate
+            profile (str): Generation profile (Config.GENERATION_PROFILE if not given)
             
-            # Tokenize all texts
-            batch = tokenizer(texts, return_tensors="pt", padding=True, truncation=True)
-            generated = model.generate(**batch)
-            translated: List[str] = tokenizer.batch_decode(generated, skip_special_tokens=True)
+        Yields:
+            Event dictionaries with a 'type' of 'start', 'segment', 'done' or 'error'
+            
+        Raises:
+            ModelNotReady: From the first next() call, if the model is still loading
+            ValueError: From the first next() call, if the profile is unknown
+        """
+        profile = resolve_profile(profile, Config.GENERATION_PROFILE)
+        chain = self.get_route_chain(source, target)
+        segments, separators = split_segments(text, Config.SEGMENT_MAX_CHARS)
+        
+        # A model that is still loading is reported before the stream starts
+        self._prefetch(chain)
+        for route in chain:
+            pair, message = self._ensure_loaded(route)
+            if pair is None:
+                yield {"type": "error", "error": message}
+                return
+        
+        yield {"type": "start", "segments": len(segments), "separator": separators[0]}
+        
+        translations: List[str] = []
+        size = 1
+        while len(translations) < len(segments):
+            start = len(translations)
+            results, failed = self._translate_chain(chain, segments[start:start + size], "Error during translation",
+                                                    profile=profile)
+            if failed:
+                yield {"type": "error", "error": results[min(failed)]}
+                return
             
-            return translated
+            for offset, translation in enumerate(results):
+                index = start + offset
+                translations.append(translation)
+                yield {"type": "segment", "index": index, "text": translation, "separator": separators[index + 1]}
+            size = max(1, Config.STREAM_CHUNK_SEGMENTS)
+        
+        yield {"type": "done", "translated_text": join_segments(translations, separators)}
+
+    def _translate_chain(self, chain: List[str], texts: List[str],
+                         error_prefix: str = "Error during batch translation",
+                         failed: Set[int] = None, profile: str = None) -> Tuple[List[str], Set[int]]:
+        """
+        Translate texts through a chain of models, one batched stage per model.
+        
+        Every stage goes through its own route's cache tiers, so the
+        intermediate translations of a pivot are cached and shared by all the
+        pairs that pivot through the same model.
+        
+        Args:
+            chain (List[str]): Model routes in order, e.g. ['es-en', 'en-fr']
+            texts (List[str]): Texts to translate
+            error_prefix (str): Prefix of the error message for failed texts
+            failed (Set[int]): Indices of texts that already hold an error
+                message from an earlier stage and are passed through
+            profile (str): Generation profile of every stage
+            
+        Returns:
+            Tuple of (results, failed) as returned by _translate_many
+        """
+        self._prefetch(chain)
+        results = list(texts)
+        failed = set(failed or ())
+        for route in chain:
+            active = [i for i in range(len(texts)) if i not in failed]
+            if not active:
+                break
+            stage, stage_failed = self._translate_many(route, [results[i] for i in active], error_prefix, profile)
+            for position, i in enumerate(active):
+                results[i] = stage[position]
+                if position in stage_failed:
+                    failed.add(i)
+        return results, failed
+
+    def _prefetch(self, chain: List[str]):
+        """Start loading the later models of a pivot chain while the first stage runs"""
+        for route in chain[1:]:
+            if route not in self.models:
+                self.start_loading(route)
+
+    def _translate_many(self, route: str, texts: List[str],
+                        error_prefix: str = "Error during batch translation",
+                        profile: str = None) -> Tuple[List[str], Set[int]]:
+        """
+        Translate texts through the cache tiers and one bucketed model batch.
+        
+        Args:
+            route (str): Language route, e.g. 'en-es'
+            texts (List[str]): Texts to translate
+            error_prefix (str): Prefix of the error message for failed texts
+            profile (str): Generation profile, also part of the cache key
             
+        Returns:
+            Tuple of (results, failed) where failed holds the indices whose
+            result is an error message
+        """
+        # Only cache misses go to the model
+        results: List[str] = self._lookup(route, texts, profile)
+        missing = [i for i, result in enumerate(results) if result is None]
+        failed: Set[int] = set()
+        if not missing:
+            return results, failed
+        
+        # Load model if not already in memory
+        pair, message = self._ensure_loaded(route)
+        if pair is None:
+            for i in missing:
+                results[i] = message
+            return results, set(missing)
+
+        # Identical texts in a batch are generated once
+        positions = {}
+        for i in missing:
+            positions.setdefault(texts[i], []).append(i)
+        pending = list(positions)
+
+        try:
+            generated = self._generate(route, pair, pending, profile)
         except Exception as e:
-            error_msg = f"Error during batch translation: {str(e)}"
-            return [error_msg] * len(texts)
+            generated = [e] * len(pending)
+        
+        translated_texts, translations = [], []
+        for text, translation in zip(pending, generated):
+            if isinstance(translation, Exception):
+                translation = f"{error_prefix}: {str(translation)}"
+                failed.update(positions[text])
+            else:
+                translated_texts.append(text)
+                translations.append(translation)
+            for i in positions[text]:
+                results[i] = translation
+        
+        self._remember(route, translated_texts, translations, profile)
+        return results, failed
+
+    def _lookup(self, route: str, texts: List[str], profile: str = None) -> List[str]:
+        """
+        Look texts up in the memory cache and then in the translation store.
+        
+        Translations of different generation profiles are kept apart.
+        
+        Returns:
+            List with the known translation or None for each text
+        """
+        self._check_weights(route)
+        results: List[str] = [None] * len(texts)
+        if self.cache is not None:
+            results = self.cache.get_many(route, texts, profile)
+        
+        if self.store is not None:
+            missing = [i for i, result in enumerate(results) if result is None]
+            if missing:
+                try:
+                    stored = self.store.get_many(route, [texts[i] for i in missing], profile)
+                except Exception as e:
+                    print(f"Translation store lookup failed: {str(e)}")
+                    stored = [None] * len(missing)
+                for i, translation in zip(missing, stored):
+                    if translation is not None:
+                        results[i] = translation
+                        # Promote to the faster tier
+                        if self.cache is not None:
+                            self.cache.put(route, texts[i], translation, profile)
+        return results
+
+    def _check_weights(self, route: str):
+        """
+        Refresh a route whose model changed on disk since it was loaded.
+        
+        refresh_route only runs in the worker process that served the
+        download, so the other workers find out here, before they serve the
+        route's cached translations or resident model. Each route is checked
+        at most once every MODEL_CHECK_SECONDS.
+        """
+        recorded = self._weights_mtimes.get(route)
+        if recorded is None:
+            return
+        now = time.monotonic()
+        if now - self._weights_checked.get(route, float("-inf")) < MODEL_CHECK_SECONDS:
+            return
+        self._weights_checked[route] = now
+        current = _model_version(os.path.join(self.models_dir, f'opus-mt-{route}'))
+        with self._load_lock:
+            if current == recorded or self._weights_mtimes.get(route) != recorded:
+                return
+            self._weights_mtimes.pop(route)
+        print(f"Model for {route} changed on disk, reloading")
+        self.refresh_route(route)
+
+    def _remember(self, route: str, texts: List[str], translations: List[str], profile: str = None):
+        """Store fresh translations in every cache tier"""
+        if not texts:
+            return
+        if self.cache is not None:
+            self.cache.put_many(route, texts, translations, profile)
+        if self.store is not None:
+            try:
+                self.store.put_many(route, texts, translations, profile)
+            except Exception as e:
+                print(f"Translation store write failed: {str(e)}")
+
+    def invalidate_route(self, route: str):
+        """
+        Drop cached translations for a route whose model was deleted or replaced.
+        
+        Args:
+            route (str): Language route, e.g. 'en-es'
+        """
+        if self.cache is not None:
+            self.cache.invalidate_route(route)
+        if self.store is not None:
+            self.store.invalidate_route(route)
+
+    def refresh_route(self, route: str):
+        """
+        Pick up a model that was downloaded, replaced or deleted on disk.
+        
+        Only the given route is affected: its cached translations and any
+        resident copy of the old model are dropped, other models stay loaded.
+        
+        Args:
+            route (str): Language route, e.g. 'en-es'
+        """
+        self.routes.invalidate()
+        self.invalidate_route(route)
+        self.unload_model(route)
+        with self._load_lock:
+            self._weights_mtimes.pop(route, None)
+            if route not in self._loading:
+                self._load_states.pop(route, None)
+
+    def get_cache_stats(self) -> dict:
+        """
+        Get translation cache size and per-route hit/miss/eviction counters.
+        
+        Returns:
+            Dictionary with cache statistics
+        """
+        stats = self.cache.stats() if self.cache is not None else {"enabled": False}
+        stats["store"] = self.store.stats() if self.store is not None else {"enabled": False}
+        return stats
+
+    def get_inference_stats(self) -> dict:
+        """
+        Get the inference worker layout and how many workers are busy.
+        
+        Returns:
+            Dictionary with inference pool statistics
+        """
+        stats = dict(self.inference_pool.stats(), enabled=True) if self.inference_pool is not None else {"enabled": False}
+        stats["processes"] = dict(self.process_pool.stats(), enabled=True) if self.process_pool is not None else {"enabled": False}
+        return stats
 
     def get_loaded_models(self) -> List[str]:
         """
@@ -158,3 +1136,30 @@ class Translator():
     def clear_all_models(self):
         """Clear all loaded models from memory."""
         self.models.clear()
+
+    def pin_route(self, route: str):
+        """
+        Keep a route's model resident, it will never be evicted.
+        
+        Args:
+            route (str): Language route to pin
+        """
+        self.models.pin(route)
+
+    def unpin_route(self, route: str):
+        """
+        Allow a pinned route's model to be evicted again.
+        
+        Args:
+            route (str): Language route to unpin
+        """
+        self.models.unpin(route)
+
+    def get_memory_stats(self) -> dict:
+        """
+        Get the residency budget and the measured size of each loaded model.
+        
+        Returns:
+            Dictionary with residency statistics
+        """
+        return self.models.stats()
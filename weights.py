@@ -0,0 +1,85 @@
+"""
+Safetensors model storage.
+
+Models are downloaded with pickled pytorch_model.bin weights. Files in
+torch's legacy (non-zip) format are unpickled into private memory in every
+process. Converted once to model.safetensors, the weights are memory-mapped
+by from_pretrained instead, so a cold start is mostly page-ins and worker
+processes on one host share the same physical pages.
+"""
+
+import os
+
+from safetensors.torch import save_model
+from transformers.models.marian import MarianMTModel
+
+SAFETENSORS_FILENAME = "model.safetensors"
+PICKLE_FILENAME = "pytorch_model.bin"
+
+# off: keep the pickled weights, download: convert right after a download,
+# lazy: convert the first time a model is loaded
+CONVERSIONS = ("off", "download", "lazy")
+
+
+def safetensors_is_current(path: str) -> bool:
+    """
+    Check whether a model directory has safetensors weights that are at least
+    as new as its pickled weights.
+
+    Args:
+        path (str): Model directory (data/opus-mt-{source}-{target})
+    """
+    converted = os.path.join(path, SAFETENSORS_FILENAME)
+    if not os.path.exists(converted):
+        return False
+    pickled = os.path.join(path, PICKLE_FILENAME)
+    return not os.path.exists(pickled) or os.path.getmtime(converted) >= os.path.getmtime(pickled)
+
+
+def convert_to_safetensors(path: str) -> str:
+    """
+    Convert the pickled weights of a model directory to safetensors.
+
+    The pickled file is kept. The converted file gets its modification time,
+    so caches derived from the weights (int8, ONNX) stay valid.
+
+    Args:
+        path (str): Model directory with config.json and pytorch_model.bin
+
+    Returns:
+        Path of the safetensors file
+    """
+    pickled = os.path.join(path, PICKLE_FILENAME)
+    converted = os.path.join(path, SAFETENSORS_FILENAME)
+
+    model = MarianMTModel.from_pretrained(path, use_safetensors=False)
+    temp_path = f"{converted}.tmp"
+    # save_model drops the duplicate names of tied weights, which
+    # from_pretrained ties again
+    save_model(model, temp_path, metadata={"format": "pt"})
+    mtime = os.path.getmtime(pickled)
+    os.utime(temp_path, (mtime, mtime))
+    os.replace(temp_path, converted)
+    return converted
+
+
+def ensure_safetensors(path: str) -> bool:
+    """
+    Convert a model directory to safetensors unless it already is.
+
+    Returns:
+        True if the directory has current safetensors weights, False if there
+        is nothing to convert or the conversion failed (the pickled weights
+        are then used as before)
+    """
+    if safetensors_is_current(path):
+        return True
+    if not os.path.exists(os.path.join(path, PICKLE_FILENAME)):
+        return False
+    try:
+        print(f"Converting {path} to {SAFETENSORS_FILENAME}...")
+        convert_to_safetensors(path)
+        return True
+    except Exception as e:
+        print(f"Warning: could not convert {path} to {SAFETENSORS_FILENAME}: {str(e)}")
+        return False